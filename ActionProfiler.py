@@ -0,0 +1,135 @@
+################
+## Code Notes ##
+################
+# This file contains the profiling of the actions chosen from the menus of
+# "CommandLineInterface.py" (logging in, posting a tweet, viewing the
+# timeline, following a user and so on). An action starts when it is chosen
+# and ends when the menu is shown again. Its time does not include the time
+# spent waiting for the user: the CLI passes input and pause through
+# untimed, and whatever time is spent in them is left out.
+#
+# Profiling is off unless the TWITTERLIKE_PROFILE environment variable is set
+# to a file. One line of JSON is added to that file for every action, so the
+# file can collect the actions of many sessions and be summarised with
+# "benchmarks/ActionProfileReport.py". Each line has:
+# - action: the name of the action, and pid and time: the session and when
+#   the action ended (seconds since the epoch)
+# - wall_ms: the time the action took without the waits, cpu_ms: the CPU
+#   time of the process over the same time, and wait_ms and waits: how long
+#   and how many times it waited for the user
+# - with TWITTERLIKE_PROFILE_MEMORY=1, peak_kib and allocated_kib: the most
+#   memory traced by tracemalloc during the action, and how much more was in
+#   use at the end than at the start
+#
+# With TWITTERLIKE_PROFILE_CPROFILE set to a directory, each action is also
+# run under cProfile. The profiles of each action are added up over a session
+# and saved on exit as "<action>.<pid>.prof" in that directory, which pstats
+# can read and combine across sessions.
+#
+# cProfile, tracemalloc and json are only imported when profiling is on.
+
+#### Start Program ####
+
+import atexit
+import os
+import time
+
+
+# Return the profiler set up by the environment. Its methods do nothing when
+# profiling is off.
+def configured_action_profiler():
+    return ActionProfiler(os.environ.get("TWITTERLIKE_PROFILE") or None,
+                          os.environ.get("TWITTERLIKE_PROFILE_CPROFILE") or None,
+                          os.environ.get("TWITTERLIKE_PROFILE_MEMORY", "") not in ("", "0"))
+
+
+class ActionProfiler:
+
+    def __init__(self, path, cprofile_directory=None, memory=False):
+        # The file the actions are added to, or None if profiling is off.
+        self.path = path
+        self.cprofile_directory = cprofile_directory if path is not None else None
+        self.memory = memory and path is not None
+        # The action being timed, or None.
+        self.action = None
+        # {action: cProfile.Profile}, added up over the session.
+        self.profiles = dict()
+        if path is not None:
+            atexit.register(self.close)
+
+    # Start timing an action, ending the one before it if there is one.
+    def start(self, action):
+        if self.path is None:
+            return
+        self.finish()
+        self.action = action
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.wait_cpu_seconds = 0.0
+        self.profile = None
+        if self.cprofile_directory is not None:
+            import cProfile
+            self.profile = self.profiles.get(action)
+            if self.profile is None:
+                self.profile = self.profiles[action] = cProfile.Profile()
+        if self.memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.memory_at_start = tracemalloc.get_traced_memory()[0]
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        if self.profile is not None:
+            self.profile.enable()
+
+    # Stop timing the current action and add it to the file.
+    def finish(self):
+        if self.action is None:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        wall_seconds = time.perf_counter() - self.started - self.wait_seconds
+        cpu_seconds = time.process_time() - self.cpu_started - self.wait_cpu_seconds
+        record = {"action": self.action, "pid": os.getpid(), "time": round(time.time(), 3),
+                  "wall_ms": round(wall_seconds * 1000, 3), "cpu_ms": round(cpu_seconds * 1000, 3),
+                  "wait_ms": round(self.wait_seconds * 1000, 3), "waits": self.waits}
+        if self.memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            record["peak_kib"] = round((peak - self.memory_at_start) / 1024, 1)
+            record["allocated_kib"] = round((current - self.memory_at_start) / 1024, 1)
+        self.action = None
+        import json
+        with open(self.path, "a", encoding="utf-8") as actions:
+            actions.write(json.dumps(record) + "\n")
+
+    # Return a version of function whose time is not counted in the action
+    # running when it is called, such as input or a pause.
+    def untimed(self, function):
+        if self.path is None:
+            return function
+        def call(*args, **kwargs):
+            if self.action is None:
+                return function(*args, **kwargs)
+            if self.profile is not None:
+                self.profile.disable()
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.waits += 1
+                self.wait_seconds += time.perf_counter() - started
+                self.wait_cpu_seconds += time.process_time() - cpu_started
+                if self.profile is not None:
+                    self.profile.enable()
+        return call
+
+    # End the last action and save the cProfile profiles. Called on exit.
+    def close(self):
+        self.finish()
+        for action, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(self.cprofile_directory,
+                                            "%s.%d.prof" % (action.replace(" ", "-"), os.getpid())))
+        self.profiles.clear()
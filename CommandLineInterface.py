@@ -5,7 +5,10 @@
 # Prior to running this code, please ensure that the code in the other provided file, 
 # "DatabaseModuleStarter.py", has been run to initialize the database used in this program.
 
-# Emoji and flask_bcrpyt must be installed prior to running this code. 
+# Emoji and flask_bcrpyt must be installed prior to running this code. Both are
+# only imported once they are needed: flask_bcrypt when a user logs in or
+# registers, and emoji when a tweet or comment containing an emoji alias is
+# stored or shown (see "EmojiText.py").
 # Please run the following commands in your terminal:
 # pip install emoji 
 # pip install flask_bcrypt
@@ -13,42 +16,82 @@
 #### Start Program ####
 
 # Import the required packages.
-import sqlite3
-import emoji
+import math
+import os
 import time
-from flask_bcrypt import Bcrypt
+from TweetPages import PAGE_SIZE
+from PageRenderer import (BANNER, show, render_tweets, render_liked_tweets, render_comments,
+                          render_search_comments, render_usernames, render_trending_tweets,
+                          render_trending_hashtags)
+from FollowPages import FOLLOW_PAGE_SIZE
+from LoginRateLimiter import local_source
+from ActionProfiler import configured_action_profiler
+from TwitterLikeStore import (TwitterLikeStore, DatabaseNotInitializedError, check_password_rules,
+                              FOLLOWED, UNFOLLOWED, FOLLOWING_SELF, USER_NOT_FOUND, ALREADY_FOLLOWING)
 
 # Command Line Interface 
 
-# Connect to the database.
-conn=sqlite3.connect("twitter_like.db")
-cursor=conn.cursor()
-
-# Initialize a new instance of Bcrypt for hashing.
-bcrypt = Bcrypt()
-pausetime = 1
-
-# Check if the database tables exist. If not, the program will terminate. If this
-# happens, please run the code in "DatabaseModuleStarter.py" and try again.
-cursor.execute('''SELECT name FROM sqlite_master 
-               WHERE type = 'table' and name = 'user_profiles';''')
-if cursor.fetchone() is None: # This returns none when the user_profile table is not found.
+# All database work is done by TwitterLikeStore in "TwitterLikeStore.py"; this
+# file only asks for input and prints the results.
+
+# The CLI can pause after messages so that they can be read before the menu
+# is shown again. Pauses are off unless the TWITTERLIKE_PAUSE_SECONDS
+# environment variable is set, for example to 1.
+pausetime = float(os.environ.get("TWITTERLIKE_PAUSE_SECONDS", 0))
+
+
+# Pause for a multiple of pausetime, if pauses are on.
+def pause(multiple=1):
+    if pausetime > 0:
+        time.sleep(pausetime * multiple)
+
+# Show a list one page at a time, asking after each full page whether to show
+# the next one. read_page is called with the number of the page (0 for the
+# first) and the last row of the page before it (None for the first page) and
+# returns the rows of the page, which render turns into the text shown.
+# Returns the number of rows shown.
+def show_pages(read_page, render, page_size=PAGE_SIZE):
+    page_number = 0
+    last_row = None
+    rows_shown = 0
+    while True:
+        # Each page is shown with a single write.
+        page = list(read_page(page_number, last_row))
+        show(render(page))
+        rows_shown += len(page)
+        # Stop when the last page has been shown.
+        if len(page) < page_size:
+            return rows_shown
+        next_page = input("Enter N to see the next page (or hit Enter key to continue): ")
+        if next_page.upper() != "N":
+            return rows_shown
+        page_number += 1
+        last_row = page[-1]
+
+# The time each menu action takes can be profiled (see "ActionProfiler.py").
+# Waiting for the user to type something, or for a pause to end, is not part
+# of the time of an action, so input and pause are left out of the timing.
+profiler = configured_action_profiler()
+input = profiler.untimed(input)
+pause = profiler.untimed(pause)
+
+# The names of the actions of the main menu, as they are profiled.
+ACTION_NAMES = {1: "post tweet", 2: "view timeline", 3: "like or unlike", 4: "follow", 5: "unfollow",
+                6: "followers and following", 7: "help", 8: "exit", 9: "view own tweets", 10: "search",
+                11: "hashtag", 12: "mentions", 13: "trending"}
+
+# Connect to the database. If the database tables do not exist, the program will
+# terminate. If this happens, please run the code in "DatabaseModuleStarter.py" and try again.
+try:
+    store = TwitterLikeStore()
+except DatabaseNotInitializedError:
     print("The database has not been initialized. Please use DatabaseModuleStarter file to intitialize the database.")
-    conn.close() # Close the database connection.
     exit() # terminate the program.
 
 # Initialize a username and id variable, and begin the login or registration process.
 username = "temp"
 current_userid = "temp"
-print(emoji.emojize(':front-facing_baby_chick:'),
-      emoji.emojize(':front-facing_baby_chick:'),
-      emoji.emojize(':front-facing_baby_chick:'),
-      emoji.emojize(':front-facing_baby_chick:'),
-      "Welcome to Twitterlike",
-      emoji.emojize(':front-facing_baby_chick:'),
-      emoji.emojize(':front-facing_baby_chick:'),
-      emoji.emojize(':front-facing_baby_chick:'),
-      emoji.emojize(':front-facing_baby_chick:'))
+print(BANNER)
 
 # The main functionality of this program operates on for loops.
 # Until a user provides a valid selection at any point where they
@@ -67,63 +110,49 @@ while True:
         break # loop breaks when user enters 1, 2, or 3.
     else: # Loop continues if selection is not valid.
         print("Selected option is not a valid option. Please select a valid choice from the menu.")
-        time.sleep(pausetime)  
+        pause()  
         
 # Logging in.
 if choice == 1:
-    # Initialize a variable to record how many times a user unsuccessfully tries to login.
-    login_attempts = 0 
-    login_penalty_sec = 20
+    profiler.start("login")
+    # Where the login attempts come from, for the login rate limiter.
+    source = local_source()
     while True:
         # Receiving username and password input, retrieving password from database for username
         username = input("Username: ")
         password = input("Password: ")
-        cursor.execute('''SELECT password FROM user_profiles 
-                       WHERE username = ?''', 
-                       (username, ))
-        user_password = cursor.fetchone()
+        # Login attempts are rate limited per username and per source, and the limits
+        # are kept in the database. After too many attempts, the login is refused
+        # without checking the password until the wait time has passed.
+        logged_in, retry_after = store.login(username, password, source)
+        if retry_after:
+            print("Max login attempts exceeded. Please try again in",
+                  math.ceil(retry_after),
+                  "seconds.")
+            continue
         # If that user info doesn't exist in the database or if the password is wrong, then
         # the login is unsuccessful. 
-        if user_password is None or not bcrypt.check_password_hash(user_password[0],password):
-            login_attempts += 1 # Record failed login.
-            # If the user has failed to login successfully 5 times, the login screen
-            # is temporarily locked. The time it is locked for increases by 10 seconds
-            # for each subsequent failure.
-            if login_attempts < 5:
-                print("Incorrect login information. Please try again.")
-                time.sleep(pausetime)
-                continue
-            else:
-                print("Max login attempts exceeded. Login suspended for ", 
-                      login_penalty_sec, 
-                      " seconds.")
-                time.sleep(login_penalty_sec) # Force the program to pause. 
-                login_penalty_sec += 10 # Add ten sec to the timeout variable.
+        if not logged_in:
+            print("Incorrect login information. Please try again.")
+            pause()
+            continue
 
         # If the username and password pair that the user provided matches the 
         # info in the database, the login is successful.
         else:
             print("Login successful. Welcome", username)
-            time.sleep(pausetime)
+            pause()
             break
 
 # Registering a new user.
 elif choice == 2:
-    # Generate the new user id by adding one to the largest 
-    # of the current user ids in the database.
-    cursor.execute('''SELECT MAX(user_id) FROM user_profiles''')
-    new_user_id = cursor.fetchone()[0] + 1
-
+    profiler.start("register")
     # Create a username.
     while True:
         username = input("Please choose a username: ")
-        # Check if the username already exists in the database.
-        cursor.execute("SELECT username FROM user_profiles WHERE username = ?", (username, ))
-        username_test_fetch = cursor.fetchone()
         if username: # A user must enter a username to proceed.
-            # The above query will return none if the username does not
-            # exist already, and will not be none when it does exist.
-            if username_test_fetch is not None:
+            # Check if the username already exists in the database.
+            if store.username_exists(username):
                 print("Username already taken. Please enter a different username.")
                 continue
         else: # If the user failed to enter a username, they will be asked again.
@@ -133,74 +162,45 @@ elif choice == 2:
 
     # Creating a password.
     while True:
-        special_characters = "[@_!$%^&*()<>?/\|}{~:]#+-=,.`" # Used to check password requirements. 
         # Ask the user for a password. 
         password = input("Please choose a password (must contain at least three letters, two numbers, and a special character): ")
-        if password == username: # Passwords cannot be the same as the username for security purposes. 
-            print("Password cannot be the same as your username. Please choose a different password.")
-            time.sleep(pausetime)
-            continue # Ask again.
-        elif password: # Proceed if the user enters a password.
-            # Initilize variables to count the number of letters,
-            # numbers, and special characters in the password that
-            # the user provided.
-            letter_count = 0
-            number_count = 0
-            special_char_count = 0
-            # Now count the number of letters, numbers, and
-            # special characters in the password.
-            for char in password:
-                if char.isalpha():
-                    letter_count += 1
-                elif char.isdigit():
-                    number_count += 1
-                elif char in special_characters:
-                    special_char_count += 1
-            
-            # If the password is accepted, then hash it and continue
-            if letter_count >= 3 and number_count >= 2 and special_char_count >= 1:
-                print("Username and password accepted. Please enter additional information.")
-                password = bcrypt.generate_password_hash(password)
-                time.sleep(pausetime)
-                break
-            else: # If the password does not meet security requirements, ask again.
-                print("Password must contain at least three letters, two numbers, and a special character. Please try another password.")
-                time.sleep(pausetime)
-                continue
-        else: # If the user did not enter a password, ask again.
-            print("Please enter a valid password to proceed.")
-            time.sleep(pausetime)
+        # Check the password against the password rules. If it does not meet
+        # them, explain why and ask again.
+        password_problem = check_password_rules(username, password)
+        if password_problem:
+            print(password_problem)
+            pause()
             continue
+        # If the password is accepted, continue. It is hashed when the user is created.
+        print("Username and password accepted. Please enter additional information.")
+        pause()
+        break
     # The following code only executes after a valid username and password are chosen by the user. 
     full_name = input("Please enter your full name (press enter to skip): ") # Optional field.
     email = input("Please enter your email address (press enter to skip): ") # Optional field.
     profile_image = input("Please enter a link to your profile image (press enter to skip): ") # Optional field.
 
     # Insert the new user information into the database.
-    cursor.execute('''INSERT INTO user_profiles (user_id, username, password, full_name, profile_image) 
-                   VALUES(?,?,?,?,?)''',
-                    (new_user_id, username, password, full_name, profile_image))
-    conn.commit() # Commit the insertion of the new user into the database.
+    store.register_user(username, password, full_name, email, profile_image)
     print("New user successfully created. Welcome,", username)
-    time.sleep(pausetime)
+    pause()
 
 # Exiting without logging in or registering. 
 elif choice == 3:
     print("Goodbye") # Inform the user that they are exiting.
-    conn.close() # Close the connection.
+    store.close() # Close the connection.
     exit() # Terminate the program.
 
 # After a user logs in or registers, their user id is retrieved and stored
 # for the duration of their interaction with the program. 
-cursor.execute('''SELECT user_id FROM user_profiles WHERE username =?''',
-                (username,))
-current_userid = cursor.fetchone()[0]
+current_userid = store.get_user_id(username)
 
 # CLI interface selection screen. A while loop is used to
 # return the user to this initial option screen when 
 # required. The loop is terminated when the user wishes
 # to logoff.
 while True:
+    profiler.finish() # The action chosen last, if any, ends here.
     print("Please Select")
     print("1. Post a Tweet")
     print("2. View Timeline")
@@ -211,95 +211,59 @@ while True:
     print("7. Help")
     print("8. Exit")
     print("9. View your tweets")
+    print("10. Search Tweets and Comments")
+    print("11. View Tweets with a #Hashtag")
+    print("12. View Tweets Mentioning You")
+    print("13. Trending")
 
     while True: # Check that the user entered a number.
         choice = input("Enter your choice: ")
         try:
             choice = int(choice) # Convert the input to an integer.
             break # Continue with the program.
-        except ValueError or TypeError:
+        except (ValueError, TypeError):
             print("That is not a valid choice")
+    profiler.start(ACTION_NAMES.get(choice, "other"))
 
     if choice == 1: # Posting a tweet.
         # Allow the user to generate the Tweet content.
         tweet_content = input("Enter Tweet: ")
-        # Create the Tweet Id.
-        cursor.execute('''SELECT MAX(tweet_id) FROM tweets''')
-        newest_tweet_id = cursor.fetchone()
-        if newest_tweet_id[0] is not None:
-            newest_tweet_id = newest_tweet_id[0]+1
-        elif newest_tweet_id[0] is None:
-            newest_tweet_id = 1 
-        # Insert the tweet content and relevant info into the Tweet table.
-        cursor.execute('''INSERT INTO tweets (tweet_id, user_id, tweet_content) VALUES(?,?,?)''', 
-                       (newest_tweet_id, current_userid, tweet_content))
-        conn.commit()
+        # Save the tweet and add it to the home timeline of each of the user's followers.
+        store.post_tweet(current_userid, tweet_content)
 
     elif choice == 2: # Viewing user timeline.
         print("\n")
         print("Welcome,",username, "!\n")
-        # Retrieve all tweets from users followed in descending order by tweet time stamp.
-        cursor.execute('''SELECT user_profiles.username,tweet_id,
-                       tweet_content FROM followers_following 
-                       INNER JOIN tweets ON followers_following.following_user_id = tweets.user_id 
-                       INNER JOIN user_profiles ON user_profiles.user_id=tweets.user_id 
-                       WHERE followers_following.follower_user_id = ? 
-                       ORDER BY tweets.tweet_id DESC ''',
-                       (current_userid,))
-        tweets = cursor.fetchall()
-        # Create the timeline to display to the user.
-        users = list()
-        tweetid = list()
-        tweetcontent = list()
-        numberlikes = list()
-        # Combine the retrieved columns into a list.
-        for tweet in tweets:
-            users.append(tweet[0])
-            tweetid.append(tweet[1])
-            tweetcontent.append(tweet[2])
-        timeline = [users,tweetid,tweetcontent]
+        # Retrieve the tweets from users followed in descending order by tweet time stamp,
+        # together with the number of likes and comments for each tweet. The tweets come
+        # from the user's materialized home timeline and the counts from the tweet_stats
+        # table. The timeline is shown one page at a time; each page only asks for tweets
+        # older than the last one shown, so only a page of tweets is read at a time.
+        tweets_shown = show_pages(lambda page_number, last_tweet:
+                                  store.timeline_page(current_userid, last_tweet and last_tweet[1]),
+                                  render_tweets)
 
         # If there are no tweets from followed users or there are no followed users:
-        if not tweets:
+        if tweets_shown == 0:
             print("Oh no! Looks like your timeline is empty. Let's take you back to the main list so you can change that. Happy Tweeting!")
-            time.sleep(5)
+            pause(5)
             pass
-        # Retrieve the count of likes for all followed users tweets.
+        # Once the user is done reading the timeline, they can open a tweet.
         else:
-            for tweet in timeline[1]:
-                cursor.execute('''SELECT COUNT(tweet_id) 
-                               FROM likes_retweets 
-                               WHERE tweet_id =? ''',
-                               (tweet,))
-                numberlikes.append(cursor.fetchone()[0])
-            timeline.append(numberlikes)
-            
-            for tweet in range(len(timeline[0])):
-                print(timeline[0][tweet],"( Tweet ID:",timeline[1][tweet],")")
-                print("   ",timeline[2][tweet])
-                print(emoji.emojize(':thumbs_up:'), timeline[3][tweet], "\n")
-
             # Retrieve a tweet id from user to view all the comments for that tweet.
             selected_tweet_id = input("Enter the tweet ID to view/add comments (or hit Enter key to return to the main menu): ")
-            cursor.execute('''SELECT tweet_content 
-                           FROM tweets 
-                           WHERE tweet_id = ?''', 
-                           (selected_tweet_id,))
-            selected_tweet = cursor.fetchone()
+            selected_tweet = store.get_tweet(selected_tweet_id)
             # Retrieve all comments for the user inputted tweet id.
             if selected_tweet:
                 print("\n", "Tweet: ", selected_tweet[0])
-                # View the existing comments on selected tweet.
-                cursor.execute('''SELECT user_profiles.username, comment_text 
-                               FROM comments 
-                               INNER JOIN user_profiles ON comments.user_id = user_profiles.user_id 
-                               WHERE tweet_id = ?''', 
-                               (selected_tweet_id,))
-                existing_comments = cursor.fetchall()
+                # View the existing comments on selected tweet. The comment counter
+                # tells us whether there are any before the comments are queried.
+                existing_comments = list()
+                if selected_tweet[1] > 0:
+                    existing_comments = store.get_comments(selected_tweet_id)
                 if existing_comments:
                     print("Comments:")
-                    for comment in existing_comments:
-                        print(comment[0], ":", emoji.emojize(comment[1]))
+                    show(render_comments(existing_comments))
                 else:
                     print("No comments yet.")
                 # Allow the user to add a comment or return to main menu.
@@ -308,28 +272,14 @@ while True:
                     pass
                 else:
                     # Add the user comments to the comments tables.
-                    cursor.execute('''INSERT INTO comments (user_id, tweet_id, comment_text) 
-                                   VALUES (?, ?, ?)''', 
-                                   (current_userid, selected_tweet_id, comment_options))
-                    conn.commit()
+                    store.add_comment(current_userid, selected_tweet_id, comment_options)
             else: # When a user enters a tweet id that doesn't exist.
                 print("Tweet not found.")
 
     elif choice == 3: # Like and unlike a tweet.
-        # Retrieving all liked tweets for the current user.
-        cursor.execute('''SELECT tweets.tweet_id, tweet_content 
-                       FROM user_profiles 
-                       INNER JOIN likes_retweets ON user_profiles.user_id=likes_retweets.user_id 
-                       INNER JOIN tweets ON likes_retweets.tweet_id = tweets.tweet_id 
-                       WHERE user_profiles.username =? ''',
-                       (username,))
-        current_likes = cursor.fetchall()
-        cursor.execute('''SELECT MAX(like_retweet_id) FROM likes_retweets''')
-        newest_id = cursor.fetchone()
-        if newest_id[0] is not None:
-            newest_id = newest_id[0]+1
-        elif newest_id[0] is None:
-            newest_id = 1
+        # Retrieving all liked tweets for the current user, along with the total
+        # number of likes on each of those tweets from the tweet_stats counters.
+        current_likes = store.liked_tweets(current_userid)
 
         # Changing the retrieved data into list form for viewing
         tweet_ids = list()
@@ -338,44 +288,32 @@ while True:
         for tweet in current_likes:
             tweet_ids.append(tweet[0])
             tweet_cont.append(tweet[1])
-            cursor.execute('''SELECT COUNT(tweet_id) 
-                           FROM likes_retweets WHERE tweet_id =?''',
-                           (tweet[0],))
-            tweet_likes.append(cursor.fetchone()[0])
-
-        
-        # Retrieving all tweet ids to ensure a tweet exists later.
-        cursor.execute('''SELECT tweet_id FROM tweets''') 
-        id_list=cursor.fetchall()
-        tweet_verification = list()
-        for ids in id_list:
-            tweet_verification.append(ids[0])
+            tweet_likes.append(tweet[2])
 
 
         while True:
             print("currently liked tweets:")
-            # Printing all currently liked tweets.
-            for tweet in range(len(tweet_ids)):
-                print(tweet_ids[tweet], ":", tweet_cont[tweet])
-                print(emoji.emojize(':thumbs_up:'), tweet_likes[tweet])
-                time.sleep(pausetime)
+            # Printing all currently liked tweets with a single write.
+            show(render_liked_tweets(zip(tweet_ids, tweet_cont, tweet_likes)))
             try:
                 # User can either choose to like/unlike a tweet or return to the main menu.
                 leave = input("Enter yes if you'd like to like/unlike a tweet or hit Enter key to return to main menu: ")
                 if leave.upper() == "YES":
                     tweetToLike = int(input("Enter tweet id to like/unlike: "))
                     # If the tweet is already liked, give the user the option to unlike.
-                    if tweetToLike in tweet_ids:
+                    # This is checked in the database, so a like made in another
+                    # session is found as well.
+                    if store.has_liked(current_userid, tweetToLike):
                         while True:
                             print("Are you sure you want to unlike that tweet?")
                             choice = input("yes/no: ")
                             # If the user unlikes the tweet, the database is updated.
                             if choice.upper() == "YES":
-                                cursor.execute('''DELETE FROM likes_retweets WHERE user_id =? AND tweet_id=?''',
-                                               (current_userid,tweetToLike))
-                                unliked_id = tweet_ids.index(tweetToLike)
-                                del tweet_ids[unliked_id]
-                                del tweet_cont[unliked_id]
+                                store.unlike_tweet(current_userid, tweetToLike)
+                                if tweetToLike in tweet_ids:
+                                    unliked_id = tweet_ids.index(tweetToLike)
+                                    del tweet_ids[unliked_id]
+                                    del tweet_cont[unliked_id]
                                 print("unliked")       
                                 break  
                             elif choice.upper() == "NO":
@@ -384,168 +322,126 @@ while True:
                                 print("please select yes or no")
                     
                     # Or if the tweet is not liked but exists, like it.
-                    elif tweetToLike in tweet_verification: 
-                        cursor.execute('''INSERT INTO likes_retweets (like_retweet_id, user_id, tweet_id) VALUES (?,?,?)''',
-                                       (newest_id,current_userid,tweetToLike)) 
-                        cursor.execute('''SELECT tweet_content 
-                                       FROM tweets WHERE tweet_id = ?''',
-                                       (tweetToLike,))
-                        tweet_cont.append(cursor.fetchone()[0])
+                    elif store.tweet_exists(tweetToLike): 
+                        store.like_tweet(current_userid, tweetToLike)
+                        tweet_cont.append(store.get_tweet(tweetToLike)[0])
                         tweet_ids.append(tweetToLike)
-                        newest_id +=1  
                     else:
                         print("Not an existing tweet")
-                        time.sleep(pausetime)
+                        pause()
                 
                 else:
                     print("returning to main menu")
                        
-                conn.commit()
-                time.sleep(pausetime)
+                pause()
                 break
             
-            except ValueError or TypeError:
+            except (ValueError, TypeError, OverflowError):
                 print("please enter a valid tweet id")
 
     # Code that handles if a user wishes to follow another user.
     elif choice == 4:
+        # Suggest people to follow: the people followed by the people the user
+        # follows, and the user's followers who aren't followed back yet.
+        recommended = store.recommended_users(current_userid)
+        if recommended:
+            print("People you may want to follow:")
+            for suggestion in recommended:
+                details = list()
+                if suggestion[1]:
+                    details.append("followed by " + str(suggestion[1]) + " people you follow")
+                if suggestion[2]:
+                    details.append("follows you")
+                print("   ", suggestion[0], "(" + ", ".join(details) + ")")
         # Ask the user for the username of the account they want to follow.
         UserToFollow = input("Enter username of user you wish to follow: ")
+        follow_result = store.follow_user(current_userid, UserToFollow)
         # Handle case where the user tries to follow themselves.
-        cursor.execute('''SELECT user_id 
-                       FROM user_profiles 
-                       WHERE username = ? AND user_id =?''', 
-                       (UserToFollow, current_userid,))
-        followingthemselves = cursor.fetchone()
-        # If the query produced an output, that means they are trying to follow themselves.
-        if followingthemselves: 
+        if follow_result == FOLLOWING_SELF:
             print("Nice try! You can't follow yourself.")
-            time.sleep(pausetime)
-            pass
-        else:
-            # Retrieve the User ID of the user to follow from the user_profiles table
-            cursor.execute('''SELECT user_id FROM user_profiles 
-                           WHERE username = ? AND user_id != ?''', 
-                           (UserToFollow, current_userid)) 
-            user_id_to_follow = cursor.fetchone()
-            # Check if the user is in the system.
-            if user_id_to_follow is None:
-                print("That user doesn't exist! Try again.")
-                time.sleep(pausetime)
-            else:
-                # Check if the follow relationship already exists.
-                user_id_to_follow = user_id_to_follow[0]
-                cursor.execute('''SELECT * 
-                               FROM followers_following 
-                               WHERE follower_user_id = ? AND following_user_id = ?''', 
-                               (current_userid, user_id_to_follow))
-                existing_follow = cursor.fetchone()
-                # If it returns an output, that means the follower/following relationship exists between the users already.
-                if existing_follow is not None: 
-                    print("You are already following this user")
-                    time.sleep(pausetime)
-                else:
-                    # Checking/updating the follow_id pk val.
-                    cursor.execute('''SELECT MAX(follow_id) FROM followers_following''')
-                    follow_id = cursor.fetchone()
-                    if follow_id[0] is not None:
-                        follow_id = follow_id[0] + 1
-                    else:
-                        follow_id = 1
-                    # Insert a new record into the follower_following table to record the user following an account.
-                    cursor.execute('''INSERT INTO followers_following (follow_id, follower_user_id, following_user_id) 
-                                   VALUES (?, ?, ?)''', (follow_id, current_userid, user_id_to_follow))
-                    print("Followed!")
-                    time.sleep(pausetime)
-                    conn.commit()
+        # Check if the user is in the system.
+        elif follow_result == USER_NOT_FOUND:
+            print("That user doesn't exist! Try again.")
+        # The follower/following relationship exists between the users already.
+        elif follow_result == ALREADY_FOLLOWING:
+            print("You are already following this user")
+        # Otherwise the follow was recorded and the followed user's recent
+        # tweets were added to the current user's home timeline.
+        elif follow_result == FOLLOWED:
+            print("Followed!")
+        pause()
     
     # Code that handles if a user wishes to unfollow another user.
     elif choice == 5:
         # ASk the user for the username of the account they wish to unfollow.
         UserToUnfollow = input("Enter username of user you wish to unfollow: ")
-
-        # Retrieve the User ID of the user to follow from the user_profiles table
-        cursor.execute('''SELECT user_id from user_profiles WHERE username =?''', 
-                       (UserToUnfollow,))
-        user_id_to_unfollow = cursor.fetchone()
-         # Check if the user is in the system - if the previous query did not produce an output,
-         # that means there is no user with that user id in the database.
-        if user_id_to_unfollow is None:
+        unfollow_result = store.unfollow_user(current_userid, UserToUnfollow)
+        # Check if the user is in the system.
+        if unfollow_result == USER_NOT_FOUND:
             print("That user doesn't exist! Try again.")
-            time.sleep(pausetime)
+        # The user was removed from the users the current user follows, and
+        # their tweets were removed from the current user's home timeline.
+        elif unfollow_result == UNFOLLOWED:
+            print("Unfollowed!")
+        # Otherwise they are already not following this person.
         else:
-        # Check if the user is already NOT following the user they wish to unfollow.
-            user_id_to_unfollow = user_id_to_unfollow[0]
-            cursor.execute('''SELECT * FROM followers_following
-                           WHERE follower_user_id = ? AND following_user_id = ?''', 
-                           (current_userid, user_id_to_unfollow))
-            notfollowing = cursor.fetchone()
-            # If it does not return an output, that means they are already not following this person.
-            if notfollowing is None: 
-                print("You are already not following this user")
-                time.sleep(pausetime)
-            else:
-                # Remove the association with the current user following the user that 
-                # they want to unfollow by removing the record from the followers_following table
-                cursor.execute('''DELETE FROM followers_following 
-                               WHERE follower_user_id = ? AND following_user_id = ?''', 
-                               (current_userid, user_id_to_unfollow))
-                print("Unfollowed!")
-                time.sleep(pausetime)
-                conn.commit()
+            print("You are already not following this user")
+        pause()
 
     # Code that allows users to view a list of their followers as well as who they are following.
     elif choice == 6:
-        print("Do you want to view your followers or who you are following?")
-        choice = input("Followers/Following: ")
-        # If the user chooses to view their followers, query the database to pull 
-        # the usernames where the logged on user_id matches the following_user_id in the followers_following table
-        if choice.upper() == "FOLLOWERS":
-            cursor.execute('''SELECT username 
-                           FROM user_profiles 
-                           INNER JOIN followers_following 
-                           ON user_profiles.user_id = follower_user_id
-                           WHERE following_user_id = ?''',
-                           (current_userid,))
-            followers = cursor.fetchall()
-            print("\nFollowers:\n")
-            # Print a list of all followers from the query output
-            for follower in followers:
-                print(follower[0])
-            conn.commit()
+        # The counts are kept up to date as users follow and unfollow, so they
+        # are read without counting the follows.
+        follow_counts = store.follow_counts(current_userid)
+        print("You have", follow_counts[0], "followers and are following", follow_counts[1], "users.")
+        print("Do you want to view your followers, who you are following, or check whether you and another user follow each other?")
+        choice = input("Followers/Following/Check: ")
+        # The followers or followed users are shown one page at a time; each page
+        # only asks for the users after the last one shown, so a long list is
+        # never read or printed all at once.
+        if choice.upper() in ["FOLLOWERS", "FOLLOWING"]:
+            if choice.upper() == "FOLLOWERS":
+                print("\nFollowers:\n")
+                read_page = store.followers_page
+            else:
+                print("\nFollowing: \n")
+                read_page = store.following_page
+            users_shown = show_pages(lambda page_number, last_user:
+                                     read_page(current_userid, last_user[0] if last_user else 0),
+                                     lambda page: render_usernames([user[1] for user in page]),
+                                     FOLLOW_PAGE_SIZE)
+            if users_shown == 0:
+                print("Nobody yet.")
             choice = input("\nHit Enter key to return to the main menu")
-            # If the user chooses to view who they are currently following, 
-            # query the database to pull the usernames where the logged on user_id
-            # matches the follower_user_id in the followers_following table.
-        elif choice.upper() == "FOLLOWING": 
-            cursor.execute('''SELECT username 
-                           FROM user_profiles 
-                           INNER JOIN followers_following 
-                           ON user_profiles.user_id = following_user_id 
-                           WHERE follower_user_id = ?''', 
-                           (current_userid,))
-            following = cursor.fetchall()
-            print("\nFollowing: \n")
-            # Print the list of all usernames that the logged on user is following.
-            for user in following:
-                print(user[0])
-            conn.commit()
+        # Check whether the user follows another user, and whether they follow back.
+        elif choice.upper() == "CHECK":
+            other_username = input("Enter username: ")
+            other_userid = store.get_user_id(other_username)
+            if other_userid is None:
+                print("That user doesn't exist! Try again.")
+            else:
+                print("You follow", other_username + ":", "Yes" if store.is_following(current_userid, other_userid) else "No")
+                print(other_username, "follows you:", "Yes" if store.is_following(other_userid, current_userid) else "No")
             choice = input("\nHit Enter key to return to the main menu")
-        # Handle case where user does not correctly type 'following' or 'followers'.
+        # Handle case where user does not correctly type 'following', 'followers' or 'check'.
         else:
             print("That is not an option. Try again")
-            time.sleep(pausetime)
+            pause()
 
     # Code that allows users to get more information regarding specific user menu options
     elif choice == 7:
         print("1. Will allow you to post a tweet to Twitterlike")
-        print("2. Will show you all the tweets of people you're following with the newest first. It will also allow you to view and add comment on a specific tweet afterwards")
+        print("2. Will show you the most recent tweets of people you're following with the newest first, one page at a time. It will also allow you to view and add comment on a specific tweet afterwards")
         print("3. Will show you all your currently liked tweets, then let you like or unlike a tweet")
-        print("4. Will let you follow someone by entering their username")
+        print("4. Will suggest people you may want to follow, then let you follow someone by entering their username")
         print("5. Will let you unfollow someone by entering their username")
-        print("6. Will show you all your followers or people you're following")
+        print("6. Will show you how many followers you have and how many people you follow, then list them one page at a time, or check whether you and another user follow each other")
         print("8. Will exit twitterlike,")
-        print("9. Will show you all your tweets and let you comment on them too")
+        print("9. Will show you all your tweets, one page at a time, and let you comment on them too")
+        print("10. Will let you search all tweets or comments for words, showing the best matches first")
+        print("11. Will show you the tweets with a hashtag, such as #python, with the newest first, one page at a time")
+        print("12. Will show you the tweets that mention you with @" + username + ", with the newest first, one page at a time")
+        print("13. Will show you the most liked tweets and the most used hashtags of the last hour or day")
         print("Make sure you're entering the correct information, for example, if you're asked for a tweet id, enter a tweet id number")
         choice = input("\nHit Enter key to return to the main menu")
 
@@ -554,94 +450,122 @@ while True:
         print("\n")
         print(username,"'s Profile\n")
         # Retrieving all tweets logged in user has tweeted/interacted with in descending order of time stamp.
-        cursor.execute('''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content 
-                       FROM tweets 
-                       INNER JOIN user_profiles ON user_profiles.user_id = tweets.user_id 
-                       WHERE user_profiles.user_id = ? 
-                       ORDER BY tweets.tweet_id DESC ''',
-                       (current_userid,))
-        tweets = cursor.fetchall()
-        # Creating the timeline.
-        users = list()
-        tweetid = list()
-        tweetcontent = list()
-        numberlikes = list()
-        # Combining the retrieved columns into a list.
-        for tweet in tweets:
-            users.append(tweet[0])
-            tweetid.append(tweet[1])
-            tweetcontent.append(tweet[2])
-        profile = [users,tweetid,tweetcontent]
+        # The like and comment counts are read from tweet_stats in the same query, and the
+        # tweets are shown one page at a time, as in the timeline.
+        tweets_shown = show_pages(lambda page_number, last_tweet:
+                                  store.user_tweets_page(current_userid, last_tweet and last_tweet[1]),
+                                  render_tweets)
 
         # If user hasn't tweeted yet: 
-        if not tweets:
+        if tweets_shown == 0:
             print("Oh no! Looks like you haven't tweeted yet. Let's take you back to the main list so you can change that. Happy Tweeting!")
-            time.sleep(5)
+            pause(5)
             pass
-        # Retrieving the count of likes for all of user's tweets.
+        # Once the user is done reading their tweets, they can open one of them.
         else:
-            for tweet in profile[1]:
-                cursor.execute('''SELECT COUNT(tweet_id) 
-                               FROM likes_retweets 
-                               WHERE tweet_id =? ''',
-                               (tweet,))
-                numberlikes.append(cursor.fetchone()[0])
-            profile.append(numberlikes)
-            
-            for tweet in range(len(profile[0])):
-                print(profile[0][tweet],"( Tweet ID:",profile[1][tweet],")")
-                print("   ",profile[2][tweet])
-                print(emoji.emojize(':thumbs_up:'), profile[3][tweet], "\n")
-
             # Retrieving a tweet id from user to view all the comments for that tweet.
             view_tweets = input("Would you like to view a tweet in more detail? Enter Yes to view tweet. or enter anything else to return to main menu: ")
             if view_tweets.upper() == "YES": # user chooses to view tweet in more detail.
                 try:
                     # Ask user for the tweet that they are interested in.
-                    selected_tweet_id = input("Enter the tweet ID to view/add comments: ")
-                    if int(selected_tweet_id) in tweetid:
-                        cursor.execute('''SELECT tweet_content 
-                                       FROM tweets WHERE tweet_id = ?''', 
-                                       (selected_tweet_id,))
-                        selected_tweet = cursor.fetchone()
-                        # Retrieving all comments for the user inputted tweet id.
-                        if selected_tweet:
-                            print("\n", "Tweet: ", selected_tweet[0])
-                            # View existing comments on selected tweet.
-                            cursor.execute('''SELECT user_profiles.username, comment_text 
-                                           FROM comments 
-                                           INNER JOIN user_profiles ON comments.user_id = user_profiles.user_id
-                                           WHERE tweet_id = ?''',
-                                           (selected_tweet_id,))
-                            existing_comments = cursor.fetchall()
-                            if existing_comments:
-                                print("Comments:")
-                                for comment in existing_comments:
-                                    print(comment[0], ":", emoji.emojize(comment[1]))
-                            else:
-                                print("No comments yet.")
-                            # Allow a user to add a comment if they wish.
-                            # Add a comment or return to main menu.
-                            comment_options = input("Add a new comment or type 'Return' to exit: ")
-                            if comment_options.upper() == "RETURN":
-                                pass
-                            else:
-                                cursor.execute('''INSERT INTO comments (user_id, tweet_id, comment_text) 
-                                               VALUES (?, ?, ?)''', 
-                                               (current_userid, selected_tweet_id, comment_options))
-                                conn.commit()
-                        else: # When a user enters an invalid tweet id.
-                            print("Tweet not found.")
-                    else:
+                    selected_tweet_id = int(input("Enter the tweet ID to view/add comments: "))
+                    # Retrieving the tweet, which must be one of the user's own tweets.
+                    selected_tweet = store.get_tweet(selected_tweet_id, current_userid)
+                    # Retrieving all comments for the user inputted tweet id.
+                    if selected_tweet:
+                        print("\n", "Tweet: ", selected_tweet[0])
+                        # View existing comments on selected tweet, skipping the
+                        # query when the comment counter shows there are none.
+                        existing_comments = list()
+                        if selected_tweet[1] > 0:
+                            existing_comments = store.get_comments(selected_tweet_id)
+                        if existing_comments:
+                            print("Comments:")
+                            show(render_comments(existing_comments))
+                        else:
+                            print("No comments yet.")
+                        # Allow a user to add a comment if they wish.
+                        # Add a comment or return to main menu.
+                        comment_options = input("Add a new comment or type 'Return' to exit: ")
+                        if comment_options.upper() == "RETURN":
+                            pass
+                        else:
+                            store.add_comment(current_userid, selected_tweet_id, comment_options)
+                    else: # When a user enters a tweet id that is not one of theirs.
                         print("that's not one of your tweets")
-                except ValueError or TypeError:
+                except (ValueError, TypeError, OverflowError):
                     print("That is not a valid tweet id. Returning to main menu...")
-                    time.sleep(pausetime)
+                    pause()
+
+    # Allow a user to search the tweets or comments for words.
+    elif choice == 10:
+        print("Do you want to search tweets or comments?")
+        search_in = input("Tweets/Comments: ")
+        if search_in.upper() in ["TWEETS", "COMMENTS"]:
+            search_text = input("Enter the words to search for: ")
+            # The results containing all of the words are shown one page at a time,
+            # best match first.
+            if search_in.upper() == "TWEETS":
+                results_shown = show_pages(lambda page_number, last_result:
+                                           store.search_tweets(search_text, page_number),
+                                           render_tweets)
+            else:
+                results_shown = show_pages(lambda page_number, last_result:
+                                           store.search_comments(search_text, page_number),
+                                           render_search_comments)
+            if results_shown == 0:
+                print("No results found.")
+            choice = input("\nHit Enter key to return to the main menu")
+        # Handle case where user does not correctly type 'tweets' or 'comments'.
+        else:
+            print("That is not an option. Try again")
+            pause()
+
+    # Allow a user to view the tweets with a hashtag, or the tweets that mention them.
+    # Both are read from the hashtags and mentions tables, which record the tags
+    # of every tweet when it is posted, one page at a time as in the timeline.
+    elif choice == 11 or choice == 12:
+        if choice == 11:
+            tag = input("Enter the hashtag: #").strip().lstrip("#")
+            if not tag:
+                continue
+            read_page = lambda before_tweet_id: store.tagged_tweets_page(tag, before_tweet_id)
+        else:
+            read_page = lambda before_tweet_id: store.mentions_page(current_userid, before_tweet_id)
+        tweets_shown = show_pages(lambda page_number, last_tweet: read_page(last_tweet and last_tweet[1]),
+                                  render_tweets)
+        if tweets_shown == 0:
+            if choice == 11:
+                print("No tweets with #" + tag + " yet.")
+            else:
+                print("Nobody has mentioned you yet.")
+        choice = input("\nHit Enter key to return to the main menu")
+
+    # Allow a user to see what is trending. The counts are kept up to date as
+    # tweets are liked and posted, so only the top entries are read here.
+    elif choice == 13:
+        print("Do you want to see what is trending in the last hour or the last day?")
+        period = input("Hour/Day: ").lower()
+        if period in ["hour", "day"]:
+            print("\nTrending hashtags:")
+            trending_hashtags = store.trending_hashtags(period)
+            show(render_trending_hashtags(trending_hashtags))
+            if not trending_hashtags:
+                print("   Nothing yet.")
+            print("\nTrending tweets:")
+            trending_tweets = store.trending_tweets(period)
+            show(render_trending_tweets(trending_tweets, period))
+            if not trending_tweets:
+                print("   Nothing yet.")
+            choice = input("\nHit Enter key to return to the main menu")
+        # Handle case where user does not correctly type 'hour' or 'day'.
+        else:
+            print("That is not an option. Try again")
+            pause()
 
     # Exits the code if the user wishes to exit
     elif choice == 8:
-        conn.commit() # Commit all database changes.
-        conn.close() # Close the database connection.
+        store.close() # Commit all database changes and close the database connection.
         print("Goodbye,", username)
         exit() # terminate the program.
 
@@ -0,0 +1,86 @@
+################
+## Code Notes ##
+################
+# This file contains the connection factory used by both "CommandLineInterface.py"
+# and "DatabaseModuleStarter.py", so that every session opens the database with
+# the same settings. Many CLI sessions can use one twitter_like.db at the same
+# time, so the connections are tuned for concurrent use:
+# - WAL journal mode, so that readers do not block behind a writer (and the
+#   writer does not wait for readers)
+# - a busy timeout, so that a session waits for the write lock instead of
+#   failing straight away with "database is locked"
+# - synchronous=NORMAL, which in WAL mode is still safe against corruption and
+#   only risks losing the last commits on a power failure, not an application crash
+# - a larger page cache, memory mapped I/O and in-memory temporary tables
+# - foreign key enforcement, which SQLite leaves off unless every connection asks for it
+#
+# Write connections are used for anything that changes the database. Read-only
+# connections cannot write at all, which makes it safe to hand them to code that
+# only displays data.
+#
+# When the TWITTERLIKE_QUERY_STATS environment variable is set, connections are
+# opened with the instrumented connection class of "QueryStats.py", which times
+# every statement. It is only imported then, so it costs nothing otherwise.
+
+#### Start Program ####
+
+import os
+import sqlite3
+
+# The database file used by the program.
+DATABASE_PATH = "twitter_like.db"
+
+# How long a connection waits for a lock held by another session, in milliseconds.
+BUSY_TIMEOUT_MS = 5000
+# Page cache size per connection, in KiB (negative values are KiB for PRAGMA cache_size).
+CACHE_SIZE_KIB = 64 * 1024
+# How much of the database file is memory mapped, in bytes.
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+# Return the class connections are opened with: sqlite3.Connection, or the
+# instrumented connection when query statistics are on.
+def connection_class():
+    if not os.environ.get("TWITTERLIKE_QUERY_STATS"):
+        return sqlite3.Connection
+    from QueryStats import start_query_stats
+    return start_query_stats()
+
+
+# Apply the settings shared by read and write connections.
+def apply_pragmas(conn):
+    conn.execute("PRAGMA busy_timeout = %d" % BUSY_TIMEOUT_MS)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -%d" % CACHE_SIZE_KIB)
+    conn.execute("PRAGMA mmap_size = %d" % MMAP_SIZE)
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA foreign_keys = ON")
+
+
+# Open a connection that can read and write the database. WAL mode is stored in
+# the database file, so setting it here also applies to the read-only connections.
+def get_write_connection(path=DATABASE_PATH):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, factory=connection_class())
+    conn.execute("PRAGMA journal_mode = WAL")
+    apply_pragmas(conn)
+    return conn
+
+
+# Return a read-only SQLite URI for a database file. Only "%", "?" and "#" have
+# to be escaped in the path of a SQLite URI, so this is done here rather than
+# importing urllib, which is slow to import.
+def read_only_uri(path):
+    path = os.path.abspath(path).replace(os.sep, "/")
+    path = path.replace("%", "%25").replace("?", "%3f").replace("#", "%23")
+    if not path.startswith("/"):
+        path = "/" + path # Windows paths start with the drive letter.
+    return "file://%s?mode=ro" % path
+
+
+# Open a connection that can only read the database. The database must already
+# exist; use get_write_connection to create it.
+def get_read_connection(path=DATABASE_PATH):
+    uri = read_only_uri(path)
+    conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000, factory=connection_class())
+    apply_pragmas(conn)
+    return conn
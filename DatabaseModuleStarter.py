@@ -1,222 +1,857 @@
-################
-## Code Notes ##
-################
-# All code in this file has been written by Alan Fang, Ana Marie Peric, and Nolan Moody.
-# This code must be run in order to successfully interact with the
-# other file provided and contains the logic for creating and
-# populating our twitterlike database with initial data.
-
-# flask_bcrpyt must be installed prior to running this code.
-# Please run the following command in your terminal:
-# pip install flask_bcrypt
-
-#### Start Program ####
-
-import sqlite3
-from flask_bcrypt import Bcrypt
-# Initialize a new instance of Bcrypt for hashing.
-bcrypt = Bcrypt()
-# Create a new SQLite database (or connect to an existing one).
-
-# Try connecting to the database. 
-try:
-    conn = sqlite3.connect("twitter_like.db")
-    # Create a cursor object to interact with the database.
-    cursor = conn.cursor()
-    # Create a new datase if it doesn't exist.
-except sqlite3.OperationalError:
-    # Create a new database if it doesn't exist.
-    conn = sqlite3.connect("twitter_like.db")
-    cursor = conn.cursor()
-
-# Turn on foreign key constraints to enforce referential integrity.
-cursor.execute("PRAGMA foreign_keys = ON")
-
-# Create a table for user profiles.
-# user_id is the primary key, and username and password
-# are required fields. The other information is optional
-# and can be null. A timestamp is created automatically
-# everytime a new user is inserted into the table.
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS user_profiles 
-(user_id INTEGER PRIMARY KEY,
-username TEXT UNIQUE NOT NULL,
-password TEXT NOT NULL,
-full_name TEXT NOT NULL,
-email TEXT,
-profile_image TEXT,
-registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
-''')
-
-# Create a table for tweets.
-# tweet_id is the primary key, and user_id
-# is the foreign key pointing to the user 
-# profiles table. The tweet must contain
-# text and so cannot be null. A timestamp is
-# automatically created everytime a tweet
-# is insterted into the table.
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS tweets 
-(tweet_id INTEGER PRIMARY KEY,
-user_id INTEGER NOT NULL,
-tweet_content TEXT NOT NULL,
-creation_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-FOREIGN KEY (user_id)
-    REFERENCES user_profiles(user_id));
-''')
-
-# Create a table for followers/following.
-# follow_id is the priamry key, and the 
-# follower_user_id and following_user_id 
-# are foreign keys pointing back to the
-# user_profiles table.
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS followers_following
-(follow_id INTEGER PRIMARY KEY,
-follower_user_id INTEGER NOT NULL,
-following_user_id INTEGER NOT NULL,
-FOREIGN KEY (follower_user_id)
-    REFERENCES user_profiles (user_id),
-FOREIGN KEY (following_user_id)
-    REFERENCES user_profiles (user_id));
-''')
-
-# Create a table for likes/retweets.
-# like_retweet_id is the primary key,
-# and user_id is a foreign key that
-# points to the user profiles table.
-# tweet_id is also a foreign key that 
-# points to the tweet table. 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS likes_retweets
-(like_retweet_id INTEGER PRIMARY KEY,
-user_id INTEGER NOT NULL,
-tweet_id INTEGER NOT NULL,
-FOREIGN KEY (user_id)
-    REFERENCES user_profiles (user_id),
-FOREIGN KEY (tweet_id)
-    REFERENCES tweets (tweet_id));
-''')
-
-# Create a table for comments.
-# comment_id is the primary key,
-# and user_id is a foreign key that
-# points to the user profiles table.
-# tweet_id is also a foreign key
-# that points to the tweet table.
-# a timestamp for the comment is
-# automaticaly created everytime a new 
-# comment is added to a tweet.
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS comments
-(comment_id INTEGER PRIMARY KEY,
-user_id INTEGER NOT NULL,
-tweet_id INTEGER NOT NULL,
-comment_text TEXT NOT NULL,
-comment_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-FOREIGN KEY (user_id)
-    REFERENCES user_profiles (user_id),
-FOREIGN KEY (tweet_id)
-    REFERENCES tweets (tweet_id));
-''')
-
-# Insert initial data into the tables upon initialization of the database.
-# Password hashing is used so that the passwords stored in the database 
-# do not appear in their original form. This also allows those testing
-# the program to log in as one of these already created users if they wish.
-password1 = "admin"
-password2 = "hey123!"
-password3 = "aushgh213$"
-password4 = "aue734$"
-password5 = "wgksh643!"
-password6 = "hey123!"
-
-hashed_passwords = (
-    bcrypt.generate_password_hash(password1),
-    bcrypt.generate_password_hash(password2),
-    bcrypt.generate_password_hash(password3),
-    bcrypt.generate_password_hash(password4),
-    bcrypt.generate_password_hash(password5),
-    bcrypt.generate_password_hash(password6))
-try:
-    cursor.execute('''INSERT INTO user_profiles (user_id, username, password, full_name) \
-                VALUES 
-               (1, "admin", ?, "admin"),
-               (2, "Nolan", ?, "Nolan"),
-               (3, "Ana",?,"Ana"),
-               (4, "Alan", ?,"Alan"),
-               (5, "DataRox", ?, "Joe Smith"),
-               (6, "PythonEnthusiast",?, "Ken Henry")''',
-               (hashed_passwords))
-
-    cursor.execute('''INSERT INTO tweets (tweet_id, user_id, tweet_content) \
-               VALUES 
-               (1, 5, "I consider myself a data pro"),
-               (2, 5, "I accidentally deleted the project i've been working on for 36 hours..."),
-               (3, 5, "comment so i feel validated please"),
-               (4, 2, "First tweet ever. Hey ya'll"),
-               (5, 4, "so mad at my wifi right now..."),
-               (6, 3, "UberEats > paying off my student loans"),
-               (7, 3, "why am i the way that i am"),
-               (8, 4, "why don't we still know where the pyramids came from? What's your theory?"),
-               (9, 5, "i can't catch up on sleep"),
-               (10, 2, "What's everyone's favourite thing about Twitter?"),
-               (11, 6, "Starbucks Christmas drinks are back"),
-               (12, 6, "Why did the python programmer go broke? Because he missed too many commas."),
-               (13, 5, "I told my wife she should embrace her mistakes. She gave me a hug"),
-               (14, 3, "What's everyone's favourite song right now?"),
-               (15, 6, "More money more problems")''')
-
-    cursor.execute('''INSERT INTO followers_following (follow_id, follower_user_id, following_user_id) \
-               VALUES 
-               (1, 5, 2),
-               (2, 5, 3),
-               (3, 5, 6),
-               (4, 2, 4),
-               (5, 2, 6),
-               (6, 2, 3),
-               (7, 3, 2),
-               (8, 3, 4),
-               (9, 3, 6),
-               (10, 4, 2),
-               (11, 4, 3),
-               (12, 4, 5),
-               (13, 6, 5),
-               (14, 6, 4),
-               (15, 6, 3)''')
-
-    cursor.execute('''INSERT INTO likes_retweets (like_retweet_id, user_id, tweet_id) \
-               VALUES 
-               (1, 5, 8),
-               (2, 5, 6),
-               (3, 5, 10),
-               (4, 2, 8),
-               (5, 2, 6),
-               (6, 2, 4),
-               (7, 3, 8),
-               (8, 3, 15),
-               (9, 3, 4),
-               (10, 4, 8),
-               (11, 4, 4),
-               (12, 4, 5),
-               (13, 6, 8),
-               (14, 6, 13),
-               (15, 6, 3)''')
-
-    cursor.execute('''INSERT INTO comments (comment_id, user_id, tweet_id, comment_text) \
-               VALUES 
-               (1, 6, 1, "ehem... i believe that would be me."),
-               (2, 3, 8, "this exact thought keeps me up a lot at night..."),
-               (3, 2, 2, "try 'ctrl' z"),
-               (4, 3, 12, "ha."),
-               (5, 4, 11, "literally no one cares."),
-               (6, 5, 4, "Welcome, Nolan!"),
-               (7, 5, 6, "i approve"),
-               (8, 6, 4, "Welcome!"),
-               (9, 6, 3, "validation, check."),
-               (10, 2, 8, "aliens.")''')
-except:
-    print("Database and users already exist")
-#commit the changes and close the connection
-conn.commit()
-conn.close()
+################
+## Code Notes ##
+################
+# All code in this file has been written by Alan Fang, Ana Marie Peric, and Nolan Moody.
+# This code must be run in order to successfully interact with the
+# other file provided and contains the logic for creating and
+# populating our twitterlike database with initial data.
+
+# flask_bcrpyt must be installed prior to running this code (see "PasswordHashing.py").
+# Please run the following command in your terminal:
+# pip install flask_bcrypt
+
+#### Start Program ####
+
+from HomeTimeline import rebuild_home_timelines
+from DatabaseConnection import DATABASE_PATH, get_write_connection
+from PasswordHashing import hash_passwords
+from EmojiText import backfill_emoji
+from TweetSearch import rebuild_search_index
+from TweetTags import index_existing_tweets
+from Trending import rebuild_trending
+
+# The schema is built up by a list of numbered migrations. The number of the
+# last migration applied is stored in the database itself (PRAGMA user_version),
+# so running this file, or starting the CLI, against an existing twitter_like.db
+# upgrades it in place by applying only the migrations it is missing. New schema
+# changes must be added as a new migration at the end of MIGRATIONS rather than
+# by editing an existing one.
+
+# Create all of the TwitterLike tables on the given cursor by applying every
+# migration the database does not have yet. This is kept in a function so that
+# other modules (such as the benchmarks) can build a database with exactly the
+# same schema.
+def create_tables(cursor):
+    migrate_database(cursor)
+
+# Return the schema version recorded in the database. Databases created before
+# migrations were introduced report version 0.
+def get_schema_version(cursor):
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+# Apply every migration newer than the database's schema version, in order.
+# Each migration and the update of the version number run in one transaction,
+# so an interrupted upgrade can simply be run again. The transaction takes the
+# write lock before the version is read again, so when several sessions start
+# against an old database at once, each migration is applied by only one of
+# them and the others skip it.
+def migrate_database(cursor):
+    cursor.connection.commit()
+    current_version = get_schema_version(cursor)
+    for version, description, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            current_version = get_schema_version(cursor)
+            if version > current_version:
+                migration(cursor)
+                cursor.execute("PRAGMA user_version = %d" % version)
+                current_version = version
+            cursor.execute("COMMIT")
+        except:
+            cursor.execute("ROLLBACK")
+            raise
+
+# Migration 1: create the original tables. They use IF NOT EXISTS, so this is
+# also safe on databases that were created before migrations existed.
+def create_base_tables(cursor):
+    # Create a table for user profiles.
+    # user_id is the primary key, and username and password
+    # are required fields. The other information is optional
+    # and can be null. A timestamp is created automatically
+    # everytime a new user is inserted into the table.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_profiles 
+    (user_id INTEGER PRIMARY KEY,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    email TEXT,
+    profile_image TEXT,
+    registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    ''')
+
+    # Create a table for tweets.
+    # tweet_id is the primary key, and user_id
+    # is the foreign key pointing to the user 
+    # profiles table. The tweet must contain
+    # text and so cannot be null. A timestamp is
+    # automatically created everytime a tweet
+    # is insterted into the table.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tweets 
+    (tweet_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    tweet_content TEXT NOT NULL,
+    creation_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles(user_id));
+    ''')
+
+    # Create a table for followers/following.
+    # follow_id is the priamry key, and the 
+    # follower_user_id and following_user_id 
+    # are foreign keys pointing back to the
+    # user_profiles table.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS followers_following
+    (follow_id INTEGER PRIMARY KEY,
+    follower_user_id INTEGER NOT NULL,
+    following_user_id INTEGER NOT NULL,
+    FOREIGN KEY (follower_user_id)
+        REFERENCES user_profiles (user_id),
+    FOREIGN KEY (following_user_id)
+        REFERENCES user_profiles (user_id));
+    ''')
+
+    # Create a table for likes/retweets.
+    # like_retweet_id is the primary key,
+    # and user_id is a foreign key that
+    # points to the user profiles table.
+    # tweet_id is also a foreign key that 
+    # points to the tweet table. 
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS likes_retweets
+    (like_retweet_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles (user_id),
+    FOREIGN KEY (tweet_id)
+        REFERENCES tweets (tweet_id));
+    ''')
+
+    # Create a table for comments.
+    # comment_id is the primary key,
+    # and user_id is a foreign key that
+    # points to the user profiles table.
+    # tweet_id is also a foreign key
+    # that points to the tweet table.
+    # a timestamp for the comment is
+    # automaticaly created everytime a new 
+    # comment is added to a tweet.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS comments
+    (comment_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    comment_text TEXT NOT NULL,
+    comment_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles (user_id),
+    FOREIGN KEY (tweet_id)
+        REFERENCES tweets (tweet_id));
+    ''')
+
+# Migration 2: create the tweet_stats table, which stores the number of likes and
+# comments for every tweet so that they can be read with a single primary
+# key lookup instead of being counted on every view. The counters are kept
+# exact by triggers, so every write path (the CLI, the seed data, or any
+# other program) updates them in the same transaction as the like or
+# comment itself. When the table is added to an existing database it is
+# filled in from the current likes and comments.
+def create_tweet_stats(cursor):
+    cursor.execute('''SELECT name FROM sqlite_master 
+                   WHERE type = 'table' AND name = 'tweet_stats' ''')
+    already_exists = cursor.fetchone() is not None
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tweet_stats
+    (tweet_id INTEGER PRIMARY KEY,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (tweet_id)
+        REFERENCES tweets (tweet_id));
+    ''')
+
+    # Every new tweet starts with zero likes and comments.
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweet_stats_tweet_insert
+    AFTER INSERT ON tweets
+    BEGIN
+        INSERT OR IGNORE INTO tweet_stats (tweet_id) VALUES (NEW.tweet_id);
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweet_stats_tweet_delete
+    AFTER DELETE ON tweets
+    BEGIN
+        DELETE FROM tweet_stats WHERE tweet_id = OLD.tweet_id;
+    END;
+    ''')
+
+    # Liking and unliking a tweet.
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweet_stats_like_insert
+    AFTER INSERT ON likes_retweets
+    BEGIN
+        INSERT INTO tweet_stats (tweet_id, like_count) VALUES (NEW.tweet_id, 1)
+        ON CONFLICT (tweet_id) DO UPDATE SET like_count = like_count + 1;
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweet_stats_like_delete
+    AFTER DELETE ON likes_retweets
+    BEGIN
+        UPDATE tweet_stats SET like_count = like_count - 1 WHERE tweet_id = OLD.tweet_id;
+    END;
+    ''')
+
+    # Adding and removing a comment.
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweet_stats_comment_insert
+    AFTER INSERT ON comments
+    BEGIN
+        INSERT INTO tweet_stats (tweet_id, comment_count) VALUES (NEW.tweet_id, 1)
+        ON CONFLICT (tweet_id) DO UPDATE SET comment_count = comment_count + 1;
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweet_stats_comment_delete
+    AFTER DELETE ON comments
+    BEGIN
+        UPDATE tweet_stats SET comment_count = comment_count - 1 WHERE tweet_id = OLD.tweet_id;
+    END;
+    ''')
+
+    if not already_exists:
+        rebuild_tweet_stats(cursor)
+
+# Migration 3: create the tables for the materialized home timeline (see "HomeTimeline.py").
+# home_timeline holds the ids of the most recent tweets from the accounts each
+# user follows, with (user_id, tweet_id) as the primary key so that a timeline
+# is read with one range scan. home_timeline_exempt lists the accounts with too
+# many followers to fan out, whose tweets are merged in when reading instead.
+# When the tables are added to an existing database the timelines are built
+# from the current follows and tweets.
+def create_home_timeline(cursor):
+    cursor.execute('''SELECT name FROM sqlite_master 
+                   WHERE type = 'table' AND name = 'home_timeline' ''')
+    already_exists = cursor.fetchone() is not None
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS home_timeline
+    (user_id INTEGER NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, tweet_id),
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles (user_id),
+    FOREIGN KEY (tweet_id)
+        REFERENCES tweets (tweet_id)) WITHOUT ROWID;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS home_timeline_exempt
+    (user_id INTEGER PRIMARY KEY,
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles (user_id));
+    ''')
+
+    if not already_exists:
+        rebuild_home_timelines(cursor)
+
+# Migration 4: add the indexes used by the queries in "CommandLineInterface.py"
+# so that none of them has to scan a whole table.
+# - follows by follower: "already following?" checks, the following list and the timeline
+# - follows by followed user: the followers list and fanning out new tweets
+# - likes by tweet: like counts; likes by user: the liked tweets view and unliking
+# - comments by tweet: showing the comments on a tweet
+# - tweets by author: the profile view and backfilling the timeline after a follow
+# The follow and like indexes include both columns so they cover their queries.
+def create_indexes(cursor):
+    cursor.execute('''CREATE INDEX IF NOT EXISTS followers_following_follower 
+                   ON followers_following (follower_user_id, following_user_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS followers_following_following 
+                   ON followers_following (following_user_id, follower_user_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS likes_retweets_tweet 
+                   ON likes_retweets (tweet_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS likes_retweets_user 
+                   ON likes_retweets (user_id, tweet_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS comments_tweet 
+                   ON comments (tweet_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS tweets_user 
+                   ON tweets (user_id, tweet_id)''')
+
+# Migration 5: keep the number of entries in each home timeline in
+# home_timeline_sizes, maintained by triggers, so that capping the timelines
+# after a new tweet is fanned out does not have to count or walk them.
+def create_home_timeline_sizes(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS home_timeline_sizes
+    (user_id INTEGER PRIMARY KEY,
+    entries INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles (user_id));
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS home_timeline_sizes_insert
+    AFTER INSERT ON home_timeline
+    BEGIN
+        INSERT INTO home_timeline_sizes (user_id, entries) VALUES (NEW.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET entries = entries + 1;
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS home_timeline_sizes_delete
+    AFTER DELETE ON home_timeline
+    BEGIN
+        UPDATE home_timeline_sizes SET entries = entries - 1 WHERE user_id = OLD.user_id;
+    END;
+    ''')
+    rebuild_home_timeline_sizes(cursor)
+
+# Migration 6: add the token buckets of the login rate limiter (see
+# "LoginRateLimiter.py"). They are kept in the database so that the limits
+# hold across restarts and between sessions.
+def create_login_rate_limits(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS login_rate_limits
+    (bucket TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL)
+    WITHOUT ROWID;
+    ''')
+
+# Migration 7: keep the text of tweets and comments as typed next to the text
+# with emoji aliases converted (see "EmojiText.py"). Existing rows get NULL,
+# which marks them as not converted yet.
+def add_raw_text_columns(cursor):
+    cursor.execute('''ALTER TABLE tweets ADD COLUMN tweet_content_raw TEXT''')
+    cursor.execute('''ALTER TABLE comments ADD COLUMN comment_text_raw TEXT''')
+
+# Migration 8: add the full-text search indexes over tweets and comments (see
+# "TweetSearch.py"). They are external content FTS5 tables, kept in step with
+# the tweets and comments tables by triggers, and filled from them here.
+def create_search_index(cursor):
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts
+    USING fts5(tweet_content, content='tweets', content_rowid='tweet_id');
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweets_fts_insert
+    AFTER INSERT ON tweets
+    BEGIN
+        INSERT INTO tweets_fts (rowid, tweet_content) VALUES (NEW.tweet_id, NEW.tweet_content);
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweets_fts_delete
+    AFTER DELETE ON tweets
+    BEGIN
+        INSERT INTO tweets_fts (tweets_fts, rowid, tweet_content) VALUES ('delete', OLD.tweet_id, OLD.tweet_content);
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweets_fts_update
+    AFTER UPDATE OF tweet_content ON tweets
+    BEGIN
+        INSERT INTO tweets_fts (tweets_fts, rowid, tweet_content) VALUES ('delete', OLD.tweet_id, OLD.tweet_content);
+        INSERT INTO tweets_fts (rowid, tweet_content) VALUES (NEW.tweet_id, NEW.tweet_content);
+    END;
+    ''')
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts
+    USING fts5(comment_text, content='comments', content_rowid='comment_id');
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS comments_fts_insert
+    AFTER INSERT ON comments
+    BEGIN
+        INSERT INTO comments_fts (rowid, comment_text) VALUES (NEW.comment_id, NEW.comment_text);
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS comments_fts_delete
+    AFTER DELETE ON comments
+    BEGIN
+        INSERT INTO comments_fts (comments_fts, rowid, comment_text) VALUES ('delete', OLD.comment_id, OLD.comment_text);
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS comments_fts_update
+    AFTER UPDATE OF comment_text ON comments
+    BEGIN
+        INSERT INTO comments_fts (comments_fts, rowid, comment_text) VALUES ('delete', OLD.comment_id, OLD.comment_text);
+        INSERT INTO comments_fts (rowid, comment_text) VALUES (NEW.comment_id, NEW.comment_text);
+    END;
+    ''')
+    rebuild_search_index(cursor)
+
+# Migration 9: add the hashtag and mention index tables (see "TweetTags.py")
+# and index the tweets already in the database.
+def create_tag_tables(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS hashtags
+    (tag TEXT NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, tweet_id),
+    FOREIGN KEY (tweet_id)
+        REFERENCES tweets (tweet_id))
+    WITHOUT ROWID;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS mentions
+    (user_id INTEGER NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, tweet_id),
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles (user_id),
+    FOREIGN KEY (tweet_id)
+        REFERENCES tweets (tweet_id))
+    WITHOUT ROWID;
+    ''')
+    # Deleting a tweet removes it from the index tables.
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS tweet_tags_delete
+    AFTER DELETE ON tweets
+    BEGIN
+        DELETE FROM hashtags WHERE tweet_id = OLD.tweet_id;
+        DELETE FROM mentions WHERE tweet_id = OLD.tweet_id;
+    END;
+    ''')
+    index_existing_tweets(cursor, report=lambda line: None, commit=False)
+
+# Migration 10: add the trending tweet and hashtag counters (see
+# "Trending.py"), and keep the time of each like so that it can be counted in
+# the right bucket. Likes made before this have no time and are not counted.
+def create_trending_tables(cursor):
+    cursor.execute('''ALTER TABLE likes_retweets ADD COLUMN liked_at REAL''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS trending_periods
+    (period TEXT PRIMARY KEY,
+    first_bucket INTEGER NOT NULL)
+    WITHOUT ROWID;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tweet_trend_buckets
+    (bucket INTEGER NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    likes INTEGER NOT NULL,
+    PRIMARY KEY (bucket, tweet_id))
+    WITHOUT ROWID;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS hashtag_trend_buckets
+    (bucket INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    uses INTEGER NOT NULL,
+    PRIMARY KEY (bucket, tag))
+    WITHOUT ROWID;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS trending_tweets
+    (period TEXT NOT NULL,
+    tweet_id INTEGER NOT NULL,
+    likes INTEGER NOT NULL,
+    PRIMARY KEY (period, tweet_id))
+    WITHOUT ROWID;
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS trending_hashtags
+    (period TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    uses INTEGER NOT NULL,
+    PRIMARY KEY (period, tag))
+    WITHOUT ROWID;
+    ''')
+    # The top of each period is read in count order.
+    cursor.execute('''CREATE INDEX IF NOT EXISTS trending_tweets_likes
+                   ON trending_tweets (period, likes, tweet_id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS trending_hashtags_uses
+                   ON trending_hashtags (period, uses, tag)''')
+    rebuild_trending(cursor)
+
+# Migration 11: count every follow and unfollow in follow_graph_version, so
+# that an in-memory copy of the follow graph (see "FollowGraph.py") can tell
+# whether it is still up to date with a single lookup.
+def create_follow_graph_version(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS follow_graph_version
+    (id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL);
+    ''')
+    cursor.execute('''INSERT OR IGNORE INTO follow_graph_version (id, version) VALUES (1, 0)''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS follow_graph_version_insert
+    AFTER INSERT ON followers_following
+    BEGIN
+        UPDATE follow_graph_version SET version = version + 1 WHERE id = 1;
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS follow_graph_version_delete
+    AFTER DELETE ON followers_following
+    BEGIN
+        UPDATE follow_graph_version SET version = version + 1 WHERE id = 1;
+    END;
+    ''')
+
+# Migration 12: keep the number of followers and followed users of every
+# user in follow_counts (see "FollowPages.py"), maintained by triggers in the
+# same way as tweet_stats.
+def create_follow_counts(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS follow_counts
+    (user_id INTEGER PRIMARY KEY,
+    follower_count INTEGER NOT NULL DEFAULT 0,
+    following_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id)
+        REFERENCES user_profiles (user_id));
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS follow_counts_insert
+    AFTER INSERT ON followers_following
+    BEGIN
+        INSERT INTO follow_counts (user_id, following_count) VALUES (NEW.follower_user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET following_count = following_count + 1;
+        INSERT INTO follow_counts (user_id, follower_count) VALUES (NEW.following_user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET follower_count = follower_count + 1;
+    END;
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS follow_counts_delete
+    AFTER DELETE ON followers_following
+    BEGIN
+        UPDATE follow_counts SET following_count = following_count - 1 WHERE user_id = OLD.follower_user_id;
+        UPDATE follow_counts SET follower_count = follower_count - 1 WHERE user_id = OLD.following_user_id;
+    END;
+    ''')
+    rebuild_follow_counts(cursor)
+
+# Migration 13: allow a user to like a tweet only once. Duplicate likes left
+# by older versions are removed first, keeping the earliest, which also
+# corrects the like counts through the tweet_stats trigger; the trending
+# counters are recounted if any were removed. The (user_id, tweet_id) index is
+# then made unique, so a second like of the same tweet is ignored or refused
+# by the database, whichever session it comes from.
+def make_likes_unique(cursor):
+    cursor.execute('''DELETE FROM likes_retweets WHERE like_retweet_id NOT IN
+                   (SELECT MIN(like_retweet_id) FROM likes_retweets GROUP BY user_id, tweet_id)''')
+    if cursor.rowcount > 0:
+        rebuild_trending(cursor)
+    cursor.execute('''DROP INDEX IF EXISTS likes_retweets_user''')
+    cursor.execute('''CREATE UNIQUE INDEX likes_retweets_user ON likes_retweets (user_id, tweet_id)''')
+
+# Migration 14: log every follow and unfollow in follow_graph_changes under
+# the follow_graph_version it produced, so that an in-memory follow graph that
+# is behind can apply the changes it is missing instead of being rebuilt. The
+# triggers of migration 11 are replaced by ones that also write the log, and
+# only the last 100000 changes are kept; a graph further behind than that is
+# rebuilt.
+def create_follow_graph_changes(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS follow_graph_changes
+    (version INTEGER PRIMARY KEY,
+    follower_user_id INTEGER NOT NULL,
+    following_user_id INTEGER NOT NULL,
+    followed INTEGER NOT NULL);
+    ''')
+    cursor.execute('''DROP TRIGGER IF EXISTS follow_graph_version_insert''')
+    cursor.execute('''DROP TRIGGER IF EXISTS follow_graph_version_delete''')
+    for name, event, row, followed in (("follow_graph_version_insert", "INSERT", "NEW", 1),
+                                       ("follow_graph_version_delete", "DELETE", "OLD", 0)):
+        cursor.execute('''
+        CREATE TRIGGER %s
+        AFTER %s ON followers_following
+        BEGIN
+            UPDATE follow_graph_version SET version = version + 1 WHERE id = 1;
+            INSERT INTO follow_graph_changes (version, follower_user_id, following_user_id, followed)
+            VALUES ((SELECT version FROM follow_graph_version WHERE id = 1),
+                    %s.follower_user_id, %s.following_user_id, %d);
+            DELETE FROM follow_graph_changes
+            WHERE version <= (SELECT version FROM follow_graph_version WHERE id = 1) - 100000;
+        END;
+        ''' % (name, event, row, row, followed))
+
+# Migration 15: index the login rate limit buckets by when they were last
+# used, so that removing the buckets that have refilled completely
+# (prune_login_buckets in "LoginRateLimiter.py") does not read every bucket.
+def index_login_rate_limits(cursor):
+    cursor.execute('''CREATE INDEX IF NOT EXISTS login_rate_limits_updated_at ON login_rate_limits (updated_at)''')
+
+# Migration 16: allow a user to follow another only once. Duplicate follows
+# left by older versions are removed first, keeping the earliest, which also
+# corrects the follow counts through the follow_counts triggers. The removals
+# are logged as unfollows, which a follow graph replaying them would apply to
+# the follow that is kept, so the log is cleared and any graph that is behind
+# is rebuilt instead. The (follower_user_id, following_user_id) index is then
+# made unique, so a second follow of the same user is ignored or refused by
+# the database, whichever session it comes from.
+def make_follows_unique(cursor):
+    cursor.execute('''DELETE FROM followers_following WHERE follow_id NOT IN
+                   (SELECT MIN(follow_id) FROM followers_following GROUP BY follower_user_id, following_user_id)''')
+    if cursor.rowcount > 0:
+        cursor.execute('''DELETE FROM follow_graph_changes''')
+    cursor.execute('''DROP INDEX IF EXISTS followers_following_follower''')
+    cursor.execute('''CREATE UNIQUE INDEX followers_following_follower
+                   ON followers_following (follower_user_id, following_user_id)''')
+
+# The list of migrations as (version, description, function), oldest first.
+MIGRATIONS = [
+    (1, "Create the user, tweet, follow, like and comment tables", create_base_tables),
+    (2, "Add the tweet_stats like and comment counters", create_tweet_stats),
+    (3, "Add the materialized home timeline", create_home_timeline),
+    (4, "Add indexes for the CLI queries", create_indexes),
+    (5, "Track the size of each home timeline", create_home_timeline_sizes),
+    (6, "Add the login rate limit buckets", create_login_rate_limits),
+    (7, "Keep the raw text of tweets and comments", add_raw_text_columns),
+    (8, "Add full-text search over tweets and comments", create_search_index),
+    (9, "Add the hashtag and mention indexes", create_tag_tables),
+    (10, "Add the trending tweet and hashtag counters", create_trending_tables),
+    (11, "Count changes to the follow graph", create_follow_graph_version),
+    (12, "Add the follower and following counters", create_follow_counts),
+    (13, "Allow each user to like a tweet only once", make_likes_unique),
+    (14, "Log the changes to the follow graph", create_follow_graph_changes),
+    (15, "Index the login rate limit buckets by last use", index_login_rate_limits),
+    (16, "Allow each user to follow another only once", make_follows_unique),
+]
+
+# Recount the likes and comments of every tweet from scratch. This is used
+# to fill in the table the first time and to repair any drift found by
+# verify_tweet_stats.
+def rebuild_tweet_stats(cursor):
+    cursor.execute('''DELETE FROM tweet_stats''')
+    cursor.execute('''INSERT INTO tweet_stats (tweet_id, like_count, comment_count) 
+                   SELECT tweets.tweet_id, 
+                   (SELECT COUNT(*) FROM likes_retweets WHERE likes_retweets.tweet_id = tweets.tweet_id), 
+                   (SELECT COUNT(*) FROM comments WHERE comments.tweet_id = tweets.tweet_id) 
+                   FROM tweets''')
+
+# Recount the size of every home timeline from scratch.
+def rebuild_home_timeline_sizes(cursor):
+    cursor.execute('''DELETE FROM home_timeline_sizes''')
+    cursor.execute('''INSERT INTO home_timeline_sizes (user_id, entries) 
+                   SELECT user_id, COUNT(*) FROM home_timeline GROUP BY user_id''')
+
+# Recount the followers and followed users of every user from scratch.
+def rebuild_follow_counts(cursor):
+    cursor.execute('''DELETE FROM follow_counts''')
+    cursor.execute('''INSERT INTO follow_counts (user_id, follower_count, following_count)
+                   SELECT user_id, SUM(followers), SUM(following) FROM
+                   (SELECT following_user_id AS user_id, COUNT(*) AS followers, 0 AS following
+                    FROM followers_following GROUP BY following_user_id
+                    UNION ALL
+                    SELECT follower_user_id, 0, COUNT(*)
+                    FROM followers_following GROUP BY follower_user_id)
+                   GROUP BY user_id''')
+
+# Compare the stored counters against the real likes and comments. Returns a
+# list of (tweet_id, stored likes, actual likes, stored comments, actual comments)
+# for every tweet whose counters are wrong or missing.
+def verify_tweet_stats(cursor):
+    cursor.execute('''SELECT tweets.tweet_id, 
+                   tweet_stats.like_count, 
+                   (SELECT COUNT(*) FROM likes_retweets WHERE likes_retweets.tweet_id = tweets.tweet_id) AS actual_likes, 
+                   tweet_stats.comment_count, 
+                   (SELECT COUNT(*) FROM comments WHERE comments.tweet_id = tweets.tweet_id) AS actual_comments 
+                   FROM tweets 
+                   LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id 
+                   WHERE tweet_stats.tweet_id IS NULL 
+                   OR tweet_stats.like_count != actual_likes 
+                   OR tweet_stats.comment_count != actual_comments''')
+    return cursor.fetchall()
+
+# Populate the tables with the initial set of users, tweets, follows,
+# likes and comments.
+def seed_database(cursor):
+    # Insert initial data into the tables upon initialization of the database.
+    # Password hashing is used so that the passwords stored in the database 
+    # do not appear in their original form. This also allows those testing
+    # the program to log in as one of these already created users if they wish.
+    password1 = "admin"
+    password2 = "hey123!"
+    password3 = "aushgh213$"
+    password4 = "aue734$"
+    password5 = "wgksh643!"
+    password6 = "hey123!"
+
+    # The passwords are hashed in parallel, one per CPU core.
+    hashed_passwords = hash_passwords((password1, password2, password3,
+                                       password4, password5, password6))
+    try:
+        cursor.execute('''INSERT INTO user_profiles (user_id, username, password, full_name) \
+                    VALUES 
+                   (1, "admin", ?, "admin"),
+                   (2, "Nolan", ?, "Nolan"),
+                   (3, "Ana",?,"Ana"),
+                   (4, "Alan", ?,"Alan"),
+                   (5, "DataRox", ?, "Joe Smith"),
+                   (6, "PythonEnthusiast",?, "Ken Henry")''',
+                   (hashed_passwords))
+
+        cursor.execute('''INSERT INTO tweets (tweet_id, user_id, tweet_content) \
+                   VALUES 
+                   (1, 5, "I consider myself a data pro"),
+                   (2, 5, "I accidentally deleted the project i've been working on for 36 hours..."),
+                   (3, 5, "comment so i feel validated please"),
+                   (4, 2, "First tweet ever. Hey ya'll"),
+                   (5, 4, "so mad at my wifi right now..."),
+                   (6, 3, "UberEats > paying off my student loans"),
+                   (7, 3, "why am i the way that i am"),
+                   (8, 4, "why don't we still know where the pyramids came from? What's your theory?"),
+                   (9, 5, "i can't catch up on sleep"),
+                   (10, 2, "What's everyone's favourite thing about Twitter?"),
+                   (11, 6, "Starbucks Christmas drinks are back"),
+                   (12, 6, "Why did the python programmer go broke? Because he missed too many commas."),
+                   (13, 5, "I told my wife she should embrace her mistakes. She gave me a hug"),
+                   (14, 3, "What's everyone's favourite song right now?"),
+                   (15, 6, "More money more problems")''')
+
+        cursor.execute('''INSERT INTO followers_following (follow_id, follower_user_id, following_user_id) \
+                   VALUES 
+                   (1, 5, 2),
+                   (2, 5, 3),
+                   (3, 5, 6),
+                   (4, 2, 4),
+                   (5, 2, 6),
+                   (6, 2, 3),
+                   (7, 3, 2),
+                   (8, 3, 4),
+                   (9, 3, 6),
+                   (10, 4, 2),
+                   (11, 4, 3),
+                   (12, 4, 5),
+                   (13, 6, 5),
+                   (14, 6, 4),
+                   (15, 6, 3)''')
+
+        cursor.execute('''INSERT INTO likes_retweets (like_retweet_id, user_id, tweet_id) \
+                   VALUES 
+                   (1, 5, 8),
+                   (2, 5, 6),
+                   (3, 5, 10),
+                   (4, 2, 8),
+                   (5, 2, 6),
+                   (6, 2, 4),
+                   (7, 3, 8),
+                   (8, 3, 15),
+                   (9, 3, 4),
+                   (10, 4, 8),
+                   (11, 4, 4),
+                   (12, 4, 5),
+                   (13, 6, 8),
+                   (14, 6, 13),
+                   (15, 6, 3)''')
+
+        cursor.execute('''INSERT INTO comments (comment_id, user_id, tweet_id, comment_text) \
+                   VALUES 
+                   (1, 6, 1, "ehem... i believe that would be me."),
+                   (2, 3, 8, "this exact thought keeps me up a lot at night..."),
+                   (3, 2, 2, "try 'ctrl' z"),
+                   (4, 3, 12, "ha."),
+                   (5, 4, 11, "literally no one cares."),
+                   (6, 5, 4, "Welcome, Nolan!"),
+                   (7, 5, 6, "i approve"),
+                   (8, 6, 4, "Welcome!"),
+                   (9, 6, 3, "validation, check."),
+                   (10, 2, 8, "aliens.")''')
+
+        # The seed data is inserted directly, so build the home timelines from it,
+        # and convert the emoji aliases in the tweets and comments.
+        rebuild_home_timelines(cursor)
+        backfill_emoji(cursor, report=lambda line: None)
+        index_existing_tweets(cursor, report=lambda line: None)
+    except:
+        print("Database and users already exist")
+
+if __name__ == "__main__":
+    # Only needed when this file is run, not when the CLI imports it.
+    import argparse
+    parser = argparse.ArgumentParser(description="Create and populate the TwitterLike database.")
+    parser.add_argument("--verify-stats", action="store_true",
+                        help="Check the like and comment counters in tweet_stats against the real data.")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Recount the like and comment counters in tweet_stats from scratch.")
+    parser.add_argument("--rebuild-timelines", action="store_true",
+                        help="Rebuild every user's home timeline from the follows and tweets.")
+    parser.add_argument("--rebuild-search", action="store_true",
+                        help="Rebuild the full-text search indexes of tweets and comments.")
+    parser.add_argument("--snapshot-graph", metavar="PATH",
+                        help="Save a snapshot of the follow graph for TWITTERLIKE_GRAPH_SNAPSHOT to load.")
+    parser.add_argument("--rebuild-trending", action="store_true",
+                        help="Recount the trending tweets and hashtags of the last hour and day.")
+    parser.add_argument("--index-tags", action="store_true",
+                        help="Record the hashtags and mentions of every existing tweet.")
+    parser.add_argument("--backfill-emoji", action="store_true",
+                        help="Convert the emoji aliases in tweets and comments stored before they were converted on write.")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Rows handled per transaction by --backfill-emoji and --index-tags.")
+    parser.add_argument("--database", default=DATABASE_PATH,
+                        help="The database file to create or update.")
+    # Options for filling an empty database with a large synthetic dataset instead
+    # of the initial users. See "SyntheticDataset.py".
+    parser.add_argument("--generate", action="store_true",
+                        help="Fill an empty database with a synthetic dataset instead of the initial data.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--follows-per-user", type=int, default=50,
+                        help="Average number of accounts each synthetic user follows.")
+    parser.add_argument("--tweets", type=int, default=100000)
+    parser.add_argument("--likes", type=int, default=500000, help="Approximate total number of likes.")
+    parser.add_argument("--comments", type=int, default=100000, help="Approximate total number of comments.")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Random seed; the same seed and sizes always generate the same data.")
+    args = parser.parse_args()
+
+    # Create a new SQLite database (or connect to an existing one).
+    conn = get_write_connection(args.database)
+    # Create a cursor object to interact with the database.
+    cursor = conn.cursor()
+
+    create_tables(cursor)
+    print("Database schema is at version", get_schema_version(cursor))
+    if args.verify_stats or args.rebuild_stats:
+        # Only check or repair the counters, without seeding any data.
+        drift = verify_tweet_stats(cursor)
+        print(len(drift), "tweet(s) with incorrect like/comment counters")
+        for tweet_id, likes, actual_likes, comments, actual_comments in drift:
+            print("Tweet ID:", tweet_id, "likes", likes, "->", actual_likes,
+                  "comments", comments, "->", actual_comments)
+        if args.rebuild_stats:
+            rebuild_tweet_stats(cursor)
+            print("Counters rebuilt")
+    elif args.rebuild_timelines:
+        rebuild_home_timelines(cursor)
+        print("Home timelines rebuilt")
+    elif args.rebuild_search:
+        rebuild_search_index(cursor)
+        print("Search indexes rebuilt")
+    elif args.snapshot_graph:
+        from FollowGraph import FollowGraph
+        graph = FollowGraph.from_database(cursor)
+        graph.save(args.snapshot_graph)
+        print("Saved the follow graph with", len(graph.following_targets), "follow(s) to", args.snapshot_graph)
+    elif args.rebuild_trending:
+        rebuild_trending(cursor)
+        print("Recounted the trending tweets and hashtags")
+    elif args.index_tags:
+        tweets = index_existing_tweets(cursor, args.chunk_size)
+        print("Indexed the hashtags and mentions of", tweets, "tweet(s)")
+    elif args.backfill_emoji:
+        tweets, comments = backfill_emoji(cursor, args.chunk_size)
+        print("Converted", tweets, "tweet(s) and", comments, "comment(s)")
+    elif args.generate:
+        # Imported here because SyntheticDataset imports this file.
+        from SyntheticDataset import generate_dataset, SYNTHETIC_PASSWORD
+        try:
+            generate_dataset(conn, args.users, args.follows_per_user, args.tweets,
+                             args.likes, args.comments, args.seed)
+            print("Every synthetic user (user1 to user%d) has the password" % args.users, SYNTHETIC_PASSWORD)
+        except ValueError as error:
+            print(error)
+    else:
+        seed_database(cursor)
+    #commit the changes and close the connection
+    conn.commit()
+    conn.close()
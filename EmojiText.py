@@ -0,0 +1,72 @@
+################
+## Code Notes ##
+################
+# This file contains the emoji handling of TwitterLike. Users can type emoji
+# aliases such as :thumbs_up: in tweets and comments, which are shown as the
+# emoji itself. Rather than converting the text every time it is shown, new
+# tweets and comments are converted once when they are stored: the converted
+# text goes in tweet_content / comment_text and the text as typed is kept in
+# tweet_content_raw / comment_text_raw.
+#
+# Rows stored before this have no raw text (it is NULL). Their comments are
+# converted when shown, through render_emoji, which keeps the most recent
+# conversions in a bounded LRU cache so a popular thread is only converted
+# once. Old tweets were never converted when shown, and still are not.
+# backfill_emoji converts the old tweets and comments in the database in
+# chunks, after which nothing has to be converted at read time.
+#
+# The emoji package is only imported the first time some text contains a
+# colon, since every alias starts and ends with one.
+
+#### Start Program ####
+
+from functools import lru_cache
+
+# The number of converted texts kept by render_emoji.
+RENDER_CACHE_SIZE = 4096
+# Rows converted and committed at a time by backfill_emoji.
+BACKFILL_CHUNK_SIZE = 1000
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_cached(text):
+    import emoji
+    return emoji.emojize(text)
+
+
+# Replace the emoji aliases in a text with the emoji themselves.
+def render_emoji(text):
+    if ":" not in text:
+        return text
+    return render_cached(text)
+
+
+# Convert the rows of one table that have no raw text yet, a chunk at a
+# time, committing after each chunk so that other sessions can write in
+# between. Returns the number of rows converted.
+def backfill_table(cursor, table, id_column, text_column, chunk_size, report):
+    converted = 0
+    last_id = 0
+    while True:
+        cursor.execute('''SELECT %s, %s FROM %s
+                       WHERE %s > ? AND %s_raw IS NULL
+                       ORDER BY %s
+                       LIMIT ?''' % (id_column, text_column, table, id_column, text_column, id_column),
+                       (last_id, chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany('''UPDATE %s SET %s = ?, %s_raw = ? WHERE %s = ?''' % (table, text_column, text_column, id_column),
+                           ((render_emoji(text), text, row_id) for row_id, text in rows))
+        cursor.connection.commit()
+        converted += len(rows)
+        last_id = rows[-1][0]
+        report("%-8s %10d rows converted" % (table, converted))
+    return converted
+
+
+# Convert every tweet and comment stored before emoji were converted on write.
+def backfill_emoji(cursor, chunk_size=BACKFILL_CHUNK_SIZE, report=print):
+    tweets = backfill_table(cursor, "tweets", "tweet_id", "tweet_content", chunk_size, report)
+    comments = backfill_table(cursor, "comments", "comment_id", "comment_text", chunk_size, report)
+    return tweets, comments
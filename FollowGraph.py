@@ -0,0 +1,298 @@
+################
+## Code Notes ##
+################
+# This file contains the in-memory follow graph used for the "who to follow"
+# recommendations. Recommending friends of friends means reading the follows
+# of everyone a user follows, which is too many queries to run against
+# followers_following every time. Instead the whole graph is loaded once into
+# two compressed sparse row (CSR) adjacencies, one for the users each user
+# follows and one for each user's followers. Each is a pair of flat arrays:
+# - offsets, indexed by user_id, where user u's row starts at offsets[u]
+#   and ends at offsets[u + 1]
+# - targets, the user ids of every row one after another
+# This takes 4 bytes per follow and 8 per user, instead of a Python set per
+# user, so millions of follows fit in memory.
+#
+# Follows and unfollows made after the arrays were built are kept in small
+# per-user sets (added and removed) that are applied on top of the arrays,
+# and are merged into new arrays once there are enough of them.
+#
+# A candidate's score is the number of users the user follows who follow the
+# candidate (mutual follows), plus FOLLOWS_YOU_BONUS if the candidate already
+# follows the user. Rankings are cached per user for a short time.
+#
+# The graph records the value of follow_graph_version it matches, a counter
+# in the database increased by a trigger on every follow and unfollow. The
+# same trigger logs each change in follow_graph_changes under the version it
+# produced, so a graph that is behind, because of follows made by other
+# sessions or because it was loaded from an older snapshot, applies the
+# changes it is missing from the log (replay_changes) instead of being rebuilt.
+# It is only rebuilt when the log no longer goes back far enough.
+#
+# The graph can be saved to a snapshot file, so that it is not rebuilt from
+# the database on every start. Set the TWITTERLIKE_GRAPH_SNAPSHOT environment
+# variable to the snapshot file of the database to turn snapshots on.
+
+#### Start Program ####
+
+import heapq
+import os
+import struct
+import tempfile
+import time
+from array import array
+from collections import OrderedDict
+
+# The number of users recommended.
+RECOMMENDATION_COUNT = 10
+# Added to the score of a candidate who already follows the user.
+FOLLOWS_YOU_BONUS = 2
+# Rankings are cached for this many users, for up to this many seconds.
+RECOMMENDATION_CACHE_SIZE = 1024
+RECOMMENDATION_CACHE_SECONDS = 60
+# Follows and unfollows kept in the added and removed sets before they are
+# merged into the arrays, as a share of the follows in the arrays.
+COMPACT_SHARE = 0.1
+MIN_COMPACT_CHANGES = 10000
+# A graph that other sessions have changed is brought up to date when it is
+# next used, at most this often.
+GRAPH_REFRESH_SECONDS = 60
+# With snapshots on, one is saved after this many follows and unfollows.
+SNAPSHOT_EVERY_CHANGES = 1000
+# Snapshot file layout: a header, then the offsets and targets of the
+# following rows and of the follower rows.
+SNAPSHOT_MAGIC = b"TLFG0001"
+SNAPSHOT_HEADER = struct.Struct("<8sqqq")
+# The follows and unfollows logged after a version, oldest first.
+GRAPH_CHANGES_QUERY = '''SELECT version, follower_user_id, following_user_id, followed
+                         FROM follow_graph_changes WHERE version > ? ORDER BY version'''
+
+
+# Return the snapshot file set in the environment, or None if snapshots are off.
+def configured_snapshot_path():
+    return os.environ.get("TWITTERLIKE_GRAPH_SNAPSHOT") or None
+
+
+# Return the current value of the follow graph version counter.
+def read_graph_version(cursor):
+    cursor.execute('''SELECT version FROM follow_graph_version WHERE id = 1''')
+    return cursor.fetchone()[0]
+
+
+# Build a CSR adjacency from (source, target) rows sorted by source, with a
+# row for every user id below slots.
+def build_rows(rows, slots):
+    offsets = array("q", bytes(8 * (slots + 1)))
+    targets = array("i")
+    for source, target in rows:
+        offsets[source + 1] += 1
+        targets.append(target)
+    for user_id in range(slots):
+        offsets[user_id + 1] += offsets[user_id]
+    return offsets, targets
+
+
+class FollowGraph:
+
+    def __init__(self, following_rows, follower_rows, version):
+        self.following_offsets, self.following_targets = following_rows
+        self.follower_offsets, self.follower_targets = follower_rows
+        # The value of follow_graph_version the graph matches.
+        self.version = version
+        self.built_at = time.time()
+        # Follows and unfollows not merged into the arrays yet, as {user_id: set of user ids}.
+        self.added_following = dict()
+        self.removed_following = dict()
+        self.added_followers = dict()
+        self.removed_followers = dict()
+        self.changes = 0
+        # {user_id: (time ranked, ranking)}, least recently used first.
+        self.cache = OrderedDict()
+
+    # Build the graph from the followers_following table. The version and the
+    # follows are read in one transaction, unless the cursor is already in one,
+    # so that they are from the same moment: the arrays hold exactly the
+    # follows up to the version, and replay_changes applies none of them twice.
+    @classmethod
+    def from_database(cls, cursor):
+        own_transaction = not cursor.connection.in_transaction
+        if own_transaction:
+            cursor.execute("BEGIN")
+        try:
+            version = read_graph_version(cursor)
+            cursor.execute('''SELECT MAX(user_id) FROM user_profiles''')
+            slots = (cursor.fetchone()[0] or 0) + 1
+            cursor.execute('''SELECT follower_user_id, following_user_id FROM followers_following
+                           ORDER BY follower_user_id''')
+            following_rows = build_rows(cursor, slots)
+            cursor.execute('''SELECT following_user_id, follower_user_id FROM followers_following
+                           ORDER BY following_user_id''')
+            follower_rows = build_rows(cursor, slots)
+        finally:
+            if own_transaction:
+                cursor.execute("COMMIT")
+        return cls(following_rows, follower_rows, version)
+
+    # Load a snapshot saved by save. Returns None if there is no snapshot, or
+    # if it was saved at a later version of the follows than version (so it
+    # cannot be of this database). An older snapshot is returned at its own
+    # version, to be brought up to date with replay_changes.
+    @classmethod
+    def load(cls, path, version):
+        try:
+            with open(path, "rb") as snapshot:
+                magic, saved_version, slots, follows = SNAPSHOT_HEADER.unpack(snapshot.read(SNAPSHOT_HEADER.size))
+                if magic != SNAPSHOT_MAGIC or saved_version > version:
+                    return None
+                arrays = list()
+                for typecode, length in (("q", slots + 1), ("i", follows), ("q", slots + 1), ("i", follows)):
+                    values = array(typecode)
+                    values.fromfile(snapshot, length)
+                    arrays.append(values)
+        except (OSError, EOFError, struct.error):
+            return None
+        return cls((arrays[0], arrays[1]), (arrays[2], arrays[3]), saved_version)
+
+    # Save the graph to a snapshot file. It is written to a temporary file of
+    # its own in the same directory first and then renamed, so a snapshot is
+    # never left half written, even when several sessions save at once.
+    def save(self, path):
+        self.compact()
+        slots = len(self.following_offsets) - 1
+        descriptor, temporary_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".",
+                                                      dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(descriptor, "wb") as snapshot:
+                snapshot.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.version, slots,
+                                                    len(self.following_targets)))
+                for values in (self.following_offsets, self.following_targets,
+                               self.follower_offsets, self.follower_targets):
+                    values.tofile(snapshot)
+            os.replace(temporary_path, path)
+        except:
+            os.remove(temporary_path)
+            raise
+
+    # Apply the follows and unfollows logged in follow_graph_changes after the
+    # graph's version, moving the version up to the last one applied. Returns
+    # the number of changes applied, or None if the log does not have every
+    # change since the graph's version, in which case the graph must be rebuilt.
+    def replay_changes(self, cursor):
+        cursor.execute(GRAPH_CHANGES_QUERY, (self.version,))
+        changes = cursor.fetchall()
+        if changes and (changes[0][0] != self.version + 1
+                        or changes[-1][0] - changes[0][0] + 1 != len(changes)):
+            return None
+        for version, follower_id, following_id, followed in changes:
+            if followed:
+                self.add_follow(follower_id, following_id)
+            else:
+                self.remove_follow(follower_id, following_id)
+            self.version = version
+        return len(changes)
+
+    # Return the user ids in one user's row of an adjacency, with the changes
+    # not merged yet applied.
+    def row(self, offsets, targets, added, removed, user_id):
+        if user_id + 1 < len(offsets):
+            user_ids = targets[offsets[user_id]:offsets[user_id + 1]]
+        else:
+            user_ids = ()
+        if user_id in removed:
+            user_ids = [other_id for other_id in user_ids if other_id not in removed[user_id]]
+        if user_id in added:
+            user_ids = list(user_ids) + list(added[user_id])
+        return user_ids
+
+    # The users a user follows.
+    def following(self, user_id):
+        return self.row(self.following_offsets, self.following_targets,
+                        self.added_following, self.removed_following, user_id)
+
+    # The followers of a user.
+    def followers(self, user_id):
+        return self.row(self.follower_offsets, self.follower_targets,
+                        self.added_followers, self.removed_followers, user_id)
+
+    # Record one side of a follow or unfollow in the added and removed sets.
+    def change(self, added, removed, user_id, other_id):
+        if other_id in removed.get(user_id, ()):
+            removed[user_id].discard(other_id)
+        else:
+            added.setdefault(user_id, set()).add(other_id)
+
+    # Record that follower_id now follows following_id.
+    def add_follow(self, follower_id, following_id):
+        self.change(self.added_following, self.removed_following, follower_id, following_id)
+        self.change(self.added_followers, self.removed_followers, following_id, follower_id)
+        self.changed(follower_id, following_id)
+
+    # Record that follower_id no longer follows following_id.
+    def remove_follow(self, follower_id, following_id):
+        self.change(self.removed_following, self.added_following, follower_id, following_id)
+        self.change(self.removed_followers, self.added_followers, following_id, follower_id)
+        self.changed(follower_id, following_id)
+
+    # Forget the rankings of both users of a follow, and merge the changes
+    # into the arrays once there are enough of them.
+    def changed(self, follower_id, following_id):
+        self.cache.pop(follower_id, None)
+        self.cache.pop(following_id, None)
+        self.changes += 1
+        if self.changes >= max(MIN_COMPACT_CHANGES, len(self.following_targets) * COMPACT_SHARE):
+            self.compact()
+
+    # Merge the follows and unfollows made since the arrays were built into new arrays.
+    def compact(self):
+        if not self.changes:
+            return
+        # Make room for users who joined after the arrays were built.
+        slots = len(self.following_offsets) - 1
+        for user_id, other_ids in self.added_following.items():
+            if other_ids:
+                slots = max(slots, user_id + 1, max(other_ids) + 1)
+        self.following_offsets, self.following_targets = build_rows(
+            ((user_id, other_id) for user_id in range(slots) for other_id in self.following(user_id)), slots)
+        self.follower_offsets, self.follower_targets = build_rows(
+            ((user_id, other_id) for user_id in range(slots) for other_id in self.followers(user_id)), slots)
+        self.added_following.clear()
+        self.removed_following.clear()
+        self.added_followers.clear()
+        self.removed_followers.clear()
+        self.changes = 0
+
+    # Return the users recommended to a user, best first, as a list of
+    # (user_id, mutual follows, follows the user).
+    def recommend(self, user_id, now=None):
+        if now is None:
+            now = time.time()
+        cached = self.cache.get(user_id)
+        if cached is not None and cached[0] > now - RECOMMENDATION_CACHE_SECONDS:
+            self.cache.move_to_end(user_id)
+            return cached[1]
+
+        followed = set(self.following(user_id))
+        followed.add(user_id)
+        followers = set(self.followers(user_id))
+        mutuals = dict()
+        for friend_id in followed:
+            if friend_id == user_id:
+                continue
+            for candidate_id in self.following(friend_id):
+                if candidate_id not in followed:
+                    mutuals[candidate_id] = mutuals.get(candidate_id, 0) + 1
+        # Followers who are not followed back are candidates too.
+        for candidate_id in followers:
+            if candidate_id not in followed:
+                mutuals.setdefault(candidate_id, 0)
+
+        best = heapq.nsmallest(RECOMMENDATION_COUNT, mutuals,
+                               key=lambda candidate_id: (-mutuals[candidate_id]
+                                                         - (FOLLOWS_YOU_BONUS if candidate_id in followers else 0),
+                                                         candidate_id))
+        ranking = [(candidate_id, mutuals[candidate_id], candidate_id in followers) for candidate_id in best]
+        self.cache[user_id] = (now, ranking)
+        self.cache.move_to_end(user_id)
+        if len(self.cache) > RECOMMENDATION_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return ranking
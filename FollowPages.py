@@ -0,0 +1,60 @@
+################
+## Code Notes ##
+################
+# This file contains the paged reads of a user's followers and of the users
+# they follow, and their follower and following counts. The lists are read
+# in user id order along the two follow indexes created in
+# "DatabaseModuleStarter.py", a page at a time: each page asks for the users
+# after the last user id already shown, as the tweet pages do with tweet ids
+# in "TweetPages.py". So a list is never read into memory as a whole, however
+# many followers an account has.
+#
+# The counts are kept in the follow_counts table by triggers on
+# followers_following, so reading them is a single primary key lookup
+# instead of counting the follows every time.
+
+#### Start Program ####
+
+# The number of users shown on each page of the followers and following lists.
+FOLLOW_PAGE_SIZE = 50
+
+# The queries of the lists and counts.
+FOLLOWERS_QUERY = '''SELECT user_profiles.user_id, user_profiles.username
+                     FROM followers_following
+                     INNER JOIN user_profiles ON user_profiles.user_id = followers_following.follower_user_id
+                     WHERE followers_following.following_user_id = ?
+                     AND followers_following.follower_user_id > ?
+                     ORDER BY followers_following.follower_user_id
+                     LIMIT ?'''
+FOLLOWING_QUERY = '''SELECT user_profiles.user_id, user_profiles.username
+                     FROM followers_following
+                     INNER JOIN user_profiles ON user_profiles.user_id = followers_following.following_user_id
+                     WHERE followers_following.follower_user_id = ?
+                     AND followers_following.following_user_id > ?
+                     ORDER BY followers_following.following_user_id
+                     LIMIT ?'''
+FOLLOW_COUNTS_QUERY = '''SELECT follower_count, following_count FROM follow_counts WHERE user_id = ?'''
+
+
+# Retrieve one page of a user's followers as rows of (user_id, username),
+# in user id order. Only users with an id above after_user_id are returned.
+def read_followers(cursor, user_id, limit=FOLLOW_PAGE_SIZE, after_user_id=0):
+    page = cursor.connection.execute(FOLLOWERS_QUERY, (user_id, after_user_id, limit))
+    for row in page:
+        yield row
+
+
+# Retrieve one page of the users a user follows, in the same form as read_followers.
+def read_following(cursor, user_id, limit=FOLLOW_PAGE_SIZE, after_user_id=0):
+    page = cursor.connection.execute(FOLLOWING_QUERY, (user_id, after_user_id, limit))
+    for row in page:
+        yield row
+
+
+# Return (number of followers, number of users followed) for a user.
+def read_follow_counts(cursor, user_id):
+    cursor.execute(FOLLOW_COUNTS_QUERY, (user_id,))
+    counts = cursor.fetchone()
+    if counts is None:
+        return (0, 0)
+    return counts
@@ -0,0 +1,176 @@
+################
+## Code Notes ##
+################
+# This file contains the logic for the materialized home timeline. Instead of
+# joining followers_following and tweets every time a user views their
+# timeline, the id of every new tweet is copied into the home_timeline table
+# of each of the author's followers when it is posted (fan-out on write).
+# Viewing the timeline is then a single range scan of home_timeline.
+#
+# Accounts with a very large number of followers are not fanned out, since a
+# single tweet would cause a huge number of writes. Once an account goes over
+# FANOUT_FOLLOWER_LIMIT it is recorded in home_timeline_exempt, and its tweets
+# are merged into the timeline of its followers when the timeline is read.
+#
+# The tables themselves, and the triggers that keep the size of each timeline
+# in home_timeline_sizes, are created in "DatabaseModuleStarter.py".
+
+#### Start Program ####
+
+# The maximum number of tweets kept in each user's home timeline.
+TIMELINE_LENGTH = 800
+# Accounts with more followers than this are read at view time instead of fanned out.
+FANOUT_FOLLOWER_LIMIT = 10000
+# Larger than any tweet id, used to read the first page of a timeline.
+NEWEST_TWEET_ID = 2 ** 63 - 1
+
+# The queries that keep the timelines and read them. OVER_LENGTH_QUERY is
+# completed with the query selecting the users whose timelines may have grown.
+OVER_LENGTH_QUERY = '''SELECT user_id, entries - ? FROM home_timeline_sizes
+                       WHERE user_id IN (%s)
+                       AND entries > ?'''
+TRIM_TIMELINE_QUERY = '''DELETE FROM home_timeline
+                         WHERE user_id = ?
+                         AND tweet_id <= (SELECT oldest.tweet_id FROM home_timeline AS oldest
+                                          WHERE oldest.user_id = ?
+                                          ORDER BY oldest.tweet_id
+                                          LIMIT 1 OFFSET ?)'''
+FAN_OUT_QUERY = '''INSERT OR IGNORE INTO home_timeline (user_id, tweet_id, author_id)
+                   SELECT follower_user_id, ?, ?
+                   FROM followers_following
+                   WHERE following_user_id = ?'''
+FOLLOWERS_OF_AUTHOR_QUERY = '''SELECT follower_user_id FROM followers_following WHERE following_user_id = ?'''
+BACKFILL_QUERY = '''INSERT OR IGNORE INTO home_timeline (user_id, tweet_id, author_id)
+                    SELECT ?, tweet_id, user_id
+                    FROM tweets
+                    WHERE user_id = ?
+                    ORDER BY tweet_id DESC
+                    LIMIT ?'''
+PURGE_QUERY = '''DELETE FROM home_timeline WHERE user_id = ? AND author_id = ?'''
+HOME_TIMELINE_QUERY = '''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content,
+                         COALESCE(tweet_stats.like_count, 0), COALESCE(tweet_stats.comment_count, 0)
+                         FROM (SELECT tweet_id FROM
+                               (SELECT tweet_id FROM home_timeline
+                                WHERE user_id = ? AND tweet_id < ?
+                                ORDER BY tweet_id DESC
+                                LIMIT ?)
+                               UNION
+                               SELECT tweet_id FROM
+                               (SELECT tweets.tweet_id FROM followers_following
+                                INNER JOIN home_timeline_exempt
+                                ON home_timeline_exempt.user_id = followers_following.following_user_id
+                                INNER JOIN tweets ON tweets.user_id = followers_following.following_user_id
+                                WHERE followers_following.follower_user_id = ? AND tweets.tweet_id < ?
+                                ORDER BY tweets.tweet_id DESC
+                                LIMIT ?)) AS timeline
+                         INNER JOIN tweets ON tweets.tweet_id = timeline.tweet_id
+                         INNER JOIN user_profiles ON user_profiles.user_id = tweets.user_id
+                         LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                         ORDER BY tweets.tweet_id DESC
+                         LIMIT ?'''
+
+
+# Check whether the tweets of a user are merged in at read time instead of fanned out.
+def is_exempt(cursor, user_id):
+    cursor.execute('''SELECT 1 FROM home_timeline_exempt WHERE user_id = ?''', (user_id,))
+    return cursor.fetchone() is not None
+
+
+# Drop the oldest entries of the given users' timelines so that each one
+# keeps at most TIMELINE_LENGTH tweets. follower_query selects the ids of
+# the users whose timelines may have grown. The size of every timeline is
+# kept in home_timeline_sizes by triggers, so only the timelines that are
+# over the limit are touched, and for those only the oldest entries are read.
+def trim_timelines(cursor, follower_query, parameters):
+    cursor.execute(OVER_LENGTH_QUERY % follower_query, (TIMELINE_LENGTH,) + parameters + (TIMELINE_LENGTH,))
+    cursor.executemany(TRIM_TIMELINE_QUERY,
+                       [(user_id, user_id, extra_entries - 1) for user_id, extra_entries in cursor.fetchall()])
+
+
+# Copy a newly posted tweet into the home timeline of all of its author's followers.
+# Must be called in the same transaction as the insert into the tweets table.
+def fan_out_tweet(cursor, tweet_id, author_id):
+    if is_exempt(cursor, author_id):
+        return
+    cursor.execute('''SELECT COUNT(*) FROM followers_following WHERE following_user_id = ?''',
+                   (author_id,))
+    if cursor.fetchone()[0] > FANOUT_FOLLOWER_LIMIT:
+        # The author has too many followers; from now on their tweets are
+        # merged in when the timeline is read. The tweets already fanned out
+        # are left in place and removed as duplicates when reading.
+        cursor.execute('''INSERT OR IGNORE INTO home_timeline_exempt (user_id) VALUES (?)''',
+                       (author_id,))
+        return
+    cursor.execute(FAN_OUT_QUERY, (tweet_id, author_id, author_id))
+    trim_timelines(cursor, FOLLOWERS_OF_AUTHOR_QUERY, (author_id,))
+
+
+# Add the most recent tweets of a newly followed user to the follower's timeline.
+def backfill_follow(cursor, follower_id, following_id):
+    if is_exempt(cursor, following_id):
+        return
+    cursor.execute(BACKFILL_QUERY, (follower_id, following_id, TIMELINE_LENGTH))
+    trim_timelines(cursor, '''SELECT ?''', (follower_id,))
+
+
+# Remove the tweets of an unfollowed user from the follower's timeline. If the
+# timeline was full, older tweets from the remaining follows may have been
+# trimmed off, so it is topped back up to TIMELINE_LENGTH.
+def purge_unfollow(cursor, follower_id, following_id):
+    cursor.execute(PURGE_QUERY, (follower_id, following_id))
+    if cursor.rowcount > 0:
+        refill_timeline(cursor, follower_id)
+
+
+# Top up a single user's timeline with the most recent tweets of the
+# accounts they follow.
+def refill_timeline(cursor, user_id):
+    cursor.execute('''INSERT OR IGNORE INTO home_timeline (user_id, tweet_id, author_id)
+                   SELECT ?, tweets.tweet_id, tweets.user_id
+                   FROM followers_following
+                   INNER JOIN tweets ON tweets.user_id = followers_following.following_user_id
+                   WHERE followers_following.follower_user_id = ?
+                   AND followers_following.following_user_id NOT IN
+                   (SELECT user_id FROM home_timeline_exempt)
+                   ORDER BY tweets.tweet_id DESC
+                   LIMIT ?''',
+                   (user_id, user_id, TIMELINE_LENGTH))
+    trim_timelines(cursor, '''SELECT ?''', (user_id,))
+
+
+# Rebuild every home timeline from followers_following and tweets. Used to
+# fill in the table for an existing database and after bulk loading data.
+def rebuild_home_timelines(cursor):
+    cursor.execute('''INSERT OR IGNORE INTO home_timeline_exempt (user_id)
+                   SELECT following_user_id FROM followers_following
+                   GROUP BY following_user_id
+                   HAVING COUNT(*) > ?''',
+                   (FANOUT_FOLLOWER_LIMIT,))
+    cursor.execute('''DELETE FROM home_timeline''')
+    cursor.execute('''INSERT OR IGNORE INTO home_timeline (user_id, tweet_id, author_id)
+                   SELECT follower_user_id, tweet_id, user_id FROM
+                   (SELECT followers_following.follower_user_id, tweets.tweet_id, tweets.user_id,
+                    ROW_NUMBER() OVER (PARTITION BY followers_following.follower_user_id
+                                       ORDER BY tweets.tweet_id DESC) AS position
+                    FROM followers_following
+                    INNER JOIN tweets ON tweets.user_id = followers_following.following_user_id
+                    WHERE followers_following.following_user_id NOT IN
+                    (SELECT user_id FROM home_timeline_exempt))
+                   WHERE position <= ?''',
+                   (TIMELINE_LENGTH,))
+
+
+# Retrieve one page of a user's timeline, newest first, as rows of
+# (username, tweet_id, tweet_content, like count, comment count). Only
+# tweets older than before_tweet_id are returned, so the next page is read
+# by passing the id of the last tweet on the current one. The fanned out
+# tweets are merged with the recent tweets of any followed exempt accounts.
+# The rows are yielded from a separate cursor as they are read, so at most
+# one page is held in memory.
+def read_home_timeline(cursor, user_id, limit=TIMELINE_LENGTH, before_tweet_id=None):
+    if before_tweet_id is None:
+        before_tweet_id = NEWEST_TWEET_ID
+    page = cursor.connection.execute(HOME_TIMELINE_QUERY,
+                   (user_id, before_tweet_id, limit, user_id, before_tweet_id, limit, limit))
+    for row in page:
+        yield row
@@ -0,0 +1,108 @@
+################
+## Code Notes ##
+################
+# This file contains the login rate limiter. Every login attempt takes a token
+# from two token buckets: one for the username being logged in to and one for
+# the source of the attempt (the account and machine the CLI runs on). Each
+# bucket holds a few tokens and slowly refills, so a handful of mistakes are
+# allowed but guessing passwords quickly is not. When a bucket is empty the
+# attempt is refused straight away, before any bcrypt work is done, together
+# with the number of seconds until a token is available again.
+#
+# Only failed attempts are charged in the end. Every CLI session on a server
+# has the same source, so a successful login gives its source token back and
+# refills the username's bucket; otherwise the users of a busy server would
+# lock each other out just by logging in. An attempt refused by one bucket
+# does not spend a token of the other, so hammering one username does not
+# drain the source for everyone else.
+#
+# The buckets are stored in the login_rate_limits table (created in
+# "DatabaseModuleStarter.py"), so the limits hold across restarts and are
+# shared by every session using the same database. Taking a token is a single
+# UPSERT statement, so two sessions cannot both take the last token.
+
+#### Start Program ####
+
+import time
+
+# Bucket sizes and refill rates as (capacity, tokens added per second).
+# A username allows 5 attempts in a row and then one every 20 seconds.
+USER_BUCKET = (5, 1 / 20)
+# A source may try several usernames, so it gets a larger bucket.
+SOURCE_BUCKET = (20, 1 / 5)
+# A bucket that has not been used for this long has refilled completely and can be removed.
+FULL_REFILL_SECONDS = max(USER_BUCKET[0] / USER_BUCKET[1], SOURCE_BUCKET[0] / SOURCE_BUCKET[1])
+
+# The queries of the rate limiter, which "benchmarks/QueryPlanCheck.py" also checks.
+TAKE_TOKEN_QUERY = '''INSERT INTO login_rate_limits (bucket, tokens, updated_at) VALUES (?, ? - 1, ?)
+                   ON CONFLICT (bucket) DO UPDATE
+                   SET tokens = MIN(?, tokens + MAX(0, excluded.updated_at - updated_at) * ?) - 1,
+                   updated_at = excluded.updated_at
+                   WHERE MIN(?, tokens + MAX(0, excluded.updated_at - updated_at) * ?) >= 1'''
+BUCKET_QUERY = '''SELECT tokens, updated_at FROM login_rate_limits WHERE bucket = ?'''
+RETURN_TOKEN_QUERY = '''UPDATE login_rate_limits SET tokens = MIN(?, tokens + 1) WHERE bucket = ?'''
+RESET_BUCKET_QUERY = '''DELETE FROM login_rate_limits WHERE bucket = ?'''
+PRUNE_BUCKETS_QUERY = '''DELETE FROM login_rate_limits WHERE updated_at < ?'''
+
+
+# Identify where a CLI session is running, for the source bucket.
+def local_source():
+    # Imported here, since they are only needed once per session.
+    import getpass
+    import socket
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = "unknown"
+    return "%s@%s" % (user, socket.gethostname())
+
+
+# Take one token from a bucket. Returns 0 if a token was taken, or the number
+# of seconds until one is available. The bucket is refilled for the time since
+# it was last used and then reduced by one, only if that leaves it non-negative.
+def take_token(cursor, bucket, capacity, refill_per_second, now):
+    cursor.execute(TAKE_TOKEN_QUERY,
+                   (bucket, capacity, now, capacity, refill_per_second, capacity, refill_per_second))
+    if cursor.rowcount == 1:
+        return 0
+    cursor.execute(BUCKET_QUERY, (bucket,))
+    tokens, updated_at = cursor.fetchone()
+    tokens = min(capacity, tokens + max(0, now - updated_at) * refill_per_second)
+    return (1 - tokens) / refill_per_second
+
+
+# Put back a token taken from a bucket, without going over its capacity.
+def return_token(cursor, bucket, capacity):
+    cursor.execute(RETURN_TOKEN_QUERY, (capacity, bucket))
+
+
+# Check whether a login attempt may go ahead, taking a token from the
+# username's bucket and, if a source is given, from the source's bucket.
+# Returns 0 if the attempt is allowed, or the number of seconds to wait. When
+# one bucket refuses the attempt, no token is kept from the other.
+def check_login_allowed(cursor, username, source=None, now=None):
+    if now is None:
+        now = time.time()
+    retry_after = take_token(cursor, "user:" + username, USER_BUCKET[0], USER_BUCKET[1], now)
+    if not retry_after and source is not None:
+        retry_after = take_token(cursor, "source:" + source, SOURCE_BUCKET[0], SOURCE_BUCKET[1], now)
+        if retry_after:
+            return_token(cursor, "user:" + username, USER_BUCKET[0])
+    return retry_after
+
+
+# Refill the username's bucket after a successful login, so that earlier
+# mistakes do not count against the user next time, and give back the token
+# the attempt took from the source's bucket.
+def reset_login_limit(cursor, username, source=None):
+    cursor.execute(RESET_BUCKET_QUERY, ("user:" + username,))
+    if source is not None:
+        return_token(cursor, "source:" + source, SOURCE_BUCKET[0])
+
+
+# Remove buckets that have not been used long enough to be full again. They
+# behave exactly like a bucket that does not exist yet.
+def prune_login_buckets(cursor, now=None):
+    if now is None:
+        now = time.time()
+    cursor.execute(PRUNE_BUCKETS_QUERY, (now - FULL_REFILL_SECONDS,))
@@ -0,0 +1,72 @@
+################
+## Code Notes ##
+################
+# This file contains the rendering of the lists shown by the CLI: pages of
+# tweets, liked tweets, comments and users. Each function formats a whole
+# page into one string, which show writes to the terminal in a single call,
+# instead of making several print calls for every row.
+#
+# The emoji used by the CLI are written out as text once here, so neither
+# the emoji package nor any conversion is needed to show them.
+
+#### Start Program ####
+
+import sys
+
+BABY_CHICK = "\U0001F425"
+THUMBS_UP = "\U0001F44D"
+SPEECH_BALLOON = "\U0001F4AC"
+BANNER = " ".join([BABY_CHICK] * 4 + ["Welcome to Twitterlike"] + [BABY_CHICK] * 4)
+
+# The layout of each kind of row. A tweet is the author and id, the text, then
+# its like and comment counts followed by a blank line.
+TWEET_FORMAT = "%s ( Tweet ID: %s )\n    %s\n" + THUMBS_UP + " %s " + SPEECH_BALLOON + " %s \n\n"
+LIKED_TWEET_FORMAT = "%s : %s\n" + THUMBS_UP + " %s\n"
+COMMENT_FORMAT = "%s : %s\n"
+SEARCH_COMMENT_FORMAT = "%s on Tweet ID %s : %s\n"
+TRENDING_TWEET_FORMAT = ("%s ( Tweet ID: %s )\n    %s\n" + THUMBS_UP + " %s ( %s this %s) "
+                         + SPEECH_BALLOON + " %s \n\n")
+TRENDING_HASHTAG_FORMAT = "   #%s ( %s tweets )\n"
+
+
+# Write a rendered page to the terminal in one call.
+def show(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+# A page of tweets, as rows of (username, tweet_id, tweet_content, like count, comment count).
+def render_tweets(tweets):
+    return "".join([TWEET_FORMAT % tweet[:5] for tweet in tweets])
+
+
+# The trending tweets of a period, as rows of (username, tweet_id,
+# tweet_content, like count, comment count, likes in the period).
+def render_trending_tweets(tweets, period):
+    return "".join([TRENDING_TWEET_FORMAT % (tweet[0], tweet[1], tweet[2], tweet[3], tweet[5], period, tweet[4])
+                    for tweet in tweets])
+
+
+# The trending hashtags of a period, as rows of (tag, uses in the period).
+def render_trending_hashtags(hashtags):
+    return "".join([TRENDING_HASHTAG_FORMAT % hashtag[:2] for hashtag in hashtags])
+
+
+# Liked tweets, as rows of (tweet_id, tweet_content, like count).
+def render_liked_tweets(tweets):
+    return "".join([LIKED_TWEET_FORMAT % tweet[:3] for tweet in tweets])
+
+
+# Comments on a tweet, as rows of (username, comment_text).
+def render_comments(comments):
+    return "".join([COMMENT_FORMAT % comment[:2] for comment in comments])
+
+
+# Comments found by a search, as rows of (username, tweet_id, comment_text).
+def render_search_comments(comments):
+    return "".join([SEARCH_COMMENT_FORMAT % comment[:3] for comment in comments])
+
+
+# A list of usernames, one per line.
+def render_usernames(usernames):
+    return "".join([username + "\n" for username in usernames])
@@ -0,0 +1,98 @@
+################
+## Code Notes ##
+################
+# This file contains the password hashing used by TwitterLike. All hashing
+# and checking of passwords goes through here instead of calling bcrypt
+# directly, so that:
+# - the bcrypt work factor (log rounds) is set in one place. It is read from
+#   the TWITTERLIKE_BCRYPT_ROUNDS environment variable, so tests and benchmarks
+#   can use a low cost while a real installation keeps the default of 12
+# - many passwords can be hashed at once across all CPU cores with a process
+#   pool (hash_passwords), for seeding and importing accounts
+# - hashes made with a lower cost than the current setting can be found
+#   (needs_rehash), so that they are upgraded the next time the user logs in
+#
+# flask_bcrypt (which pulls in Flask) is only imported the first time a
+# password is hashed or checked, so that starting the CLI does not wait for it.
+# flask_bcrypt must be installed prior to running this code.
+# Please run the following command in your terminal:
+# pip install flask_bcrypt
+
+#### Start Program ####
+
+import os
+
+# The Bcrypt instance used for hashing, created by get_bcrypt on first use.
+bcrypt = None
+
+# The bcrypt work factor used for new hashes. Each extra round doubles the
+# time it takes to hash (and to guess) a password. bcrypt accepts 4 to 31.
+DEFAULT_BCRYPT_ROUNDS = 12
+MIN_BCRYPT_ROUNDS = 4
+MAX_BCRYPT_ROUNDS = 31
+
+
+# Return the Bcrypt instance, importing flask_bcrypt the first time.
+def get_bcrypt():
+    global bcrypt
+    if bcrypt is None:
+        from flask_bcrypt import Bcrypt
+        # Initialize a new instance of Bcrypt for hashing.
+        bcrypt = Bcrypt()
+    return bcrypt
+
+
+# Return the work factor set in the environment, or the default.
+def configured_rounds():
+    rounds = int(os.environ.get("TWITTERLIKE_BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS))
+    if not MIN_BCRYPT_ROUNDS <= rounds <= MAX_BCRYPT_ROUNDS:
+        raise ValueError("TWITTERLIKE_BCRYPT_ROUNDS must be between %d and %d"
+                         % (MIN_BCRYPT_ROUNDS, MAX_BCRYPT_ROUNDS))
+    return rounds
+
+
+# Hash one password with the given work factor (the configured one by default).
+def hash_password(password, rounds=None):
+    if rounds is None:
+        rounds = configured_rounds()
+    return get_bcrypt().generate_password_hash(password, rounds)
+
+
+# Check a password against a stored hash.
+def check_password(password_hash, password):
+    return get_bcrypt().check_password_hash(password_hash, password)
+
+
+# Return the work factor a stored hash was made with. bcrypt hashes look
+# like $2b$12$..., where the number between the second and third $ is the cost.
+def hash_rounds(password_hash):
+    if isinstance(password_hash, bytes):
+        password_hash = password_hash.decode()
+    return int(password_hash.split("$")[2])
+
+
+# Check whether a stored hash was made with a lower work factor than the
+# current one and should be replaced by a new hash of the same password.
+def needs_rehash(password_hash, rounds=None):
+    if rounds is None:
+        rounds = configured_rounds()
+    return hash_rounds(password_hash) < rounds
+
+
+# Hash a list of passwords and return the hashes in the same order. The
+# work is spread over a pool of worker processes (one per CPU core by
+# default), since each hash keeps a core busy for the whole time it takes.
+def hash_passwords(passwords, rounds=None, workers=None):
+    passwords = list(passwords)
+    if rounds is None:
+        rounds = configured_rounds()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(passwords))
+    # Starting the processes is not worth it for a single password or core.
+    if workers <= 1:
+        return [hash_password(password, rounds) for password in passwords]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(hash_password, passwords, [rounds] * len(passwords), chunksize=chunksize))
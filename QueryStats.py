@@ -0,0 +1,339 @@
+################
+## Code Notes ##
+################
+# This file contains the query instrumentation of the program. When it is on,
+# every connection opened by "DatabaseConnection.py" is an
+# InstrumentedConnection, whose cursors time each statement they run. For
+# each statement shape (the SQL with its whitespace collapsed and any
+# literal numbers and strings replaced by "?", so the same query with
+# different values is counted once) it records:
+# - how many times the statement ran and how many rows it returned (or
+#   changed, for statements that write)
+# - the total and longest time, and a histogram of the times in
+#   LATENCY_BUCKETS_MS, from which the median and 95th percentile are estimated
+#
+# A statement's time is the time spent in execute and in fetching its rows,
+# not the time the program spends between fetches, so a page of tweets read
+# by a generator is not charged for the time the user looks at it. Commits are
+# counted too, as the shape "COMMIT".
+#
+# Statements that take longer than the slow query threshold are written to
+# the slow query log with their parameters and their EXPLAIN QUERY PLAN.
+#
+# Instrumentation is off unless the TWITTERLIKE_QUERY_STATS environment
+# variable is set to the file the summary should be written to. A summary is
+# added to that file when the program exits and, where the system has it,
+# whenever the process receives SIGUSR1 (kill -USR1 <pid>). The slow query
+# log is TWITTERLIKE_SLOW_QUERY_LOG (slow_queries.log by default) and the
+# threshold is TWITTERLIKE_SLOW_QUERY_MS (100 by default).
+
+#### Start Program ####
+
+import atexit
+import os
+import re
+import signal
+import sqlite3
+import threading
+import time
+import weakref
+
+# The upper bounds of the latency histogram buckets, in milliseconds. Longer
+# statements are counted in one more bucket after the last.
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_SLOW_QUERY_LOG = "slow_queries.log"
+# How much of the parameters of a slow statement is written to the log.
+LOGGED_PARAMETERS_LENGTH = 200
+# Statement shapes are remembered for this many different SQL strings.
+SHAPE_CACHE_SIZE = 4096
+
+# Literal strings and numbers, and lists of placeholders such as "(?, ?, ?)".
+LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+# Return the summary file set in the environment, or None if instrumentation is off.
+def configured_summary_path():
+    return os.environ.get("TWITTERLIKE_QUERY_STATS") or None
+
+
+# Return the slow query threshold set in the environment, in milliseconds.
+def configured_slow_query_ms():
+    return float(os.environ.get("TWITTERLIKE_SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS))
+
+
+# Return the shape of a statement: its SQL with the whitespace collapsed and
+# the literal values replaced by "?", and lists of placeholders of any length
+# (as in "IN (?, ?, ?)") written as "(?, ...)".
+def statement_shape(sql):
+    shape = " ".join(LITERAL_PATTERN.sub("?", sql).split())
+    return PLACEHOLDER_LIST_PATTERN.sub("(?, ...)", shape)
+
+
+# Return the index of the histogram bucket of a time in milliseconds.
+def bucket_index(elapsed_ms):
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+# Format the rows of an EXPLAIN QUERY PLAN as an indented tree.
+def format_plan(plan):
+    depths = {0: 0}
+    lines = list()
+    for node_id, parent_id, _, detail in plan:
+        depths[node_id] = depths.get(parent_id, 0) + 1
+        lines.append("  " * depths[node_id] + detail)
+    return lines
+
+
+class ShapeStats:
+
+    def __init__(self):
+        self.count = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    # Estimate a percentile as the upper bound of the bucket it falls in,
+    # or the longest time for the last bucket.
+    def percentile(self, fraction):
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted and count:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], self.max_ms)
+                break
+        return self.max_ms
+
+
+class QueryStats:
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, slow_query_log=DEFAULT_SLOW_QUERY_LOG):
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        # {statement shape: ShapeStats}
+        self.shapes = dict()
+        # {sql: statement shape}, so each SQL string is only normalised once.
+        self.shape_cache = dict()
+        # The instrumented cursors still open, whose last statement may not be counted yet.
+        self.cursors = weakref.WeakSet()
+        # Cursors of the same process may be used from more than one thread.
+        self.lock = threading.Lock()
+
+    def shape_of(self, sql):
+        shape = self.shape_cache.get(sql)
+        if shape is None:
+            if len(self.shape_cache) >= SHAPE_CACHE_SIZE:
+                self.shape_cache.clear()
+            shape = self.shape_cache[sql] = statement_shape(sql)
+        return shape
+
+    # Count one run of a statement.
+    def record(self, sql, elapsed_ms, rows):
+        shape = self.shape_of(sql)
+        with self.lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = ShapeStats()
+            stats.count += 1
+            stats.rows += rows
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.buckets[bucket_index(elapsed_ms)] += 1
+
+    # Add a slow statement to the slow query log, with its query plan. The plan
+    # is asked for on a plain cursor, so that it is not counted itself.
+    def log_slow(self, connection, sql, parameters, elapsed_ms, rows):
+        lines = ["%s %.1f ms, %d rows" % (time.strftime("%Y-%m-%d %H:%M:%S"), elapsed_ms, rows),
+                 " ".join(sql.split())]
+        if parameters:
+            lines.append("parameters: " + repr(parameters)[:LOGGED_PARAMETERS_LENGTH])
+        try:
+            plan = sqlite3.Cursor(connection).execute("EXPLAIN QUERY PLAN " + sql, parameters or ()).fetchall()
+            lines.append("plan:")
+            lines.extend(format_plan(plan))
+        except sqlite3.Error as error:
+            lines.append("plan: not available (%s)" % error)
+        with self.lock:
+            with open(self.slow_query_log, "a", encoding="utf-8") as log:
+                log.write("\n".join(lines) + "\n\n")
+
+    # Count the statements cursors are still reading, with what they have read so far.
+    def finish_pending(self):
+        for cursor in list(self.cursors):
+            cursor.finish()
+
+    # Return the summary as text, slowest statements (by total time) first.
+    def summary(self):
+        self.finish_pending()
+        with self.lock:
+            shapes = sorted(self.shapes.items(), key=lambda item: item[1].total_ms, reverse=True)
+        lines = ["Query statistics for process %d at %s: %d statements, %.1f ms"
+                 % (os.getpid(), time.strftime("%Y-%m-%d %H:%M:%S"),
+                    sum(stats.count for _, stats in shapes), sum(stats.total_ms for _, stats in shapes)),
+                 "%8s %10s %9s %9s %9s %9s %9s  %s"
+                 % ("count", "total ms", "mean ms", "p50 ms", "p95 ms", "max ms", "rows", "statement")]
+        for shape, stats in shapes:
+            lines.append("%8d %10.2f %9.3f %9.3f %9.3f %9.3f %9d  %s"
+                         % (stats.count, stats.total_ms, stats.total_ms / stats.count, stats.percentile(0.5),
+                            stats.percentile(0.95), stats.max_ms, stats.rows, shape))
+            lines.append("%49s histogram: %s" % ("", " ".join(
+                "%s:%d" % ("<=%gms" % LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS)
+                           else ">%gms" % LATENCY_BUCKETS_MS[-1], count)
+                for index, count in enumerate(stats.buckets) if count)))
+        return "\n".join(lines) + "\n"
+
+    # Add the summary to a file.
+    def dump(self, path):
+        text = self.summary()
+        with open(path, "a", encoding="utf-8") as summary:
+            summary.write(text + "\n")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+
+    # The statement being read, as [sql, parameters, milliseconds so far, rows so far].
+    pending = None
+
+    def execute(self, sql, parameters=()):
+        self.finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self.started(sql, parameters, start)
+        return self
+
+    def executemany(self, sql, parameters):
+        self.finish()
+        # Only a list of parameters can be shown again in the slow query log;
+        # an iterator is used up by executemany.
+        shown = parameters[0] if isinstance(parameters, (list, tuple)) and parameters else None
+        start = time.perf_counter()
+        super().executemany(sql, parameters)
+        self.started(sql, shown, start)
+        return self
+
+    # Statements that return no rows are counted straight away; for the others
+    # the time spent fetching is added until the rows run out.
+    def started(self, sql, parameters, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if self.description is None:
+            self.record(sql, parameters, elapsed_ms, max(self.rowcount, 0))
+        else:
+            self.pending = [sql, parameters, elapsed_ms, 0]
+            QUERY_STATS.cursors.add(self)
+
+    def fetched(self, start, rows, done):
+        pending = self.pending
+        if pending is not None:
+            pending[2] += (time.perf_counter() - start) * 1000
+            pending[3] += rows
+            if done:
+                self.finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self.fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self.fetched(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self.fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self.fetched(start, 0, True)
+            raise
+        self.fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    # Count the statement being read, if there is one.
+    def finish(self):
+        pending = self.pending
+        if pending is not None:
+            self.pending = None
+            QUERY_STATS.cursors.discard(self)
+            self.record(*pending)
+
+    def record(self, sql, parameters, elapsed_ms, rows):
+        QUERY_STATS.record(sql, elapsed_ms, rows)
+        if elapsed_ms >= QUERY_STATS.slow_query_ms:
+            QUERY_STATS.log_slow(self.connection, sql, parameters, elapsed_ms, rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute does not go through cursor(), so it is replaced to
+    # make the statements run on the connection instrumented as well.
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        super().commit()
+        QUERY_STATS.record("COMMIT", (time.perf_counter() - start) * 1000, 0)
+
+
+# The statistics of the whole process, shared by all instrumented connections.
+QUERY_STATS = QueryStats()
+started = False
+
+
+# Add the summary to the summary file now. Also called on exit and, through
+# dump_query_stats_on_signal, on SIGUSR1.
+def dump_query_stats(*_):
+    path = configured_summary_path()
+    if path is not None:
+        QUERY_STATS.dump(path)
+
+
+# The SIGUSR1 handler. Python runs it on the main thread between two
+# statements, possibly while that thread holds QUERY_STATS.lock in record, so
+# the summary is written from a thread of its own, which waits for the lock to
+# be released instead of deadlocking on it.
+def dump_query_stats_on_signal(*_):
+    threading.Thread(target=dump_query_stats, name="query stats dump").start()
+
+
+# Turn instrumentation on for this process, reading the settings from the
+# environment, and return the connection class to open connections with.
+def start_query_stats():
+    global started
+    if not started:
+        started = True
+        QUERY_STATS.slow_query_ms = configured_slow_query_ms()
+        QUERY_STATS.slow_query_log = os.environ.get("TWITTERLIKE_SLOW_QUERY_LOG") or DEFAULT_SLOW_QUERY_LOG
+        atexit.register(dump_query_stats)
+        # Signal handlers can only be set from the main thread.
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, dump_query_stats_on_signal)
+    return InstrumentedConnection
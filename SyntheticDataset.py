@@ -0,0 +1,252 @@
+################
+## Code Notes ##
+################
+# This file contains the synthetic dataset generator used to test how
+# TwitterLike behaves with many users. It fills an empty database with a
+# configurable number of users, follows, tweets, likes and comments:
+# - who gets followed follows a power law, so a few accounts have a very
+#   large number of followers and most have only a handful
+# - tweets are spread over the users with a milder skew, and the number of
+#   likes and comments on each tweet also follows a power law
+# - every value comes from a random.Random seeded by the caller, so the same
+#   seed and sizes always produce the same database
+#
+# To load quickly, everything is inserted with executemany in one transaction,
+# with the rollback journal kept in memory and syncing turned off. The indexes
+# and triggers are dropped before the load and created again afterwards, and
+# the tweet_stats and follow_counts counters, home timelines, search indexes
+# and hashtag and mention indexes are then rebuilt in one pass each instead of
+# row by row.
+# If anything fails the transaction is rolled back and the database is left empty.
+#
+# Run through "DatabaseModuleStarter.py", for example:
+# python DatabaseModuleStarter.py --generate --users 100000 --tweets 1000000
+
+#### Start Program ####
+
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from DatabaseModuleStarter import (create_tables, rebuild_tweet_stats, rebuild_home_timeline_sizes,
+                                   rebuild_follow_counts)
+from HomeTimeline import rebuild_home_timelines
+from TweetSearch import rebuild_search_index
+from TweetTags import index_existing_tweets
+from Trending import rebuild_trending
+from PasswordHashing import hash_password
+
+# Every synthetic user has this password, so any of them can log in to the CLI.
+# The hash is computed once, since hashing millions of passwords would take hours.
+SYNTHETIC_PASSWORD = "synth123!"
+# Rows passed to each executemany call, and how often progress is reported.
+BATCH_SIZE = 50000
+# Skew of the power laws. The n-th most followed account is followed in
+# proportion to 1 / n ** FOLLOW_EXPONENT, and the n-th most active account
+# tweets in proportion to 1 / n ** ACTIVITY_EXPONENT.
+FOLLOW_EXPONENT = 1.0
+ACTIVITY_EXPONENT = 0.5
+# Shape of the Pareto distributions used for the number of follows per user
+# and the number of likes and comments per tweet. Smaller is more skewed.
+PARETO_SHAPE = 1.5
+# The tweets are spread evenly over this period, oldest first.
+FIRST_TWEET_TIME = datetime(2023, 1, 1)
+TWEET_PERIOD = timedelta(days=365)
+# Each like and comment is made at a random time up to this long after the tweet.
+LIKE_DELAY = timedelta(days=1)
+COMMENT_DELAY = timedelta(days=1)
+
+# Words used to make up tweets and comments. A few hashtags, mentions and
+# emoji aliases are included so that features which look for them have data.
+WORDS = ("the", "a", "my", "your", "this", "that", "today", "finally", "never", "always",
+         "love", "hate", "coffee", "code", "python", "data", "database", "sleep", "project",
+         "weekend", "exam", "lecture", "deadline", "bug", "feature", "query", "index",
+         "is", "was", "so", "very", "not", "really", "why", "how", "what", "good", "bad",
+         "great", "tired", "happy", "again", "just", "shipped", "broke", "fixed",
+         "#python", "#sqlite", "#datascience", "#mondays", "#coffee",
+         "@user1", "@user2", ":thumbs_up:", ":red_heart:", ":fire:")
+
+
+# Return a count drawn from a Pareto distribution whose mean is close to mean.
+# The fraction is rounded up or down at random so that the average is kept
+# even when the mean is below one.
+def pareto_count(rng, mean):
+    scale = mean * (PARETO_SHAPE - 1) / PARETO_SHAPE
+    return int(rng.paretovariate(PARETO_SHAPE) * scale + rng.random())
+
+
+# Return the user ids in a random order together with cumulative power-law
+# weights for them, for use with rng.choices. The first id in the list is
+# the most likely one to be picked.
+def power_law_users(rng, users, exponent):
+    ranked_users = list(range(1, users + 1))
+    rng.shuffle(ranked_users)
+    cumulative_weights = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, users + 1)))
+    return ranked_users, cumulative_weights
+
+
+# Make up the text of a tweet or comment.
+def random_text(rng, shortest, longest):
+    return " ".join(rng.choices(WORDS, k=rng.randint(shortest, longest)))
+
+
+def generate_users(users, password_hash):
+    for user_id in range(1, users + 1):
+        yield (user_id, "user%d" % user_id, password_hash, "Synthetic User %d" % user_id)
+
+
+# Each user follows a Pareto distributed number of accounts, picked with the
+# power-law weights, so the most popular accounts collect most of the follows.
+def generate_follows(rng, users, follows_per_user):
+    ranked_users, cumulative_weights = power_law_users(rng, users, FOLLOW_EXPONENT)
+    for follower_id in range(1, users + 1):
+        wanted = min(users - 1, pareto_count(rng, follows_per_user))
+        following = set(rng.choices(ranked_users, cum_weights=cumulative_weights, k=wanted))
+        following.discard(follower_id)
+        for following_id in sorted(following):
+            yield (follower_id, following_id)
+
+
+def generate_tweets(rng, users, tweets):
+    ranked_users, cumulative_weights = power_law_users(rng, users, ACTIVITY_EXPONENT)
+    step = TWEET_PERIOD / max(tweets, 1)
+    for tweet_id in range(1, tweets + 1):
+        author_id = rng.choices(ranked_users, cum_weights=cumulative_weights)[0]
+        created = FIRST_TWEET_TIME + step * (tweet_id - 1)
+        yield (tweet_id, author_id, random_text(rng, 3, 15), created.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+# Each tweet gets a Pareto distributed number of likes, from different users.
+# The like times are in seconds since the epoch, as they are in the CLI.
+def generate_likes(rng, users, tweets, likes):
+    mean = likes / max(tweets, 1)
+    step = TWEET_PERIOD / max(tweets, 1)
+    for tweet_id in range(1, tweets + 1):
+        created = (FIRST_TWEET_TIME + step * (tweet_id - 1) - datetime(1970, 1, 1)).total_seconds()
+        for user_id in rng.sample(range(1, users + 1), min(users, pareto_count(rng, mean))):
+            yield (user_id, tweet_id, created + rng.random() * LIKE_DELAY.total_seconds())
+
+
+# Each tweet gets a Pareto distributed number of comments. A user may comment
+# on the same tweet more than once. The comment times are written like the
+# tweet times, since comment_timestamp is a TIMESTAMP column as well.
+def generate_comments(rng, users, tweets, comments):
+    mean = comments / max(tweets, 1)
+    step = TWEET_PERIOD / max(tweets, 1)
+    for tweet_id in range(1, tweets + 1):
+        created = FIRST_TWEET_TIME + step * (tweet_id - 1)
+        for _ in range(pareto_count(rng, mean)):
+            commented = created + rng.random() * COMMENT_DELAY
+            yield (rng.randint(1, users), tweet_id, random_text(rng, 1, 8),
+                   commented.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+# Insert rows from a generator in batches, reporting progress and throughput.
+# Returns the number of rows inserted.
+def insert_rows(cursor, table, sql, rows, expected, report):
+    inserted = 0
+    start = time.perf_counter()
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        cursor.executemany(sql, batch)
+        inserted += len(batch)
+        elapsed = time.perf_counter() - start
+        report("%-12s %12d / ~%d rows  %10.0f rows/s" % (table, inserted, expected, inserted / max(elapsed, 1e-9)))
+    return inserted
+
+
+# Run one step of the load and report how long it took.
+def timed_step(description, step, cursor, report):
+    start = time.perf_counter()
+    step(cursor)
+    report("%-40s %8.1f s" % (description, time.perf_counter() - start))
+
+
+# Fill an empty database with a synthetic dataset. likes and comments are
+# approximate totals, since the number per tweet is random. report is
+# called with a line of text for each progress update. Returns a dictionary
+# with the number of rows inserted into each table.
+def generate_dataset(conn, users, follows_per_user, tweets, likes, comments, seed=1, report=print):
+    cursor = conn.cursor()
+    create_tables(cursor)
+    cursor.execute('''SELECT 1 FROM user_profiles LIMIT 1''')
+    if cursor.fetchone() is not None:
+        raise ValueError("The database already contains users; generate into an empty database.")
+
+    rng = random.Random(seed)
+    password_hash = hash_password(SYNTHETIC_PASSWORD)
+    start = time.perf_counter()
+
+    # Relax the durability settings for the load. They are put back afterwards.
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA foreign_keys = OFF")
+
+    counts = dict()
+    cursor.execute("BEGIN")
+    try:
+        # Remember and drop the indexes and triggers, so that rows are only appended
+        # during the load and every index is then built in one sorted pass.
+        cursor.execute('''SELECT type, name, sql FROM sqlite_master
+                       WHERE type IN ('index', 'trigger') AND sql IS NOT NULL''')
+        deferred = cursor.fetchall()
+        for object_type, name, sql in deferred:
+            cursor.execute("DROP %s %s" % (object_type.upper(), name))
+
+        counts["user_profiles"] = insert_rows(cursor, "users",
+            '''INSERT INTO user_profiles (user_id, username, password, full_name) VALUES (?, ?, ?, ?)''',
+            generate_users(users, password_hash), users, report)
+        counts["followers_following"] = insert_rows(cursor, "follows",
+            '''INSERT INTO followers_following (follower_user_id, following_user_id) VALUES (?, ?)''',
+            generate_follows(rng, users, follows_per_user), users * follows_per_user, report)
+        counts["tweets"] = insert_rows(cursor, "tweets",
+            '''INSERT INTO tweets (tweet_id, user_id, tweet_content, creation_timestamp) VALUES (?, ?, ?, ?)''',
+            generate_tweets(rng, users, tweets), tweets, report)
+        counts["likes_retweets"] = insert_rows(cursor, "likes",
+            '''INSERT INTO likes_retweets (user_id, tweet_id, liked_at) VALUES (?, ?, ?)''',
+            generate_likes(rng, users, tweets, likes), likes, report)
+        counts["comments"] = insert_rows(cursor, "comments",
+            '''INSERT INTO comments (user_id, tweet_id, comment_text, comment_timestamp) VALUES (?, ?, ?, ?)''',
+            generate_comments(rng, users, tweets, comments), comments, report)
+
+        # Build the indexes first so that the rebuilds below can use them, and
+        # create the triggers last so that they do not fire for the rebuilt rows.
+        def create_indexes(cursor):
+            for object_type, name, sql in deferred:
+                if object_type == "index":
+                    cursor.execute(sql)
+
+        def create_triggers(cursor):
+            for object_type, name, sql in deferred:
+                if object_type == "trigger":
+                    cursor.execute(sql)
+
+        timed_step("Create indexes", create_indexes, cursor, report)
+        timed_step("Count likes and comments", rebuild_tweet_stats, cursor, report)
+        timed_step("Count followers and following", rebuild_follow_counts, cursor, report)
+        timed_step("Build home timelines", rebuild_home_timelines, cursor, report)
+        timed_step("Count home timeline entries", rebuild_home_timeline_sizes, cursor, report)
+        timed_step("Build search indexes", rebuild_search_index, cursor, report)
+        timed_step("Index hashtags and mentions",
+                   lambda cursor: index_existing_tweets(cursor, BATCH_SIZE, lambda line: None, commit=False),
+                   cursor, report)
+        timed_step("Count trending tweets and hashtags", rebuild_trending, cursor, report)
+        timed_step("Create triggers", create_triggers, cursor, report)
+        # The follows were loaded without the triggers, so mark the follow graph as changed.
+        cursor.execute('''UPDATE follow_graph_version SET version = version + 1 WHERE id = 1''')
+        cursor.execute("COMMIT")
+    except:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    report("Loaded %d rows in %.1f s (%.0f rows/s)" % (total, elapsed, total / max(elapsed, 1e-9)))
+    return counts
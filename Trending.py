@@ -0,0 +1,222 @@
+################
+## Code Notes ##
+################
+# This file contains the trending tweets and hashtags: the tweets with the
+# most likes and the hashtags used the most over the last hour and the last
+# day. Nothing is counted when the trends are shown. Instead every like,
+# unlike and new tweet updates two kinds of counters in the same transaction:
+# - bucket counters, the likes of each tweet and the uses of each hashtag in
+#   each 5 minute bucket of time (tweet_trend_buckets, hashtag_trend_buckets)
+# - running totals for each period (trending_tweets, trending_hashtags),
+#   which add up the buckets from the period's first bucket onwards. The
+#   first bucket of each period is kept in trending_periods
+# As time passes, advance_trending moves each period's first bucket forward
+# and subtracts the buckets that have fallen out of it from the totals, then
+# removes the buckets older than every period. Each bucket is only added and
+# subtracted once, so this costs the same as the counting itself, spread out.
+# Writes advance the periods in their own transaction; showing the trends only
+# needs to, and only takes the write lock, when trending_is_behind, which is
+# at most once per bucket.
+#
+# The totals are indexed by count, so showing the top tweets or hashtags of a
+# period reads only those rows, however many likes and tweets there are. The
+# tables are created in "DatabaseModuleStarter.py", and rebuild_trending
+# recounts them from likes_retweets.liked_at and the hashtags table.
+
+#### Start Program ####
+
+import time
+
+# The length of each bucket in seconds. The periods below move forward one
+# bucket at a time, so they are accurate to within this.
+BUCKET_SECONDS = 300
+# The trending periods and their length in seconds, shortest first.
+TRENDING_PERIODS = {"hour": 3600, "day": 86400}
+# The number of tweets and hashtags shown for each period.
+TRENDING_COUNT = 10
+
+# The counters of each trend as (bucket table, totals table, item column, count column).
+TRENDS = {"tweets": ("tweet_trend_buckets", "trending_tweets", "tweet_id", "likes"),
+          "hashtags": ("hashtag_trend_buckets", "trending_hashtags", "tag", "uses")}
+
+# The queries that keep the counters, written for any trend: %(buckets)s,
+# %(totals)s, %(item)s and %(count)s stand for the tables and columns of
+# TRENDS and are filled in by trend_query.
+EXPIRE_QUERY = '''UPDATE %(totals)s SET %(count)s = %(totals)s.%(count)s - expired.total
+                  FROM (SELECT %(item)s, SUM(%(count)s) AS total FROM %(buckets)s
+                        WHERE bucket >= ? AND bucket < ?
+                        GROUP BY %(item)s) AS expired
+                  WHERE %(totals)s.period = ? AND %(totals)s.%(item)s = expired.%(item)s'''
+DROP_EXPIRED_QUERY = '''DELETE FROM %(totals)s WHERE period = ? AND %(count)s <= 0'''
+DROP_OLD_BUCKETS_QUERY = '''DELETE FROM %(buckets)s WHERE bucket < ?'''
+ADD_TO_BUCKET_QUERY = '''INSERT INTO %(buckets)s (bucket, %(item)s, %(count)s) VALUES (?, ?, ?)
+                         ON CONFLICT (bucket, %(item)s) DO UPDATE SET %(count)s = %(count)s + excluded.%(count)s'''
+ADD_TO_TOTALS_QUERY = '''INSERT INTO %(totals)s (period, %(item)s, %(count)s)
+                         SELECT period, ?, ? FROM trending_periods WHERE first_bucket <= ?
+                         ON CONFLICT (period, %(item)s) DO UPDATE SET %(count)s = %(count)s + excluded.%(count)s'''
+DROP_EMPTY_BUCKET_QUERY = '''DELETE FROM %(buckets)s WHERE bucket = ? AND %(item)s = ? AND %(count)s <= 0'''
+DROP_EMPTY_TOTALS_QUERY = '''DELETE FROM %(totals)s WHERE period IN (SELECT period FROM trending_periods)
+                             AND %(item)s = ? AND %(count)s <= 0'''
+
+# The reads of the trending lists.
+TRENDING_TWEETS_QUERY = '''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content,
+                           COALESCE(tweet_stats.like_count, 0), COALESCE(tweet_stats.comment_count, 0),
+                           trending_tweets.likes
+                           FROM trending_tweets
+                           INNER JOIN tweets ON tweets.tweet_id = trending_tweets.tweet_id
+                           INNER JOIN user_profiles ON user_profiles.user_id = tweets.user_id
+                           LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                           WHERE trending_tweets.period = ?
+                           ORDER BY trending_tweets.likes DESC, trending_tweets.tweet_id DESC
+                           LIMIT ?'''
+TRENDING_HASHTAGS_QUERY = '''SELECT tag, uses FROM trending_hashtags
+                             WHERE period = ?
+                             ORDER BY uses DESC, tag DESC
+                             LIMIT ?'''
+
+
+# Fill in the tables and columns of a trend in one of the queries above.
+def trend_query(query, trend):
+    buckets_table, totals_table, item_column, count_column = TRENDS[trend]
+    return query % {"buckets": buckets_table, "totals": totals_table,
+                    "item": item_column, "count": count_column}
+
+
+# The bucket a time (in seconds since the epoch) falls in.
+def bucket_of(timestamp):
+    return int(timestamp // BUCKET_SECONDS)
+
+
+# The first bucket of a period ending in the given bucket.
+def first_bucket_of(period, bucket):
+    return bucket - TRENDING_PERIODS[period] // BUCKET_SECONDS + 1
+
+
+# Return True if a period no longer ends at the current bucket and has to be
+# moved forward by advance_trending. This only reads, so it can be asked on
+# any connection.
+def trending_is_behind(cursor, now=None):
+    if now is None:
+        now = time.time()
+    current_bucket = bucket_of(now)
+    cursor.execute('''SELECT period, first_bucket FROM trending_periods''')
+    return any(first_bucket_of(period, current_bucket) > first_bucket
+               for period, first_bucket in cursor.fetchall())
+
+
+# Move every period forward to end at the current bucket, subtracting the
+# buckets that are no longer in it from its totals, and remove the buckets
+# that are no longer in any period. Does nothing if every period is already
+# up to date.
+def advance_trending(cursor, now=None):
+    if now is None:
+        now = time.time()
+    current_bucket = bucket_of(now)
+    cursor.execute('''SELECT period, first_bucket FROM trending_periods''')
+    periods = cursor.fetchall()
+    if all(first_bucket_of(period, current_bucket) <= first_bucket for period, first_bucket in periods):
+        return
+    oldest_bucket = current_bucket
+    for period, first_bucket in periods:
+        new_first_bucket = first_bucket_of(period, current_bucket)
+        oldest_bucket = min(oldest_bucket, max(first_bucket, new_first_bucket))
+        if new_first_bucket <= first_bucket:
+            continue
+        for trend in TRENDS:
+            cursor.execute(trend_query(EXPIRE_QUERY, trend), (first_bucket, new_first_bucket, period))
+            cursor.execute(trend_query(DROP_EXPIRED_QUERY, trend), (period,))
+        cursor.execute('''UPDATE trending_periods SET first_bucket = ? WHERE period = ?''',
+                       (new_first_bucket, period))
+    for trend in TRENDS:
+        cursor.execute(trend_query(DROP_OLD_BUCKETS_QUERY, trend), (oldest_bucket,))
+
+
+# Add amount (1, or -1 to take one away) to the count of each item of a trend
+# at the given time. Periods that have already moved past that time are not
+# changed, and neither are buckets that have already been removed.
+def add_to_trend(cursor, trend, items, amount, timestamp, now=None):
+    advance_trending(cursor, now)
+    bucket = bucket_of(timestamp)
+    cursor.execute('''SELECT MIN(first_bucket) FROM trending_periods''')
+    oldest_bucket = cursor.fetchone()[0]
+    if oldest_bucket is None or bucket < oldest_bucket:
+        return
+    for item in items:
+        cursor.execute(trend_query(ADD_TO_BUCKET_QUERY, trend), (bucket, item, amount))
+        cursor.execute(trend_query(ADD_TO_TOTALS_QUERY, trend), (item, amount, bucket))
+        if amount < 0:
+            cursor.execute(trend_query(DROP_EMPTY_BUCKET_QUERY, trend), (bucket, item))
+            cursor.execute(trend_query(DROP_EMPTY_TOTALS_QUERY, trend), (item,))
+
+
+# Count a like of a tweet made at liked_at.
+def record_like(cursor, tweet_id, liked_at, now=None):
+    add_to_trend(cursor, "tweets", [tweet_id], 1, liked_at, now)
+
+
+# Take back a like of a tweet made at liked_at. Likes made before the time of
+# each like was kept have no liked_at and were never counted.
+def record_unlike(cursor, tweet_id, liked_at, now=None):
+    if liked_at is not None:
+        add_to_trend(cursor, "tweets", [tweet_id], -1, liked_at, now)
+
+
+# Count the hashtags of a tweet posted now.
+def record_hashtags(cursor, tags, now=None):
+    if now is None:
+        now = time.time()
+    if tags:
+        add_to_trend(cursor, "hashtags", tags, 1, now, now)
+
+
+# Return the tweets with the most likes over a period, most liked first, as
+# rows of (username, tweet_id, tweet_content, like count, comment count,
+# likes in the period). advance_trending should be called first.
+def read_trending_tweets(cursor, period, limit=TRENDING_COUNT):
+    cursor.execute(TRENDING_TWEETS_QUERY, (period, limit))
+    return cursor.fetchall()
+
+
+# Return the hashtags used the most over a period, most used first, as rows
+# of (tag, uses in the period). advance_trending should be called first.
+def read_trending_hashtags(cursor, period, limit=TRENDING_COUNT):
+    cursor.execute(TRENDING_HASHTAGS_QUERY, (period, limit))
+    return cursor.fetchall()
+
+
+# Recount every trend from scratch: the likes from likes_retweets.liked_at
+# and the hashtags from the hashtags table and the time each tweet was posted.
+def rebuild_trending(cursor, now=None):
+    if now is None:
+        now = time.time()
+    current_bucket = bucket_of(now)
+    for buckets_table, totals_table, item_column, count_column in TRENDS.values():
+        cursor.execute('''DELETE FROM %s''' % buckets_table)
+        cursor.execute('''DELETE FROM %s''' % totals_table)
+    cursor.execute('''DELETE FROM trending_periods''')
+    cursor.executemany('''INSERT INTO trending_periods (period, first_bucket) VALUES (?, ?)''',
+                       [(period, first_bucket_of(period, current_bucket)) for period in TRENDING_PERIODS])
+    oldest_bucket = min(first_bucket_of(period, current_bucket) for period in TRENDING_PERIODS)
+
+    cursor.execute('''INSERT INTO tweet_trend_buckets (bucket, tweet_id, likes)
+                   SELECT CAST(liked_at / ? AS INTEGER), tweet_id, COUNT(*) FROM likes_retweets
+                   WHERE liked_at >= ? AND liked_at < ?
+                   GROUP BY 1, 2''',
+                   (BUCKET_SECONDS, oldest_bucket * BUCKET_SECONDS, (current_bucket + 1) * BUCKET_SECONDS))
+    cursor.execute('''INSERT INTO hashtag_trend_buckets (bucket, tag, uses)
+                   SELECT CAST(strftime('%s', tweets.creation_timestamp) AS INTEGER) / ?, hashtags.tag, COUNT(*)
+                   FROM hashtags
+                   INNER JOIN tweets ON tweets.tweet_id = hashtags.tweet_id
+                   WHERE CAST(strftime('%s', tweets.creation_timestamp) AS INTEGER) >= ?
+                   AND CAST(strftime('%s', tweets.creation_timestamp) AS INTEGER) < ?
+                   GROUP BY 1, 2''',
+                   (BUCKET_SECONDS, oldest_bucket * BUCKET_SECONDS, (current_bucket + 1) * BUCKET_SECONDS))
+    for buckets_table, totals_table, item_column, count_column in TRENDS.values():
+        cursor.execute('''INSERT INTO %s (period, %s, %s)
+                       SELECT trending_periods.period, %s.%s, SUM(%s.%s)
+                       FROM %s
+                       INNER JOIN trending_periods ON %s.bucket >= trending_periods.first_bucket
+                       GROUP BY 1, 2'''
+                       % (totals_table, item_column, count_column,
+                          buckets_table, item_column, buckets_table, count_column,
+                          buckets_table, buckets_table))
@@ -0,0 +1,79 @@
+################
+## Code Notes ##
+################
+# This file contains the paged reads used to display lists of tweets. Pages
+# are keyed on tweet_id (keyset pagination): each page asks for the tweets
+# older than the last tweet id already shown, so reading any page is an
+# index range scan no matter how far back the user has scrolled, and only
+# one page of rows is in memory at a time.
+#
+# The home timeline is paged the same way in "HomeTimeline.py". The hashtag
+# and mention pages read the index tables filled by "TweetTags.py".
+
+#### Start Program ####
+
+from HomeTimeline import NEWEST_TWEET_ID
+
+# The number of tweets shown on each page of the timeline and profile views.
+PAGE_SIZE = 20
+
+# The queries of the pages. Each one takes the key, the tweet id to start
+# below and the page size.
+USER_TWEETS_QUERY = '''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content,
+                       COALESCE(tweet_stats.like_count, 0), COALESCE(tweet_stats.comment_count, 0)
+                       FROM tweets
+                       INNER JOIN user_profiles ON user_profiles.user_id = tweets.user_id
+                       LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                       WHERE tweets.user_id = ? AND tweets.tweet_id < ?
+                       ORDER BY tweets.tweet_id DESC
+                       LIMIT ?'''
+TAGGED_TWEETS_QUERY = '''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content,
+                         COALESCE(tweet_stats.like_count, 0), COALESCE(tweet_stats.comment_count, 0)
+                         FROM hashtags
+                         INNER JOIN tweets ON tweets.tweet_id = hashtags.tweet_id
+                         INNER JOIN user_profiles ON user_profiles.user_id = tweets.user_id
+                         LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                         WHERE hashtags.tag = ? AND hashtags.tweet_id < ?
+                         ORDER BY hashtags.tweet_id DESC
+                         LIMIT ?'''
+MENTIONS_QUERY = '''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content,
+                    COALESCE(tweet_stats.like_count, 0), COALESCE(tweet_stats.comment_count, 0)
+                    FROM mentions
+                    INNER JOIN tweets ON tweets.tweet_id = mentions.tweet_id
+                    INNER JOIN user_profiles ON user_profiles.user_id = tweets.user_id
+                    LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                    WHERE mentions.user_id = ? AND mentions.tweet_id < ?
+                    ORDER BY mentions.tweet_id DESC
+                    LIMIT ?'''
+
+
+# Retrieve one page of a user's own tweets, newest first, as rows of
+# (username, tweet_id, tweet_content, like count, comment count). Only
+# tweets older than before_tweet_id are returned. The rows are yielded
+# from a separate cursor as they are read.
+def read_user_tweets(cursor, user_id, limit=PAGE_SIZE, before_tweet_id=None):
+    if before_tweet_id is None:
+        before_tweet_id = NEWEST_TWEET_ID
+    page = cursor.connection.execute(USER_TWEETS_QUERY, (user_id, before_tweet_id, limit))
+    for row in page:
+        yield row
+
+
+# Retrieve one page of the tweets with a hashtag, newest first, in the same
+# form as read_user_tweets. The tag is given without the #, in any case.
+def read_tagged_tweets(cursor, tag, limit=PAGE_SIZE, before_tweet_id=None):
+    if before_tweet_id is None:
+        before_tweet_id = NEWEST_TWEET_ID
+    page = cursor.connection.execute(TAGGED_TWEETS_QUERY, (tag.lower(), before_tweet_id, limit))
+    for row in page:
+        yield row
+
+
+# Retrieve one page of the tweets that mention a user, newest first, in the
+# same form as read_user_tweets.
+def read_mentions(cursor, user_id, limit=PAGE_SIZE, before_tweet_id=None):
+    if before_tweet_id is None:
+        before_tweet_id = NEWEST_TWEET_ID
+    page = cursor.connection.execute(MENTIONS_QUERY, (user_id, before_tweet_id, limit))
+    for row in page:
+        yield row
@@ -0,0 +1,76 @@
+################
+## Code Notes ##
+################
+# This file contains the full-text search over tweets and comments. The text
+# of every tweet and comment is indexed in the FTS5 tables tweets_fts and
+# comments_fts. They are external content tables: they hold only the search
+# index and read the text itself from tweets and comments. Triggers keep the
+# index in step with every insert, update and delete. The tables and
+# triggers are created in "DatabaseModuleStarter.py".
+#
+# Results are ranked with bm25, best match first, and read one page at a
+# time. Since the ranking is only known once the index has been searched,
+# pages are selected with LIMIT and OFFSET rather than by id as in the
+# timeline.
+
+#### Start Program ####
+
+from TweetPages import PAGE_SIZE
+
+# The searches. Each one takes the FTS5 query, the page size and the offset.
+SEARCH_TWEETS_QUERY = '''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content,
+                         COALESCE(tweet_stats.like_count, 0), COALESCE(tweet_stats.comment_count, 0)
+                         FROM (SELECT rowid, bm25(tweets_fts) AS score FROM tweets_fts
+                               WHERE tweets_fts MATCH ?
+                               ORDER BY score
+                               LIMIT ? OFFSET ?) AS hits
+                         INNER JOIN tweets ON tweets.tweet_id = hits.rowid
+                         INNER JOIN user_profiles ON user_profiles.user_id = tweets.user_id
+                         LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                         ORDER BY hits.score'''
+SEARCH_COMMENTS_QUERY = '''SELECT user_profiles.username, comments.tweet_id, comments.comment_text,
+                           comments.comment_text_raw IS NULL
+                           FROM (SELECT rowid, bm25(comments_fts) AS score FROM comments_fts
+                                 WHERE comments_fts MATCH ?
+                                 ORDER BY score
+                                 LIMIT ? OFFSET ?) AS hits
+                           INNER JOIN comments ON comments.comment_id = hits.rowid
+                           INNER JOIN user_profiles ON user_profiles.user_id = comments.user_id
+                           ORDER BY hits.score'''
+
+
+# Turn the words typed by a user into an FTS5 query that finds the tweets or
+# comments containing all of them. Each word is quoted, so characters that
+# have a meaning in FTS5 queries (such as quotes, * or -) are searched for as
+# text instead. Returns None if there is nothing to search for.
+def search_query(text):
+    words = text.split()
+    if not words:
+        return None
+    return " ".join('"%s"' % word.replace('"', '""') for word in words)
+
+
+# Return one page of the tweets matching the search text, best match first,
+# as rows of (username, tweet_id, tweet_content, like count, comment count).
+def search_tweets(cursor, text, page=0, page_size=PAGE_SIZE):
+    query = search_query(text)
+    if query is None:
+        return list()
+    cursor.execute(SEARCH_TWEETS_QUERY, (query, page_size, page * page_size))
+    return cursor.fetchall()
+
+
+# Return one page of the comments matching the search text, best match first,
+# as rows of (username, tweet_id, comment_text, comment not converted yet).
+def search_comments(cursor, text, page=0, page_size=PAGE_SIZE):
+    query = search_query(text)
+    if query is None:
+        return list()
+    cursor.execute(SEARCH_COMMENTS_QUERY, (query, page_size, page * page_size))
+    return cursor.fetchall()
+
+
+# Rebuild both search indexes from the tweets and comments tables.
+def rebuild_search_index(cursor):
+    cursor.execute('''INSERT INTO tweets_fts (tweets_fts) VALUES ('rebuild')''')
+    cursor.execute('''INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')''')
@@ -0,0 +1,83 @@
+################
+## Code Notes ##
+################
+# This file contains the extraction of #hashtags and @mentions from tweets.
+# When a tweet is posted, its hashtags are recorded in the hashtags table as
+# (tag, tweet_id) and the users it mentions in the mentions table as
+# (user_id, tweet_id). Both tables are keyed on those pairs, so "the tweets
+# with #tag" and "the tweets mentioning a user" are index range scans, read
+# one page at a time in "TweetPages.py", instead of LIKE '%...%' scans over
+# every tweet.
+#
+# Hashtags are stored in lower case, so #Python and #python are the same tag.
+# A mention only counts if the username exists; usernames are case sensitive,
+# as they are when logging in. The tables are created in
+# "DatabaseModuleStarter.py", and index_existing_tweets fills them for the
+# tweets posted before they existed.
+
+#### Start Program ####
+
+import re
+
+# A # or @ that does not follow a letter or digit (so "C#" and e-mail
+# addresses are not matched), followed by the tag or username.
+HASHTAG_PATTERN = re.compile(r"(?<!\w)#(\w+)")
+MENTION_PATTERN = re.compile(r"(?<!\w)@(\w+)")
+# Tweets indexed and committed at a time by index_existing_tweets.
+INDEX_CHUNK_SIZE = 1000
+
+# Recording a hashtag as (tag, tweet_id) and a mention as (tweet_id, username).
+ADD_HASHTAG_QUERY = '''INSERT OR IGNORE INTO hashtags (tag, tweet_id) VALUES (?, ?)'''
+ADD_MENTION_QUERY = '''INSERT OR IGNORE INTO mentions (user_id, tweet_id)
+                       SELECT user_id, ? FROM user_profiles WHERE username = ?'''
+
+
+# Return the distinct hashtags (in lower case) and mentioned usernames in a text.
+def extract_tags(text):
+    hashtags = set(tag.lower() for tag in HASHTAG_PATTERN.findall(text))
+    mentions = set(MENTION_PATTERN.findall(text))
+    return hashtags, mentions
+
+
+# Record the hashtags and mentions of a list of (tweet_id, text) tweets.
+def index_tweets(cursor, tweets):
+    hashtag_rows = list()
+    mention_rows = list()
+    for tweet_id, text in tweets:
+        hashtags, mentions = extract_tags(text)
+        hashtag_rows.extend((tag, tweet_id) for tag in hashtags)
+        mention_rows.extend((tweet_id, username) for username in mentions)
+    cursor.executemany(ADD_HASHTAG_QUERY, hashtag_rows)
+    cursor.executemany(ADD_MENTION_QUERY, mention_rows)
+
+
+# Record the hashtags and mentions of one new tweet, and return its hashtags.
+def index_tweet(cursor, tweet_id, text):
+    index_tweets(cursor, [(tweet_id, text)])
+    return extract_tags(text)[0]
+
+
+# Index every tweet already in the database, a chunk at a time in tweet id
+# order. Indexing a tweet twice does nothing, so this can be run again at any
+# time. Unless commit is False, each chunk is committed so that other
+# sessions can write in between. Returns the number of tweets read.
+def index_existing_tweets(cursor, chunk_size=INDEX_CHUNK_SIZE, report=print, commit=True):
+    indexed = 0
+    last_id = 0
+    while True:
+        # Hashtags and mentions are found in the text as typed, when it was kept.
+        cursor.execute('''SELECT tweet_id, COALESCE(tweet_content_raw, tweet_content) FROM tweets
+                       WHERE tweet_id > ?
+                       ORDER BY tweet_id
+                       LIMIT ?''',
+                       (last_id, chunk_size))
+        tweets = cursor.fetchall()
+        if not tweets:
+            break
+        index_tweets(cursor, tweets)
+        if commit:
+            cursor.connection.commit()
+        indexed += len(tweets)
+        last_id = tweets[-1][0]
+        report("%10d tweets indexed" % indexed)
+    return indexed
@@ -0,0 +1,543 @@
+################
+## Code Notes ##
+################
+# This file contains the TwitterLikeStore class, which holds all of the
+# database logic of TwitterLike: logging in, registering, posting, reading
+# the timeline, liking, following and commenting. None of its methods ask
+# for input, print or sleep; they take plain values and return data, so the
+# same operations can be used by "CommandLineInterface.py", by the benchmarks
+# and by any other front end.
+#
+# Every method that changes the database goes through write, and has
+# committed its change before returning, the same as the CLI did after each
+# action. When a WriteQueue is passed to the store (see "WriteQueue.py"), the
+# writes are made by the queue's writer thread instead, grouped with the
+# writes of other sessions into shared transactions.
+
+#### Start Program ####
+
+import time
+
+from DatabaseConnection import DATABASE_PATH, get_read_connection, get_write_connection
+from DatabaseModuleStarter import get_schema_version, migrate_database
+from HomeTimeline import fan_out_tweet, backfill_follow, purge_unfollow, read_home_timeline
+from TweetPages import PAGE_SIZE, read_user_tweets, read_tagged_tweets, read_mentions
+from TweetTags import index_tweet
+from FollowPages import FOLLOW_PAGE_SIZE, read_followers, read_following, read_follow_counts
+from TweetSearch import search_tweets, search_comments
+from PasswordHashing import hash_password, hash_passwords, check_password, needs_rehash
+from EmojiText import render_emoji
+from Trending import (advance_trending, trending_is_behind, record_like, record_unlike, record_hashtags,
+                      read_trending_tweets, read_trending_hashtags)
+from FollowGraph import (FollowGraph, GRAPH_REFRESH_SECONDS, SNAPSHOT_EVERY_CHANGES,
+                         configured_snapshot_path, read_graph_version)
+from LoginRateLimiter import check_login_allowed, reset_login_limit, prune_login_buckets
+from UserCache import UserCache
+
+# Used to check password requirements.
+SPECIAL_CHARACTERS = "[@_!$%^&*()<>?/\\|}{~:]#+-=,.`"
+
+# Results of follow_user and unfollow_user.
+FOLLOWED = "followed"
+UNFOLLOWED = "unfollowed"
+FOLLOWING_SELF = "following self"
+USER_NOT_FOUND = "user not found"
+ALREADY_FOLLOWING = "already following"
+NOT_FOLLOWING = "not following"
+
+# Results of toggle_likes for each tweet.
+LIKED = "liked"
+UNLIKED = "unliked"
+TWEET_NOT_FOUND = "tweet not found"
+
+
+# The range of an SQLite INTEGER. An id outside it cannot be in the database,
+# and SQLite raises OverflowError if it is passed as a parameter.
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+
+# Check whether an id typed by the user is a whole number too large for the
+# database, so it can be treated as not found without being queried.
+def outside_integer_range(value):
+    return isinstance(value, int) and not MIN_INTEGER <= value <= MAX_INTEGER
+
+
+# The lookups of the store, which "benchmarks/QueryPlanCheck.py" also checks
+# against the query planner.
+LOGIN_QUERY = '''SELECT user_id, password, full_name FROM user_profiles WHERE username = ?'''
+TWEET_QUERY = '''SELECT tweet_content, COALESCE(tweet_stats.comment_count, 0)
+                 FROM tweets
+                 LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                 WHERE tweets.tweet_id = ?'''
+AUTHOR_TWEET_QUERY = TWEET_QUERY + ''' AND tweets.user_id = ?'''
+TWEET_EXISTS_QUERY = '''SELECT 1 FROM tweets WHERE tweet_id = ?'''
+COMMENTS_QUERY = '''SELECT user_profiles.username, comment_text, comment_text_raw IS NULL
+                    FROM comments
+                    INNER JOIN user_profiles ON comments.user_id = user_profiles.user_id
+                    WHERE tweet_id = ?'''
+LIKED_TWEETS_QUERY = '''SELECT tweets.tweet_id, tweets.tweet_content, COALESCE(tweet_stats.like_count, 0)
+                        FROM likes_retweets
+                        INNER JOIN tweets ON likes_retweets.tweet_id = tweets.tweet_id
+                        LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id
+                        WHERE likes_retweets.user_id = ?
+                        ORDER BY likes_retweets.tweet_id'''
+HAS_LIKED_QUERY = '''SELECT 1 FROM likes_retweets WHERE user_id = ? AND tweet_id = ?'''
+ADD_LIKE_QUERY = '''INSERT OR IGNORE INTO likes_retweets (user_id, tweet_id, liked_at) VALUES (?,?,?)'''
+REMOVE_LIKE_QUERY = '''DELETE FROM likes_retweets WHERE user_id = ? AND tweet_id = ? RETURNING liked_at'''
+IS_FOLLOWING_QUERY = '''SELECT 1 FROM followers_following
+                        WHERE follower_user_id = ? AND following_user_id = ?'''
+FOLLOW_QUERY = '''INSERT OR IGNORE INTO followers_following (follower_user_id, following_user_id)
+                  VALUES (?, ?)'''
+UNFOLLOW_QUERY = '''DELETE FROM followers_following
+                    WHERE follower_user_id = ? AND following_user_id = ?'''
+
+
+# Raised when the database file has not been created by "DatabaseModuleStarter.py".
+class DatabaseNotInitializedError(Exception):
+    pass
+
+
+# Check a new password against the password rules. Returns a message
+# explaining the problem, or None if the password is accepted.
+def check_password_rules(username, password):
+    if password == username: # Passwords cannot be the same as the username for security purposes.
+        return "Password cannot be the same as your username. Please choose a different password."
+    if not password:
+        return "Please enter a valid password to proceed."
+    # Count the number of letters, numbers, and special characters in the password.
+    letter_count = 0
+    number_count = 0
+    special_char_count = 0
+    for char in password:
+        if char.isalpha():
+            letter_count += 1
+        elif char.isdigit():
+            number_count += 1
+        elif char in SPECIAL_CHARACTERS:
+            special_char_count += 1
+    if letter_count >= 3 and number_count >= 2 and special_char_count >= 1:
+        return None
+    return "Password must contain at least three letters, two numbers, and a special character. Please try another password."
+
+
+class TwitterLikeStore:
+    # Open the database, upgrade its schema if needed, and open a second,
+    # read-only connection for the operations that only display data. In WAL
+    # mode it reads the last committed state without waiting for other
+    # sessions' writes. With normalize_emoji, the emoji aliases in new tweets
+    # and comments are converted once when they are stored (see "EmojiText.py").
+    # write_queue is an optional WriteQueue on the same database file.
+    def __init__(self, path=DATABASE_PATH, normalize_emoji=True, write_queue=None):
+        self.normalize_emoji = normalize_emoji
+        self.write_queue = write_queue
+        self.conn = get_write_connection(path)
+        self.cursor = self.conn.cursor()
+        # Check if the database tables exist. A database with a schema version has
+        # them; only databases from before the migrations need to be looked at.
+        if get_schema_version(self.cursor) == 0:
+            self.cursor.execute('''SELECT name FROM sqlite_master
+                                WHERE type = 'table' and name = 'user_profiles';''')
+            if self.cursor.fetchone() is None:
+                self.conn.close()
+                raise DatabaseNotInitializedError(path)
+        # Upgrade databases created by an older version of "DatabaseModuleStarter.py"
+        # by applying any schema migrations they are missing.
+        migrate_database(self.cursor)
+        self.read_conn = get_read_connection(path)
+        self.read_cursor = self.read_conn.cursor()
+        # The follow graph used for recommendations, loaded the first time it is needed.
+        self.follow_graph = None
+        self.graph_snapshot = configured_snapshot_path()
+        self.graph_changes_since_snapshot = 0
+        # Recently used user records, so the same user is not looked up again and again.
+        self.user_cache = UserCache()
+
+    # Commit anything outstanding, save the follow graph snapshot if it has
+    # changed, and close both connections.
+    def close(self):
+        self.conn.commit()
+        if self.follow_graph is not None and self.graph_snapshot and self.graph_changes_since_snapshot:
+            self.follow_graph.save(self.graph_snapshot)
+        self.read_conn.close()
+        self.conn.close()
+
+    # Make a change to the database and commit it. operation is called with a
+    # cursor and returns the result of the change; it must not commit. Without
+    # a write queue it runs on this store's connection, and is rolled back if
+    # it fails. With one, it runs on the queue's writer thread and this waits
+    # until the transaction holding it has committed, so in both cases the
+    # change is committed when write returns.
+    def write(self, operation):
+        if self.write_queue is not None:
+            return self.write_queue.submit(operation).result()
+        try:
+            result = operation(self.cursor)
+        except:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return result
+
+    #### Users ####
+
+    # Check a username and password. Returns True if they match a user, whose
+    # record is then cached as it is about to be used. If the stored hash was
+    # made with a lower bcrypt work factor than the current one, it is replaced
+    # by a new hash of the password while it is known.
+    def check_login(self, username, password):
+        self.cursor.execute(LOGIN_QUERY, (username,))
+        user = self.cursor.fetchone()
+        if user is None or not check_password(user[1], password):
+            return False
+        self.user_cache.remember((user[0], username, user[2]))
+        if needs_rehash(user[1]):
+            password_hash = hash_password(password)
+            self.write(lambda cursor: cursor.execute('''UPDATE user_profiles SET password = ? WHERE user_id = ?''',
+                                                     (password_hash, user[0])))
+        return True
+
+    # Log in with the login rate limiter in front of the password check. Returns
+    # (True, 0) on success, (False, 0) for a wrong username or password, and
+    # (False, seconds) when there have been too many attempts for the username
+    # or the source; the password is then not checked at all. source identifies
+    # where the attempt comes from, for example LoginRateLimiter.local_source().
+    def login(self, username, password, source=None):
+        def check_allowed(cursor):
+            prune_login_buckets(cursor)
+            return check_login_allowed(cursor, username, source)
+        retry_after = self.write(check_allowed)
+        if retry_after:
+            return False, retry_after
+        if not self.check_login(username, password):
+            return False, 0
+        self.write(lambda cursor: reset_login_limit(cursor, username, source))
+        return True, 0
+
+    # Check whether a username is already taken.
+    def username_exists(self, username):
+        return self.user_cache.by_username(self.cursor, username) is not None
+
+    # Create a new user and return their user id. The password must already have
+    # passed check_password_rules; it is hashed before it is stored. The user id
+    # is assigned by the database.
+    def register_user(self, username, password, full_name="", email="", profile_image=""):
+        password = hash_password(password)
+        def insert_user(cursor):
+            cursor.execute('''INSERT INTO user_profiles (username, password, full_name, email, profile_image)
+                           VALUES(?,?,?,?,?)''',
+                           (username, password, full_name, email, profile_image))
+            return cursor.lastrowid
+        user_id = self.write(insert_user)
+        self.user_cache.forget(username=username)
+        return user_id
+
+    # Create many users at once from a list of (username, password, full_name,
+    # email, profile_image). The passwords are hashed in parallel on all CPU
+    # cores, and the users are inserted in one transaction. Returns the number
+    # of users created.
+    def import_users(self, users):
+        users = list(users)
+        hashes = hash_passwords(user[1] for user in users)
+        def insert_users(cursor):
+            cursor.executemany('''INSERT INTO user_profiles (username, password, full_name, email, profile_image)
+                               VALUES(?,?,?,?,?)''',
+                               ((user[0], password_hash) + tuple(user[2:])
+                                for user, password_hash in zip(users, hashes)))
+        self.write(insert_users)
+        for user in users:
+            self.user_cache.forget(username=user[0])
+        return len(users)
+
+    # Return the user id for a username, or None if there is no such user.
+    def get_user_id(self, username):
+        user = self.user_cache.by_username(self.cursor, username)
+        return None if user is None else user[0]
+
+    # Return the (user_id, username, full_name) of a user id, or None if there is no such user.
+    def get_user(self, user_id):
+        return self.user_cache.by_user_ids(self.cursor, [user_id]).get(user_id)
+
+    # Return (hits, misses, hit rate) of the user cache.
+    def user_cache_stats(self):
+        return self.user_cache.hits, self.user_cache.misses, self.user_cache.hit_rate()
+
+    #### Tweets and comments ####
+
+    # Return the text to store for text typed by a user and the raw text to keep
+    # next to it. Without normalize_emoji the text is stored as typed, with no raw
+    # text, like the rows stored before emoji were converted on write.
+    def stored_text(self, text):
+        if self.normalize_emoji:
+            return render_emoji(text), text
+        return text, None
+
+    # Post a tweet, record its hashtags and mentions, count its hashtags as
+    # trending, add it to the followers' home timelines, and return its id.
+    def post_tweet(self, user_id, tweet_content):
+        stored_text = self.stored_text(tweet_content)
+        def insert_tweet(cursor):
+            cursor.execute('''INSERT INTO tweets (user_id, tweet_content, tweet_content_raw) VALUES(?,?,?)''',
+                           (user_id,) + stored_text)
+            tweet_id = cursor.lastrowid
+            record_hashtags(cursor, index_tweet(cursor, tweet_id, tweet_content))
+            fan_out_tweet(cursor, tweet_id, user_id)
+            return tweet_id
+        return self.write(insert_tweet)
+
+    # One page of the user's home timeline, newest first, as rows of
+    # (username, tweet_id, tweet_content, like count, comment count).
+    # Pass the id of the last tweet of a page to get the next one.
+    def timeline_page(self, user_id, before_tweet_id=None, page_size=PAGE_SIZE):
+        return read_home_timeline(self.read_cursor, user_id, page_size, before_tweet_id)
+
+    # One page of the tweets posted by a user, in the same form as timeline_page.
+    def user_tweets_page(self, user_id, before_tweet_id=None, page_size=PAGE_SIZE):
+        return read_user_tweets(self.read_cursor, user_id, page_size, before_tweet_id)
+
+    # One page of the tweets with a hashtag (given without the #), in the same
+    # form as timeline_page.
+    def tagged_tweets_page(self, tag, before_tweet_id=None, page_size=PAGE_SIZE):
+        return read_tagged_tweets(self.read_cursor, tag, page_size, before_tweet_id)
+
+    # One page of the tweets that mention a user, in the same form as timeline_page.
+    def mentions_page(self, user_id, before_tweet_id=None, page_size=PAGE_SIZE):
+        return read_mentions(self.read_cursor, user_id, page_size, before_tweet_id)
+
+    # Return (tweet_content, comment count) for a tweet, or None if it does not
+    # exist. If author_id is given, only a tweet by that user is returned.
+    def get_tweet(self, tweet_id, author_id=None):
+        if outside_integer_range(tweet_id):
+            return None
+        if author_id is None:
+            self.cursor.execute(TWEET_QUERY, (tweet_id,))
+        else:
+            self.cursor.execute(AUTHOR_TWEET_QUERY, (tweet_id, author_id))
+        return self.cursor.fetchone()
+
+    # Check whether a tweet exists with a single primary key lookup.
+    def tweet_exists(self, tweet_id):
+        if outside_integer_range(tweet_id):
+            return False
+        self.cursor.execute(TWEET_EXISTS_QUERY, (tweet_id,))
+        return self.cursor.fetchone() is not None
+
+    # Return the comments on a tweet as a list of (username, comment_text), with
+    # the emoji aliases converted. Comments stored before they were converted on
+    # write have no raw text and are converted here, through a cache.
+    def get_comments(self, tweet_id):
+        self.cursor.execute(COMMENTS_QUERY, (tweet_id,))
+        return [(username, render_emoji(comment_text) if not_converted else comment_text)
+                for username, comment_text, not_converted in self.cursor.fetchall()]
+
+    # Add a comment to a tweet.
+    def add_comment(self, user_id, tweet_id, comment_text):
+        stored_text = self.stored_text(comment_text)
+        self.write(lambda cursor: cursor.execute('''INSERT INTO comments (user_id, tweet_id, comment_text, comment_text_raw)
+                                                 VALUES (?, ?, ?, ?)''',
+                                                 (user_id, tweet_id) + stored_text))
+
+    # One page of the tweets containing all the words of the search text, best
+    # match first, in the same form as timeline_page. page counts from 0.
+    def search_tweets(self, text, page=0, page_size=PAGE_SIZE):
+        return search_tweets(self.read_cursor, text, page, page_size)
+
+    # One page of the comments containing all the words of the search text, best
+    # match first, as rows of (username, tweet_id, comment_text).
+    def search_comments(self, text, page=0, page_size=PAGE_SIZE):
+        return [(username, tweet_id, render_emoji(comment_text) if not_converted else comment_text)
+                for username, tweet_id, comment_text, not_converted
+                in search_comments(self.read_cursor, text, page, page_size)]
+
+    #### Likes ####
+
+    # Return the tweets liked by a user, in tweet id order, as a list of
+    # (tweet_id, tweet_content, like count). A user likes a tweet at most once,
+    # so each tweet appears once.
+    def liked_tweets(self, user_id):
+        self.cursor.execute(LIKED_TWEETS_QUERY, (user_id,))
+        return self.cursor.fetchall()
+
+    # Check whether a user has liked a tweet, with a single lookup in the
+    # unique (user_id, tweet_id) index.
+    def has_liked(self, user_id, tweet_id):
+        if outside_integer_range(tweet_id):
+            return False
+        self.cursor.execute(HAS_LIKED_QUERY, (user_id, tweet_id))
+        return self.cursor.fetchone() is not None
+
+    # Add a like on a cursor, without committing. A tweet the user already
+    # likes is left as it is. Returns True if the like was added.
+    def add_like(self, cursor, user_id, tweet_id, liked_at):
+        cursor.execute(ADD_LIKE_QUERY, (user_id, tweet_id, liked_at))
+        if cursor.rowcount != 1:
+            return False
+        record_like(cursor, tweet_id, liked_at, liked_at)
+        return True
+
+    # Remove a like on a cursor, without committing. Returns True if there was one.
+    def remove_like(self, cursor, user_id, tweet_id):
+        cursor.execute(REMOVE_LIKE_QUERY, (user_id, tweet_id))
+        removed = cursor.fetchall()
+        for liked_at, in removed:
+            record_unlike(cursor, tweet_id, liked_at)
+        return bool(removed)
+
+    # Like a tweet. Liking a tweet twice has no effect. Returns True if the
+    # like was added. The like id is assigned by the database.
+    def like_tweet(self, user_id, tweet_id):
+        liked_at = time.time()
+        return self.write(lambda cursor: self.add_like(cursor, user_id, tweet_id, liked_at))
+
+    # Remove a user's like from a tweet. Returns True if there was one.
+    def unlike_tweet(self, user_id, tweet_id):
+        return self.write(lambda cursor: self.remove_like(cursor, user_id, tweet_id))
+
+    # Like the tweets of a list that the user has not liked, and unlike the
+    # ones they have, all in one transaction. Returns {tweet_id: LIKED,
+    # UNLIKED or TWEET_NOT_FOUND}; a tweet id given twice is toggled twice.
+    def toggle_likes(self, user_id, tweet_ids):
+        liked_at = time.time()
+        def toggle(cursor):
+            results = dict()
+            for tweet_id in tweet_ids:
+                if outside_integer_range(tweet_id):
+                    results[tweet_id] = TWEET_NOT_FOUND
+                elif self.remove_like(cursor, user_id, tweet_id):
+                    results[tweet_id] = UNLIKED
+                else:
+                    cursor.execute(TWEET_EXISTS_QUERY, (tweet_id,))
+                    if cursor.fetchone() is not None:
+                        self.add_like(cursor, user_id, tweet_id, liked_at)
+                        results[tweet_id] = LIKED
+                    else:
+                        results[tweet_id] = TWEET_NOT_FOUND
+            return results
+        return self.write(toggle)
+
+    #### Trending ####
+
+    # The most liked tweets over a period ("hour" or "day"), as rows of
+    # (username, tweet_id, tweet_content, like count, comment count, likes in the period).
+    def trending_tweets(self, period):
+        self.advance_trending()
+        return read_trending_tweets(self.read_cursor, period)
+
+    # The most used hashtags over a period, as rows of (tag, uses in the period).
+    def trending_hashtags(self, period):
+        self.advance_trending()
+        return read_trending_hashtags(self.read_cursor, period)
+
+    # Drop the likes and hashtags that are too old from the trending periods.
+    # Checking is a read; the write lock is only taken when a period is behind.
+    def advance_trending(self):
+        if trending_is_behind(self.read_cursor):
+            self.write(advance_trending)
+
+    #### Following ####
+
+    # Make a user follow the user with the given username. Returns FOLLOWED,
+    # FOLLOWING_SELF, USER_NOT_FOUND or ALREADY_FOLLOWING.
+    def follow_user(self, user_id, username_to_follow):
+        user_id_to_follow = self.get_user_id(username_to_follow)
+        if user_id_to_follow == user_id:
+            return FOLLOWING_SELF
+        if user_id_to_follow is None:
+            return USER_NOT_FOUND
+        # The (follower, following) index is unique, so a follow that already
+        # exists, even one just made by another session, is ignored.
+        def follow(cursor):
+            cursor.execute(FOLLOW_QUERY, (user_id, user_id_to_follow))
+            if cursor.rowcount != 1:
+                return False
+            # Add the followed user's recent tweets to the follower's home timeline.
+            backfill_follow(cursor, user_id, user_id_to_follow)
+            return True
+        if not self.write(follow):
+            return ALREADY_FOLLOWING
+        self.update_follow_graph()
+        return FOLLOWED
+
+    # Make a user stop following the user with the given username. Returns
+    # UNFOLLOWED, USER_NOT_FOUND or NOT_FOLLOWING.
+    def unfollow_user(self, user_id, username_to_unfollow):
+        user_id_to_unfollow = self.get_user_id(username_to_unfollow)
+        if user_id_to_unfollow is None:
+            return USER_NOT_FOUND
+        if not self.is_following(user_id, user_id_to_unfollow):
+            return NOT_FOLLOWING
+        def unfollow(cursor):
+            cursor.execute(UNFOLLOW_QUERY, (user_id, user_id_to_unfollow))
+            # Remove the unfollowed user's tweets from the follower's home timeline.
+            purge_unfollow(cursor, user_id, user_id_to_unfollow)
+        self.write(unfollow)
+        self.update_follow_graph()
+        return UNFOLLOWED
+
+    # Bring the follow graph, if it has been loaded, up to date with the
+    # follows and unfollows committed since its version, by this session or any
+    # other, by applying them from follow_graph_changes. Called after this
+    # session's own follows commit. Returns False, and drops the graph to be
+    # rebuilt when next needed, if the log no longer has every change since then.
+    def update_follow_graph(self):
+        graph = self.follow_graph
+        if graph is None:
+            return True
+        version = read_graph_version(self.read_cursor)
+        applied = graph.replay_changes(self.read_cursor) if version != graph.version else 0
+        if applied is None or graph.version < version:
+            self.follow_graph = None
+            return False
+        self.graph_changes_since_snapshot += applied
+        if self.graph_snapshot and self.graph_changes_since_snapshot >= SNAPSHOT_EVERY_CHANGES:
+            graph.save(self.graph_snapshot)
+            self.graph_changes_since_snapshot = 0
+        return True
+
+    # Return the follow graph, loading it from the snapshot or the database the
+    # first time. Once it was built more than GRAPH_REFRESH_SECONDS ago, the
+    # follows made by other sessions since are applied before it is used; it is
+    # only rebuilt if they can no longer be applied.
+    def get_follow_graph(self):
+        graph = self.follow_graph
+        if graph is not None:
+            if time.time() - graph.built_at < GRAPH_REFRESH_SECONDS or self.update_follow_graph():
+                return graph
+        elif self.graph_snapshot:
+            self.follow_graph = FollowGraph.load(self.graph_snapshot, read_graph_version(self.read_cursor))
+            if self.follow_graph is not None and self.update_follow_graph():
+                return self.follow_graph
+        self.follow_graph = FollowGraph.from_database(self.read_cursor)
+        if self.graph_snapshot:
+            self.follow_graph.save(self.graph_snapshot)
+            self.graph_changes_since_snapshot = 0
+        return self.follow_graph
+
+    # Return the users recommended for a user to follow, best first, as a list
+    # of (username, mutual follows, follows the user). Mutual follows are the
+    # users the user follows who follow the recommended user.
+    def recommended_users(self, user_id):
+        ranking = self.get_follow_graph().recommend(user_id)
+        users = self.user_cache.by_user_ids(self.read_cursor,
+                                            [candidate_id for candidate_id, mutuals, follows_you in ranking])
+        return [(users[candidate_id][1], mutuals, follows_you)
+                for candidate_id, mutuals, follows_you in ranking if candidate_id in users]
+
+    # Check whether one user follows another, with a single lookup in the
+    # (follower_user_id, following_user_id) index.
+    def is_following(self, follower_id, following_id):
+        self.cursor.execute(IS_FOLLOWING_QUERY, (follower_id, following_id))
+        return self.cursor.fetchone() is not None
+
+    # One page of a user's followers, as rows of (user_id, username) in user id
+    # order. Pass the user id of the last row of a page to get the next one.
+    def followers_page(self, user_id, after_user_id=0, page_size=FOLLOW_PAGE_SIZE):
+        return read_followers(self.read_cursor, user_id, page_size, after_user_id)
+
+    # One page of the users a user follows, in the same form as followers_page.
+    def following_page(self, user_id, after_user_id=0, page_size=FOLLOW_PAGE_SIZE):
+        return read_following(self.read_cursor, user_id, page_size, after_user_id)
+
+    # Return (number of followers, number of users followed) for a user.
+    def follow_counts(self, user_id):
+        return read_follow_counts(self.read_cursor, user_id)
@@ -0,0 +1,115 @@
+################
+## Code Notes ##
+################
+# This file contains the cache of user records kept by TwitterLikeStore, so
+# that looking up the same user again (the logged in user after the login,
+# the user being followed or unfollowed, the usernames of recommended users)
+# does not go back to user_profiles every time. A user record is
+# (user_id, username, full_name).
+#
+# The cache holds at most USER_CACHE_SIZE users, and drops the least recently
+# used one when it is full. Only users that exist are cached: a username that
+# was not found is looked up again next time, since another session may
+# register it at any moment. Records are also dropped after
+# USER_CACHE_SECONDS, so a change made to a profile by another session is
+# seen after that time at the latest; changes made by this session drop the
+# record straight away through forget.
+#
+# The number of lookups served from the cache (hits) and from the database
+# (misses) is counted, for hit_rate.
+
+#### Start Program ####
+
+import time
+from collections import OrderedDict
+
+# The number of users kept in the cache, and for how many seconds.
+USER_CACHE_SIZE = 4096
+USER_CACHE_SECONDS = 300
+
+# The user lookups. USERS_QUERY is completed with one ? per user id.
+USER_QUERY = '''SELECT user_id, username, full_name FROM user_profiles WHERE username = ?'''
+USERS_QUERY = '''SELECT user_id, username, full_name FROM user_profiles
+                 WHERE user_id IN (%s)'''
+
+
+class UserCache:
+
+    def __init__(self, size=USER_CACHE_SIZE, seconds=USER_CACHE_SECONDS):
+        self.size = size
+        self.seconds = seconds
+        # {user_id: (time cached, user record)}, least recently used first.
+        self.by_id = OrderedDict()
+        # {username: user_id} for the users in by_id.
+        self.ids = dict()
+        self.hits = 0
+        self.misses = 0
+
+    # Add a user record to the cache, dropping the least recently used user if it is full.
+    def remember(self, user, now=None):
+        if now is None:
+            now = time.time()
+        self.forget(user[0])
+        self.by_id[user[0]] = (now, user)
+        self.ids[user[1]] = user[0]
+        if len(self.by_id) > self.size:
+            _, (_, oldest) = self.by_id.popitem(last=False)
+            del self.ids[oldest[1]]
+
+    # Drop a user from the cache, by user id or by username.
+    def forget(self, user_id=None, username=None):
+        if user_id is None:
+            user_id = self.ids.get(username)
+        cached = self.by_id.pop(user_id, None)
+        if cached is not None:
+            del self.ids[cached[1][1]]
+
+    # Return the cached record of a user id if it has not expired, counting a hit.
+    def cached(self, user_id, now):
+        cached = self.by_id.get(user_id)
+        if cached is None:
+            return None
+        if cached[0] <= now - self.seconds:
+            self.forget(user_id)
+            return None
+        self.by_id.move_to_end(user_id)
+        self.hits += 1
+        return cached[1]
+
+    # Return the record of a username, or None if there is no such user.
+    def by_username(self, cursor, username):
+        now = time.time()
+        user = self.cached(self.ids.get(username), now)
+        if user is not None:
+            return user
+        self.misses += 1
+        cursor.execute(USER_QUERY, (username,))
+        user = cursor.fetchone()
+        if user is not None:
+            self.remember(user, now)
+        return user
+
+    # Return {user_id: user record} for the users of a list of user ids that
+    # exist. The ones not cached are read with a single query.
+    def by_user_ids(self, cursor, user_ids):
+        now = time.time()
+        users = dict()
+        missing = list()
+        for user_id in user_ids:
+            user = self.cached(user_id, now)
+            if user is None:
+                missing.append(user_id)
+            else:
+                users[user_id] = user
+        if missing:
+            self.misses += len(missing)
+            cursor.execute(USERS_QUERY % ",".join("?" * len(missing)), missing)
+            for user in cursor.fetchall():
+                self.remember(user, now)
+                users[user[0]] = user
+        return users
+
+    # The share of lookups served from the cache, from 0 to 1.
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
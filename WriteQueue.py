@@ -0,0 +1,140 @@
+################
+## Code Notes ##
+################
+# This file contains the write queue, which groups the writes of many
+# sessions into shared transactions ("group commit"). Committing makes SQLite
+# write the WAL to disk, so with one commit per action the number of actions
+# per second is capped by how fast the disk can flush. With the queue, every
+# write is handed to a single writer thread with its own connection, which
+# runs all the writes waiting at that moment in one transaction and commits
+# them together.
+#
+# How writes are grouped is set with two limits:
+# - max_latency_ms: how long the writer waits for more writes after the
+#   first write of a group arrives. With 0 (the default) it never waits, and
+#   groups the writes that arrived while the previous group was being
+#   committed. Waiting only pays off when writes arrive faster than the
+#   sessions wait for them, such as writes whose Future is not waited for;
+#   sessions that each wait for their write cannot add to a group that is
+#   waiting, so for them it only adds latency.
+# - batch_size: the most writes in one transaction.
+#
+# Durability is explicit: submit returns a Future that is only completed
+# after the transaction holding the write has committed, so a caller that
+# waits for the result knows the write is committed. The writer connection
+# uses synchronous=NORMAL like every other connection (see
+# "DatabaseConnection.py"): a committed write survives the program crashing,
+# but the last commits can be lost if the machine loses power. Pass
+# synchronous="FULL" to flush on every commit and keep them through a power
+# failure as well. A caller that does not wait for the Future only knows the
+# write has been queued.
+#
+# Each write runs inside its own savepoint, so a write that fails is rolled
+# back on its own, its Future gets the exception, and the other writes of the
+# group are still committed.
+#
+# TwitterLikeStore uses a write queue when one is passed to it. Several stores
+# in one process (for example one per session of a server) can share one queue.
+
+#### Start Program ####
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from DatabaseConnection import DATABASE_PATH, get_write_connection
+
+# The default limits of a group of writes.
+DEFAULT_MAX_LATENCY_MS = 0
+DEFAULT_BATCH_SIZE = 256
+
+
+class WriteQueue:
+
+    def __init__(self, path=DATABASE_PATH, max_latency_ms=DEFAULT_MAX_LATENCY_MS,
+                 batch_size=DEFAULT_BATCH_SIZE, synchronous="NORMAL"):
+        self.path = path
+        self.max_latency = max_latency_ms / 1000
+        self.batch_size = batch_size
+        self.synchronous = synchronous
+        # The writes waiting for the writer, as (operation, Future); None stops the writer.
+        self.pending = queue.Queue()
+        # The number of writes and of transactions committed so far.
+        self.writes = 0
+        self.commits = 0
+        self.writer = threading.Thread(target=self.run, name="write queue", daemon=True)
+        self.writer.start()
+
+    # Queue a write. operation is called with a cursor of the writer
+    # connection and must not commit. Returns a Future with the value returned
+    # by operation, completed once its transaction has committed.
+    def submit(self, operation):
+        future = Future()
+        self.pending.put((operation, future))
+        return future
+
+    # Wait until every write queued so far has been committed.
+    def flush(self):
+        self.submit(lambda cursor: None).result()
+
+    # Commit the writes still queued and stop the writer.
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+
+    # The writer thread: take the next group of writes and commit it, until closed.
+    def run(self):
+        conn = get_write_connection(self.path)
+        conn.isolation_level = None # Transactions are begun and committed explicitly.
+        conn.execute("PRAGMA synchronous = %s" % self.synchronous)
+        cursor = conn.cursor()
+        closing = False
+        while not closing:
+            write = self.pending.get()
+            if write is None:
+                break
+            batch = [write]
+            deadline = time.perf_counter() + self.max_latency
+            while len(batch) < self.batch_size:
+                try:
+                    write = self.pending.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if write is None:
+                    closing = True
+                    break
+                batch.append(write)
+            self.commit_batch(cursor, batch)
+        conn.close()
+
+    # Run a group of writes in one transaction, and complete their Futures
+    # once it has committed.
+    def commit_batch(self, cursor, batch):
+        results = list()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for operation, future in batch:
+                cursor.execute("SAVEPOINT write")
+                try:
+                    results.append((future, operation(cursor), None))
+                    cursor.execute("RELEASE write")
+                except Exception as error:
+                    cursor.execute("ROLLBACK TO write")
+                    cursor.execute("RELEASE write")
+                    results.append((future, None, error))
+            cursor.execute("COMMIT")
+        except Exception as error:
+            # The transaction could not be begun or committed, so none of the writes were made.
+            if cursor.connection.in_transaction:
+                cursor.execute("ROLLBACK")
+            for operation, future in batch:
+                future.set_exception(error)
+            return
+        self.writes += len(batch)
+        self.commits += 1
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
@@ -0,0 +1,78 @@
+################
+## Code Notes ##
+################
+# Summarises the menu actions profiled by ActionProfiler.py (run the CLI with
+# TWITTERLIKE_PROFILE set to a file). For every action it reports how many
+# times it was done and in how many sessions, its wall time percentiles
+# without the time spent waiting for the user, its mean CPU time and, when
+# memory was traced, its mean and largest memory peak.
+#
+# Given the directory of TWITTERLIKE_PROFILE_CPROFILE and an action, it also
+# combines the cProfile profiles of that action from every session and prints
+# the functions that took the most time.
+#
+# Run from the repository root with:
+# python benchmarks/ActionProfileReport.py actions.jsonl
+# python benchmarks/ActionProfileReport.py actions.jsonl --cprofile profiles --action "view timeline"
+
+#### Start Program ####
+
+import argparse
+import glob
+import json
+import os
+import pstats
+import statistics
+
+
+# Read the actions of one or more files, as {action: list of records}.
+def read_actions(paths):
+    actions = dict()
+    for path in paths:
+        with open(path, encoding="utf-8") as lines:
+            for line in lines:
+                if line.strip():
+                    record = json.loads(line)
+                    actions.setdefault(record["action"], list()).append(record)
+    return actions
+
+
+# Return the given percentiles of a list of times.
+def percentiles(timings, wanted):
+    if len(timings) == 1:
+        return [timings[0]] * len(wanted)
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return [cuts[percent - 1] for percent in wanted]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise the profiled actions of CLI sessions.")
+    parser.add_argument("files", nargs="+", help="Files written with TWITTERLIKE_PROFILE.")
+    parser.add_argument("--cprofile", help="Directory written with TWITTERLIKE_PROFILE_CPROFILE.")
+    parser.add_argument("--action", help="The action to show the cProfile functions of.")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    actions = read_actions(args.files)
+    print("%-24s %6s %8s %10s %10s %10s %10s %10s"
+          % ("action", "count", "sessions", "p50 ms", "p95 ms", "max ms", "cpu ms", "peak KiB"))
+    for action, records in sorted(actions.items(), key=lambda item: -sum(record["wall_ms"] for record in item[1])):
+        timings = [record["wall_ms"] for record in records]
+        p50, p95 = percentiles(timings, (50, 95))
+        peaks = [record["peak_kib"] for record in records if "peak_kib" in record]
+        print("%-24s %6d %8d %10.2f %10.2f %10.2f %10.2f %10s"
+              % (action, len(records), len(set(record["pid"] for record in records)), p50, p95, max(timings),
+                 statistics.mean(record["cpu_ms"] for record in records),
+                 "%.1f" % statistics.mean(peaks) if peaks else "-"))
+
+    if args.cprofile and args.action:
+        profiles = glob.glob(os.path.join(glob.escape(args.cprofile), "%s.*.prof" % args.action.replace(" ", "-")))
+        if not profiles:
+            print("\nNo cProfile profiles of %r in %s" % (args.action, args.cprofile))
+            return
+        print("\n%s, %d sessions:" % (args.action, len(profiles)))
+        pstats.Stats(*profiles).sort_stats("cumulative").print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+################
+## Code Notes ##
+################
+# Runs scripted sessions of CommandLineInterface.py against a freshly seeded
+# database and checks that each one ends normally and prints the expected
+# message. The sessions feed the CLI input it has to turn away, such as tweet
+# ids too large for an SQLite INTEGER, which must be reported as not found
+# rather than crash the program. The script exits with a non-zero status if
+# any session fails.
+#
+# Run from the repository root with:
+# python benchmarks/CliSessionCheck.py
+
+#### Start Program ####
+
+import os
+import subprocess
+import sys
+import tempfile
+
+REPOSITORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CLI = os.path.join(REPOSITORY, "CommandLineInterface.py")
+STARTER = os.path.join(REPOSITORY, "DatabaseModuleStarter.py")
+
+# Logging in as one of the seeded users.
+LOGIN = "1\nNolan\nhey123!\n"
+# Ids outside the range of an SQLite INTEGER.
+OUT_OF_RANGE_IDS = ("99999999999999999999", "-99999999999999999999")
+
+# Each session as (description, input, text the output must contain). Every
+# session ends with 8 to exit from the main menu.
+SESSIONS = []
+for tweet_id in OUT_OF_RANGE_IDS:
+    SESSIONS.append(("like tweet " + tweet_id,
+                     LOGIN + "3\nyes\n" + tweet_id + "\n8\n",
+                     "Not an existing tweet"))
+    SESSIONS.append(("open own tweet " + tweet_id,
+                     LOGIN + "9\nYes\n" + tweet_id + "\n8\n",
+                     "that's not one of your tweets"))
+
+
+def main():
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        # A low bcrypt cost keeps seeding and logging in quick.
+        environment = dict(os.environ, TWITTERLIKE_BCRYPT_ROUNDS="4")
+        subprocess.run([sys.executable, STARTER], cwd=directory, env=environment,
+                       capture_output=True, check=True)
+        for description, stdin, expected in SESSIONS:
+            result = subprocess.run([sys.executable, CLI], cwd=directory, env=environment,
+                                    input=stdin, capture_output=True, text=True)
+            if result.returncode != 0 or "Traceback" in result.stderr:
+                print("%-40s FAILED: exited with %d" % (description, result.returncode))
+                print("    " + "\n    ".join(result.stderr.strip().splitlines()[-3:]))
+                failed = True
+            elif expected not in result.stdout:
+                print("%-40s FAILED: %r not printed" % (description, expected))
+                failed = True
+            else:
+                print("%-40s ok" % description)
+    if failed:
+        sys.exit(1)
+    print("All sessions ended normally")
+
+
+if __name__ == "__main__":
+    main()
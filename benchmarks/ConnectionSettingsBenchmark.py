@@ -0,0 +1,147 @@
+################
+## Code Notes ##
+################
+# Multi-process read/write benchmark for the connection settings. A number of
+# reader processes load timeline pages while writer processes post tweets,
+# all against the same database file, for a fixed amount of time. It is run
+# once with plain sqlite3.connect() (rollback journal, synchronous=FULL) and
+# once with the connections from DatabaseConnection.py (WAL, busy timeout,
+# synchronous=NORMAL, ...), and reports the throughput and the number of
+# "database is locked" errors for each.
+#
+# Run from the repository root with:
+# python benchmarks/ConnectionSettingsBenchmark.py --readers 6 --writers 2 --seconds 10
+
+#### Start Program ####
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseConnection import get_read_connection, get_write_connection
+from DatabaseModuleStarter import create_tables
+from HomeTimeline import fan_out_tweet, read_home_timeline
+from TweetPages import PAGE_SIZE
+
+
+# Open a connection for the given mode and role.
+def open_connection(path, mode, read_only):
+    if mode == "default":
+        return sqlite3.connect(path)
+    if read_only:
+        return get_read_connection(path)
+    return get_write_connection(path)
+
+
+# Build a database with users who all follow each other, so that every new
+# tweet is fanned out and every timeline has tweets on it.
+def build_database(path, mode, users, tweets):
+    conn = open_connection(path, mode, read_only=False)
+    cursor = conn.cursor()
+    create_tables(cursor)
+    cursor.executemany('''INSERT INTO user_profiles (user_id, username, password, full_name)
+                       VALUES (?, ?, 'x', ?)''',
+                       ((i, "user%d" % i, "User %d" % i) for i in range(1, users + 1)))
+    cursor.executemany('''INSERT INTO followers_following (follower_user_id, following_user_id)
+                       VALUES (?, ?)''',
+                       ((a, b) for a in range(1, users + 1) for b in range(1, users + 1) if a != b))
+    conn.commit()
+    rng = random.Random(1)
+    for _ in range(tweets):
+        author = rng.randint(1, users)
+        cursor.execute('''INSERT INTO tweets (user_id, tweet_content) VALUES (?, 'hello')''', (author,))
+        fan_out_tweet(cursor, cursor.lastrowid, author)
+    conn.commit()
+    conn.close()
+
+
+# Read timeline pages until the deadline.
+def reader(path, mode, users, start, deadline, results):
+    conn = open_connection(path, mode, read_only=True)
+    time.sleep(max(0, start - time.time()))
+    cursor = conn.cursor()
+    rng = random.Random(os.getpid())
+    completed = errors = 0
+    while time.time() < deadline:
+        try:
+            list(read_home_timeline(cursor, rng.randint(1, users), PAGE_SIZE))
+            completed += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    conn.close()
+    results.put(("read", completed, errors))
+
+
+# Post tweets until the deadline, committing each one like the CLI does.
+def writer(path, mode, users, start, deadline, results):
+    conn = open_connection(path, mode, read_only=False)
+    time.sleep(max(0, start - time.time()))
+    cursor = conn.cursor()
+    rng = random.Random(os.getpid())
+    completed = errors = 0
+    while time.time() < deadline:
+        author = rng.randint(1, users)
+        try:
+            cursor.execute('''INSERT INTO tweets (user_id, tweet_content) VALUES (?, 'benchmark')''',
+                           (author,))
+            fan_out_tweet(cursor, cursor.lastrowid, author)
+            conn.commit()
+            completed += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errors += 1
+    conn.close()
+    results.put(("write", completed, errors))
+
+
+# Run the readers and writers for one mode and return the totals.
+def run(mode, args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.db")
+        build_database(path, mode, args.users, args.tweets)
+
+        results = multiprocessing.Queue()
+        # Give every process time to start so that they all run for the same period.
+        start = time.time() + 1
+        deadline = start + args.seconds
+        processes = [multiprocessing.Process(target=reader, args=(path, mode, args.users, start, deadline, results))
+                     for _ in range(args.readers)]
+        processes += [multiprocessing.Process(target=writer, args=(path, mode, args.users, start, deadline, results))
+                      for _ in range(args.writers)]
+        for process in processes:
+            process.start()
+        totals = {"read": [0, 0], "write": [0, 0]}
+        for _ in processes:
+            role, completed, errors = results.get()
+            totals[role][0] += completed
+            totals[role][1] += errors
+        for process in processes:
+            process.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare default and tuned connection settings under concurrent load.")
+    parser.add_argument("--readers", type=int, default=6)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tweets", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("Readers:", args.readers, " writers:", args.writers, " duration: %.0f s" % args.seconds)
+    for mode in ("default", "tuned"):
+        totals = run(mode, args)
+        print("%-8s reads/s: %9.1f  writes/s: %8.1f  locked errors: %d read, %d write"
+              % (mode, totals["read"][0] / args.seconds, totals["write"][0] / args.seconds,
+                 totals["read"][1], totals["write"][1]))
+
+
+if __name__ == "__main__":
+    main()
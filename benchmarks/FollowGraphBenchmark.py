@@ -0,0 +1,116 @@
+################
+## Code Notes ##
+################
+# Measures the "who to follow" recommendations of FollowGraph.py on a
+# synthetic database built with SyntheticDataset.py. It reports:
+# - how long building the graph from followers_following takes, how much
+#   memory its arrays use, and how long saving and loading a snapshot take
+# - recommendation latency for a sample of users, uncached and cached,
+#   against a friends-of-friends count done with a SQL self join (which
+#   leaves out the followers who are not followed back)
+# - the cost of applying a follow or unfollow to the graph in memory
+#
+# Run from the repository root with:
+# python benchmarks/FollowGraphBenchmark.py --users 100000 --follows-per-user 20
+
+#### Start Program ####
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseConnection import get_write_connection
+from FollowGraph import FollowGraph, RECOMMENDATION_COUNT
+from SyntheticDataset import generate_dataset
+
+
+# The most followed friends of friends of a user, counted in SQL.
+def sql_friends_of_friends(cursor, user_id):
+    cursor.execute('''SELECT friends.following_user_id, COUNT(*) FROM followers_following AS follows
+                   INNER JOIN followers_following AS friends
+                   ON friends.follower_user_id = follows.following_user_id
+                   WHERE follows.follower_user_id = ? AND friends.following_user_id != ?
+                   AND friends.following_user_id NOT IN
+                       (SELECT following_user_id FROM followers_following WHERE follower_user_id = ?)
+                   GROUP BY 1
+                   ORDER BY 2 DESC, 1
+                   LIMIT ?''',
+                   (user_id, user_id, user_id, RECOMMENDATION_COUNT))
+    return cursor.fetchall()
+
+
+# Time a function over a sample of users, in milliseconds.
+def time_users(function, user_ids):
+    timings = list()
+    for user_id in user_ids:
+        start = time.perf_counter()
+        function(user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    print("  %-24s p50 %8.3f ms  p95 %8.3f ms  p99 %8.3f ms" % (name, cuts[49], cuts[94], cuts[98]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the in-memory follow graph on a synthetic database.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--follows-per-user", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = get_write_connection(os.path.join(directory, "graph.db"))
+        start = time.perf_counter()
+        rows = generate_dataset(conn, args.users, args.follows_per_user, args.users, 0, 0,
+                                args.seed, report=lambda line: None)
+        print("Built %d users and %d follows in %.1f s"
+              % (rows["user_profiles"], rows["followers_following"], time.perf_counter() - start))
+        cursor = conn.cursor()
+
+        start = time.perf_counter()
+        graph = FollowGraph.from_database(cursor)
+        print("Graph built from the database in %.2f s, arrays use %.1f MiB"
+              % (time.perf_counter() - start,
+                 sum(values.itemsize * len(values) for values in
+                     (graph.following_offsets, graph.following_targets,
+                      graph.follower_offsets, graph.follower_targets)) / 2 ** 20))
+        snapshot = os.path.join(directory, "graph.snapshot")
+        start = time.perf_counter()
+        graph.save(snapshot)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        graph = FollowGraph.load(snapshot, graph.version)
+        print("Snapshot saved in %.3f s and loaded in %.3f s" % (saved, time.perf_counter() - start))
+
+        rng = random.Random(args.seed)
+        user_ids = rng.sample(range(1, args.users + 1), min(args.samples, args.users))
+        print("Recommendations for %d users:" % len(user_ids))
+        report("SQL self join", time_users(lambda user_id: sql_friends_of_friends(cursor, user_id), user_ids))
+        # Empty the cache before each uncached ranking, then rank the same users again.
+        now = time.time()
+        def uncached(user_id):
+            graph.cache.clear()
+            graph.recommend(user_id, now)
+        report("graph, uncached", time_users(uncached, user_ids))
+        for user_id in user_ids:
+            graph.recommend(user_id, now)
+        report("graph, cached", time_users(lambda user_id: graph.recommend(user_id, now), user_ids))
+
+        # Follow and unfollow random pairs of users in memory.
+        pairs = [(rng.randint(1, args.users), rng.randint(1, args.users)) for _ in range(args.samples)]
+        report("follow in memory", time_users(lambda pair: graph.add_follow(*pair), pairs))
+        report("unfollow in memory", time_users(lambda pair: graph.remove_follow(*pair), pairs))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
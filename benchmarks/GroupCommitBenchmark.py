@@ -0,0 +1,114 @@
+################
+## Code Notes ##
+################
+# Compares committing every action on its own with grouping the writes of
+# many sessions with WriteQueue.py. A number of sessions, each a thread with
+# its own TwitterLikeStore, post tweets, comment, like and follow as fast as
+# they can on a synthetic database built with SyntheticDataset.py. Each
+# action returns once its change has committed in every mode, so the results
+# are equally durable. The benchmark runs:
+# - "commit per action": every store commits its own writes, as the CLI does
+# - "write queue": the stores share one write queue, once for each
+#   --latencies value (the longest time the writer waits to fill a group)
+#
+# For each it reports the actions per second, the commits per second and the
+# average number of actions per commit. With --synchronous FULL every commit
+# is flushed to disk, as it would have to be to survive a power failure.
+#
+# Run from the repository root with:
+# python benchmarks/GroupCommitBenchmark.py --sessions 8 --actions 200
+
+#### Start Program ####
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseConnection import get_write_connection
+from SyntheticDataset import generate_dataset
+from TwitterLikeStore import TwitterLikeStore, ALREADY_FOLLOWING
+from WriteQueue import WriteQueue
+
+
+# One session: a sequence of actions by one user, repeating post, comment,
+# like and follow (or unfollow, for a user already followed).
+def session(path, write_queue, synchronous, user_id, users, tweets, actions, seed):
+    store = TwitterLikeStore(path, normalize_emoji=False, write_queue=write_queue)
+    store.conn.execute("PRAGMA synchronous = %s" % synchronous)
+    rng = random.Random(seed)
+    for action in range(actions):
+        step = action % 4
+        if step == 0:
+            store.post_tweet(user_id, "group commit tweet %d from user %d" % (action, user_id))
+        elif step == 1:
+            store.add_comment(user_id, rng.randint(1, tweets), "comment %d" % action)
+        elif step == 2:
+            store.like_tweet(user_id, rng.randint(1, tweets))
+        else:
+            other = "user%d" % rng.randint(1, users)
+            if store.follow_user(user_id, other) == ALREADY_FOLLOWING:
+                store.unfollow_user(user_id, other)
+    store.close()
+
+
+# Run the sessions at the same time, and return (seconds, commits), where
+# commits is None when the stores committed on their own.
+def run_sessions(path, write_queue, args):
+    threads = [threading.Thread(target=session,
+                                args=(path, write_queue, args.synchronous, user_id, args.users, args.tweets,
+                                      args.actions, args.seed + user_id))
+               for user_id in range(1, args.sessions + 1)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    # Every action has committed by the time its session ends.
+    return elapsed, None if write_queue is None else write_queue.commits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare committing every action with group commit.")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--actions", type=int, default=200, help="Actions performed by each session.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--follows-per-user", type=int, default=20)
+    parser.add_argument("--tweets", type=int, default=10000)
+    parser.add_argument("--latencies", default="0,2,10", help="Comma separated write queue latencies in ms.")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--synchronous", default="NORMAL", choices=("NORMAL", "FULL"))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    modes = [("commit per action", None)]
+    modes += [("write queue, %s ms" % latency, float(latency)) for latency in args.latencies.split(",")]
+    total = args.sessions * args.actions
+    print("%d sessions, %d actions each, synchronous=%s" % (args.sessions, args.actions, args.synchronous))
+    for name, latency in modes:
+        # Every mode starts from the same database.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "group.db")
+            conn = get_write_connection(path)
+            generate_dataset(conn, args.users, args.follows_per_user, args.tweets, args.tweets, args.tweets,
+                             args.seed, report=lambda line: None)
+            conn.close()
+            write_queue = None
+            if latency is not None:
+                write_queue = WriteQueue(path, latency, args.batch_size, args.synchronous)
+            elapsed, commits = run_sessions(path, write_queue, args)
+            if write_queue is not None:
+                write_queue.close()
+        if commits is None:
+            commits = total
+        print("  %-22s %8.0f actions/s %8.0f commits/s %6.1f actions per commit"
+              % (name, total / elapsed, commits / elapsed, total / commits))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+################
+## Code Notes ##
+################
+# Benchmarks the operations behind each CLI menu option (home timeline, liked
+# tweets with their like counts, followers/following lists, opening a tweet
+# with its comments, posting a tweet and registering) through TwitterLikeStore.
+# For each size in --sizes it builds a synthetic database with
+# SyntheticDataset.py and reports, per operation:
+# - p50, p95 and p99 latency in milliseconds
+# - the number of SQL statements issued per call
+# - the peak Python memory allocated during a call (measured in a separate,
+#   shorter pass, since tracemalloc slows everything down)
+#
+# The results are written as JSON, and --compare prints how the p95 latencies
+# changed against an earlier results file, so that a change can be checked for
+# regressions by running the benchmark before and after it.
+#
+# Run from the repository root with:
+# python benchmarks/HotPathBenchmark.py --sizes 1000,10000 --output results.json
+# python benchmarks/HotPathBenchmark.py --sizes 1000,10000 --compare results.json
+
+#### Start Program ####
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseConnection import get_write_connection
+from PasswordHashing import configured_rounds
+from SyntheticDataset import WORDS, generate_dataset
+from TwitterLikeStore import TwitterLikeStore
+
+
+# The size of the dataset built for a number of users.
+def dataset_size(users):
+    return {"users": users,
+            "follows_per_user": min(50, max(1, users // 20)),
+            "tweets": users * 10,
+            "likes": users * 50,
+            "comments": users * 10}
+
+
+# Words searched for by the search operation.
+SEARCH_WORDS = [word.strip("#@:") for word in WORDS]
+
+
+# The operations that are benchmarked, as (name, function). Each function
+# takes the store, a random.Random, the dataset size and a call counter.
+def view_timeline(store, rng, size, call):
+    list(store.timeline_page(rng.randint(1, size["users"])))
+
+
+def view_timeline_five_pages(store, rng, size, call):
+    user_id = rng.randint(1, size["users"])
+    before_tweet_id = None
+    for _ in range(5):
+        page = list(store.timeline_page(user_id, before_tweet_id))
+        if not page:
+            break
+        before_tweet_id = page[-1][1]
+
+
+def view_liked_tweets(store, rng, size, call):
+    store.liked_tweets(rng.randint(1, size["users"]))
+
+
+def list_followers(store, rng, size, call):
+    user_id = rng.randint(1, size["users"])
+    store.follow_counts(user_id)
+    list(store.followers_page(user_id))
+
+
+def list_following(store, rng, size, call):
+    user_id = rng.randint(1, size["users"])
+    store.follow_counts(user_id)
+    list(store.following_page(user_id))
+
+
+def check_follows(store, rng, size, call):
+    user_id = rng.randint(1, size["users"])
+    other_id = rng.randint(1, size["users"])
+    store.is_following(user_id, other_id)
+    store.is_following(other_id, user_id)
+
+
+def open_tweet(store, rng, size, call):
+    tweet_id = rng.randint(1, size["tweets"])
+    tweet = store.get_tweet(tweet_id)
+    if tweet and tweet[1] > 0:
+        store.get_comments(tweet_id)
+
+
+def view_profile(store, rng, size, call):
+    list(store.user_tweets_page(rng.randint(1, size["users"])))
+
+
+def search_tweets(store, rng, size, call):
+    store.search_tweets(rng.choice(SEARCH_WORDS))
+
+
+def post_tweet(store, rng, size, call):
+    store.post_tweet(rng.randint(1, size["users"]), "benchmark tweet %d" % call)
+
+
+def register_user(store, rng, size, call):
+    store.register_user("benchmark%d_%d" % (size["users"], call), "bench123!", "Benchmark User")
+
+
+OPERATIONS = [
+    ("view timeline", view_timeline),
+    ("view timeline, 5 pages", view_timeline_five_pages),
+    ("view profile", view_profile),
+    ("liked tweets with like counts", view_liked_tweets),
+    ("followers count and page", list_followers),
+    ("following count and page", list_following),
+    ("check both follow ways", check_follows),
+    ("open a tweet with comments", open_tweet),
+    ("search tweets", search_tweets),
+    ("post a tweet", post_tweet),
+    ("register a user", register_user),
+]
+
+# Registration hashes the password with bcrypt, which takes a large fraction of
+# a second by design, so it is run fewer times than the other operations.
+SLOW_OPERATIONS = ("register a user",)
+
+
+# Return the 50th, 95th and 99th percentiles of a list of timings.
+def percentiles(timings):
+    if len(timings) == 1:
+        return timings[0], timings[0], timings[0]
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+# Run one operation and return its statistics.
+def measure(store, operation, size, samples, memory_samples, seed, counter):
+    rng = random.Random(seed)
+    timings = list()
+    counter[0] = 0
+    for call in range(samples):
+        start = time.perf_counter()
+        operation(store, rng, size, call)
+        timings.append((time.perf_counter() - start) * 1000)
+    queries = counter[0] / samples
+
+    peak = 0
+    tracemalloc.start()
+    for call in range(samples, samples + memory_samples):
+        tracemalloc.reset_peak()
+        operation(store, rng, size, call)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    p50, p95, p99 = percentiles(timings)
+    return {"samples": samples,
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(p95, 3),
+            "p99_ms": round(p99, 3),
+            "queries_per_call": round(queries, 2),
+            "peak_memory_kib": round(peak / 1024, 1)}
+
+
+# Build a database of the given size and benchmark every operation on it.
+def run_size(directory, users, args):
+    size = dataset_size(users)
+    path = os.path.join(directory, "benchmark_%d.db" % users)
+    conn = get_write_connection(path)
+    start = time.perf_counter()
+    rows = generate_dataset(conn, size["users"], size["follows_per_user"], size["tweets"],
+                            size["likes"], size["comments"], args.seed, report=lambda line: None)
+    conn.close()
+    print("\n%d users: built %d rows in %.1f s" % (users, sum(rows.values()), time.perf_counter() - start))
+
+    store = TwitterLikeStore(path)
+    # Count every statement run on either of the store's connections. The trace
+    # callback also reports the statements SQLite runs on its own behalf: trigger
+    # and FTS5 steps (which start with "--" or name the 'main' schema, or repeat
+    # the statement that fired them), and those are not counted.
+    counter = [0]
+    last_statement = [None]
+    def count_statement(statement):
+        if not statement.startswith("--") and "'main'." not in statement and statement != last_statement[0]:
+            counter[0] += 1
+        last_statement[0] = statement
+    store.conn.set_trace_callback(count_statement)
+    store.read_conn.set_trace_callback(count_statement)
+
+    results = dict()
+    for name, operation in OPERATIONS:
+        samples = args.samples
+        if name in SLOW_OPERATIONS:
+            samples = max(2, samples // 20)
+        results[name] = measure(store, operation, size, samples, args.memory_samples, args.seed, counter)
+        print("  %-32s p50 %8.3f ms  p95 %8.3f ms  p99 %8.3f ms  %5.1f queries  %8.1f KiB"
+              % (name, results[name]["p50_ms"], results[name]["p95_ms"], results[name]["p99_ms"],
+                 results[name]["queries_per_call"], results[name]["peak_memory_kib"]))
+    store.close()
+    return {"dataset": size, "rows": rows, "operations": results}
+
+
+# The commit the benchmark was run on, if the repository is a git checkout.
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Print the change in p95 latency of every operation against an earlier run.
+def compare(previous, current):
+    print("\np95 latency compared with", previous.get("commit") or "the previous run")
+    earlier = {result["dataset"]["users"]: result for result in previous["results"]}
+    for result in current["results"]:
+        users = result["dataset"]["users"]
+        if users not in earlier:
+            continue
+        for name, stats in result["operations"].items():
+            before = earlier[users]["operations"].get(name)
+            if before is None or before["p95_ms"] == 0:
+                continue
+            change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            print("  %8d users  %-32s %8.3f -> %8.3f ms  (%+.0f%%)"
+                  % (users, name, before["p95_ms"], stats["p95_ms"], change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CLI operations on synthetic databases of increasing size.")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="Comma separated numbers of users; a database is built for each.")
+    parser.add_argument("--samples", type=int, default=200, help="Timed calls per operation.")
+    parser.add_argument("--memory-samples", type=int, default=5, help="Calls per operation traced for peak memory.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--bcrypt-rounds", type=int,
+                        help="bcrypt work factor for registration (default: TWITTERLIKE_BCRYPT_ROUNDS or 12).")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="An earlier JSON results file to compare the p95 latencies with.")
+    args = parser.parse_args()
+    if args.bcrypt_rounds is not None:
+        os.environ["TWITTERLIKE_BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    report = {"commit": current_commit(),
+              "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "python": platform.python_version(),
+              "sqlite": sqlite3.sqlite_version,
+              "seed": args.seed,
+              "bcrypt_rounds": configured_rounds(),
+              "samples": args.samples,
+              "results": list()}
+    with tempfile.TemporaryDirectory() as directory:
+        for users in (int(size) for size in args.sizes.split(",")):
+            report["results"].append(run_size(directory, users, args))
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print("\nResults written to", args.output)
+
+
+if __name__ == "__main__":
+    main()
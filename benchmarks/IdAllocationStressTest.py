@@ -0,0 +1,165 @@
+################
+## Code Notes ##
+################
+# Multi-process stress test for primary key allocation. Several writer
+# processes post tweets, like tweets and follow users in the same database
+# at the same time, the way many CLI sessions would. With the ids assigned
+# by the database (the INSERT leaves the INTEGER PRIMARY KEY out and the id
+# is read back from cursor.lastrowid) no insert may fail and every row must
+# end up with its own id.
+#
+# Passing --max-plus-one runs the same load with the old approach of
+# computing SELECT MAX(id)+1 before each INSERT, to show the collisions
+# it causes.
+#
+# Run from the repository root with:
+# python benchmarks/IdAllocationStressTest.py --writers 8 --operations 300
+
+#### Start Program ####
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseModuleStarter import create_tables
+from HomeTimeline import fan_out_tweet
+
+
+# Insert a row the way the CLI does now, letting the database assign the id.
+def insert_assigned(cursor, table, id_column, columns, values):
+    cursor.execute("INSERT INTO %s (%s) VALUES (%s)"
+                   % (table, ", ".join(columns), ", ".join("?" * len(values))), values)
+    return cursor.lastrowid
+
+
+# Insert a row the way the CLI used to, computing MAX(id)+1 in a separate statement first.
+def insert_max_plus_one(cursor, table, id_column, columns, values):
+    cursor.execute("SELECT MAX(%s) FROM %s" % (id_column, table))
+    newest_id = cursor.fetchone()[0]
+    newest_id = 1 if newest_id is None else newest_id + 1
+    cursor.execute("INSERT INTO %s (%s, %s) VALUES (?, %s)"
+                   % (table, id_column, ", ".join(columns), ", ".join("?" * len(values))),
+                   (newest_id,) + tuple(values))
+    return newest_id
+
+
+# One writer process: post tweets, like tweets and follow users, committing after each action.
+def writer(path, writer_id, users, operations, max_plus_one, results):
+    insert = insert_max_plus_one if max_plus_one else insert_assigned
+    rng = random.Random(writer_id)
+    conn = sqlite3.connect(path, timeout=60)
+    cursor = conn.cursor()
+    user_id = writer_id + 1
+    succeeded = {"tweets": 0, "likes": 0, "follows": 0}
+    collisions = 0
+    # A user can like a tweet only once, so each like is of a tweet this writer
+    # has not liked yet: its first tweet, then the ones it posts.
+    unliked_tweet_ids = [user_id]
+    # A user can follow another only once as well, so each follow is of a
+    # user this writer does not follow yet.
+    unfollowed_user_ids = [other_id for other_id in range(1, users + 1) if other_id != user_id]
+    rng.shuffle(unfollowed_user_ids)
+    for operation in range(operations):
+        action = ("tweets", "likes", "follows")[operation % 3]
+        try:
+            if action == "tweets":
+                tweet_id = insert(cursor, "tweets", "tweet_id", ("user_id", "tweet_content"),
+                                  (user_id, "writer %d tweet %d" % (writer_id, operation)))
+                fan_out_tweet(cursor, tweet_id, user_id)
+            elif action == "likes":
+                if not unliked_tweet_ids:
+                    continue
+                insert(cursor, "likes_retweets", "like_retweet_id", ("user_id", "tweet_id"),
+                       (user_id, unliked_tweet_ids.pop()))
+            else:
+                if not unfollowed_user_ids:
+                    continue
+                insert(cursor, "followers_following", "follow_id",
+                       ("follower_user_id", "following_user_id"),
+                       (user_id, unfollowed_user_ids.pop()))
+            conn.commit()
+            succeeded[action] += 1
+            if action == "tweets":
+                unliked_tweet_ids.append(tweet_id)
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            collisions += 1
+    conn.close()
+    results.put((succeeded, collisions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run parallel writers against one database and check for id collisions.")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=300, help="Actions performed by each writer.")
+    parser.add_argument("--max-plus-one", action="store_true", help="Use the old SELECT MAX(id)+1 allocation.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stress.db")
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        create_tables(cursor)
+        # One user per writer, plus one tweet per user so that the likes have something to point at.
+        users = args.writers
+        for user_id in range(1, users + 1):
+            cursor.execute('''INSERT INTO user_profiles (user_id, username, password, full_name)
+                           VALUES (?, ?, 'x', ?)''', (user_id, "writer%d" % user_id, "Writer %d" % user_id))
+            cursor.execute('''INSERT INTO tweets (tweet_id, user_id, tweet_content) VALUES (?, ?, 'first')''',
+                           (user_id, user_id))
+        conn.commit()
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=writer,
+                                             args=(path, writer_id, users, args.operations,
+                                                   args.max_plus_one, results))
+                     for writer_id in range(args.writers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        succeeded = {"tweets": 0, "likes": 0, "follows": 0}
+        collisions = 0
+        for writer_succeeded, writer_collisions in outcomes:
+            collisions += writer_collisions
+            for table in succeeded:
+                succeeded[table] += writer_succeeded[table]
+
+        # Every successful insert must be in the database exactly once.
+        cursor.execute('''SELECT COUNT(*), COUNT(DISTINCT tweet_id) FROM tweets''')
+        tweets, distinct_tweets = cursor.fetchone()
+        cursor.execute('''SELECT COUNT(*) FROM likes_retweets''')
+        likes = cursor.fetchone()[0]
+        cursor.execute('''SELECT COUNT(*) FROM followers_following''')
+        follows = cursor.fetchone()[0]
+        conn.close()
+
+    print("Allocation:", "SELECT MAX(id)+1" if args.max_plus_one else "assigned by the database")
+    print("Writers:", args.writers, " operations each:", args.operations, " time: %.2f s" % elapsed)
+    print("Inserts that failed with an id collision:", collisions)
+    print("Tweets:", tweets - users, "stored,", succeeded["tweets"], "succeeded")
+    print("Likes:", likes, "stored,", succeeded["likes"], "succeeded")
+    print("Follows:", follows, "stored,", succeeded["follows"], "succeeded")
+
+    consistent = (tweets == distinct_tweets
+                  and tweets - users == succeeded["tweets"]
+                  and likes == succeeded["likes"]
+                  and follows == succeeded["follows"])
+    if collisions or not consistent:
+        print("FAILED")
+        sys.exit(1)
+    print("No collisions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+################
+## Code Notes ##
+################
+# Benchmark for the timeline like counts. It compares the old approach
+# (fetch the timeline, then one COUNT query per tweet) against a single
+# grouped query and against the tweet_stats counters now used by
+# CommandLineInterface.py, and reports the number of queries issued and
+# the latency of each approach.
+#
+# Run from the repository root with:
+# python benchmarks/LikeCountBenchmark.py --users 2000 --tweets 20000 --likes 100000
+
+#### Start Program ####
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseModuleStarter import create_tables
+
+
+# Timeline query used before the change. The like counts were fetched afterwards.
+OLD_TIMELINE_QUERY = '''SELECT user_profiles.username,tweet_id,
+                       tweet_content FROM followers_following 
+                       INNER JOIN tweets ON followers_following.following_user_id = tweets.user_id 
+                       INNER JOIN user_profiles ON user_profiles.user_id=tweets.user_id 
+                       WHERE followers_following.follower_user_id = ? 
+                       ORDER BY tweets.tweet_id DESC '''
+OLD_COUNT_QUERY = '''SELECT COUNT(tweet_id) FROM likes_retweets WHERE tweet_id =? '''
+
+# Timeline query with the like counts grouped in.
+GROUPED_TIMELINE_QUERY = '''SELECT user_profiles.username, tweets.tweet_id,
+                       tweets.tweet_content, COUNT(DISTINCT likes_retweets.like_retweet_id) 
+                       FROM followers_following 
+                       INNER JOIN tweets ON followers_following.following_user_id = tweets.user_id 
+                       INNER JOIN user_profiles ON user_profiles.user_id=tweets.user_id 
+                       LEFT JOIN likes_retweets ON likes_retweets.tweet_id = tweets.tweet_id 
+                       WHERE followers_following.follower_user_id = ? 
+                       GROUP BY tweets.tweet_id 
+                       ORDER BY tweets.tweet_id DESC '''
+
+# Timeline query used by the CLI now, reading the counters kept in tweet_stats.
+STATS_TIMELINE_QUERY = '''SELECT user_profiles.username, tweets.tweet_id, tweets.tweet_content, 
+                       COALESCE(tweet_stats.like_count, 0), COALESCE(tweet_stats.comment_count, 0) 
+                       FROM followers_following 
+                       INNER JOIN tweets ON followers_following.following_user_id = tweets.user_id 
+                       INNER JOIN user_profiles ON user_profiles.user_id=tweets.user_id 
+                       LEFT JOIN tweet_stats ON tweet_stats.tweet_id = tweets.tweet_id 
+                       WHERE followers_following.follower_user_id = ? 
+                       ORDER BY tweets.tweet_id DESC '''
+
+
+# Fill the database with random users, follows, tweets and likes.
+def populate(conn, users, follows_per_user, tweets, likes, seed):
+    rng = random.Random(seed)
+    cursor = conn.cursor()
+    cursor.executemany('''INSERT INTO user_profiles (user_id, username, password, full_name) 
+                       VALUES (?, ?, 'x', ?)''',
+                       ((i, "user%d" % i, "User %d" % i) for i in range(1, users + 1)))
+    follows = set()
+    for follower in range(1, users + 1):
+        for _ in range(follows_per_user):
+            following = rng.randint(1, users)
+            if following != follower:
+                follows.add((follower, following))
+    cursor.executemany('''INSERT INTO followers_following (follower_user_id, following_user_id) 
+                       VALUES (?, ?)''', follows)
+    cursor.executemany('''INSERT INTO tweets (tweet_id, user_id, tweet_content) VALUES (?, ?, ?)''',
+                       ((i, rng.randint(1, users), "tweet number %d" % i) for i in range(1, tweets + 1)))
+    # A user can like a tweet only once, so repeated random pairs are skipped.
+    cursor.executemany('''INSERT OR IGNORE INTO likes_retweets (user_id, tweet_id) VALUES (?, ?)''',
+                       ((rng.randint(1, users), rng.randint(1, tweets)) for _ in range(likes)))
+    conn.commit()
+
+
+# Old approach: one query for the timeline and one more for every tweet on it.
+def old_timeline(cursor, user_id):
+    cursor.execute(OLD_TIMELINE_QUERY, (user_id,))
+    tweets = cursor.fetchall()
+    numberlikes = list()
+    for tweet in tweets:
+        cursor.execute(OLD_COUNT_QUERY, (tweet[1],))
+        numberlikes.append(cursor.fetchone()[0])
+    return [tweet + (likes,) for tweet, likes in zip(tweets, numberlikes)]
+
+
+# A single grouped query returns the tweets and their likes.
+def grouped_timeline(cursor, user_id):
+    cursor.execute(GROUPED_TIMELINE_QUERY, (user_id,))
+    return cursor.fetchall()
+
+
+# The tweets are returned with the counters from tweet_stats (without the comment count
+# so the rows can be compared with the other approaches).
+def stats_timeline(cursor, user_id):
+    cursor.execute(STATS_TIMELINE_QUERY, (user_id,))
+    return [row[:4] for row in cursor.fetchall()]
+
+
+# Time one approach over the sample of users, counting every statement sqlite runs.
+def measure(conn, function, user_ids):
+    statements = [0]
+    conn.set_trace_callback(lambda statement: statements.__setitem__(0, statements[0] + 1))
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    for user_id in user_ids:
+        function(cursor, user_id)
+    elapsed = time.perf_counter() - start
+    conn.set_trace_callback(None)
+    return statements[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ways of loading the like counts for a timeline.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--follows-per-user", type=int, default=50)
+    parser.add_argument("--tweets", type=int, default=20000)
+    parser.add_argument("--likes", type=int, default=100000)
+    parser.add_argument("--samples", type=int, default=20, help="Number of timelines to load with each approach.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "benchmark.db"))
+        create_tables(conn.cursor())
+        populate(conn, args.users, args.follows_per_user, args.tweets, args.likes, args.seed)
+
+        user_ids = random.Random(args.seed).sample(range(1, args.users + 1), min(args.samples, args.users))
+        # Make sure both approaches return the same timeline before timing them.
+        cursor = conn.cursor()
+        for user_id in user_ids:
+            expected = old_timeline(cursor, user_id)
+            assert grouped_timeline(cursor, user_id) == expected
+            assert stats_timeline(cursor, user_id) == expected
+
+        print("Timelines loaded:", len(user_ids))
+        for name, function in (("per-tweet COUNT", old_timeline),
+                               ("grouped query", grouped_timeline),
+                               ("tweet_stats", stats_timeline)):
+            statements, elapsed = measure(conn, function, user_ids)
+            print("%-16s queries: %8d  total: %8.3f s  per timeline: %8.2f ms"
+                  % (name, statements, elapsed, elapsed * 1000 / len(user_ids)))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+################
+## Code Notes ##
+################
+# Compares hashing a batch of passwords one after another with hashing them
+# in the process pool of PasswordHashing.hash_passwords, as used when seeding
+# the database and importing users. It also shows how long a single hash
+# takes at a few work factors, to help choose TWITTERLIKE_BCRYPT_ROUNDS.
+#
+# Run from the repository root with:
+# python benchmarks/PasswordHashingBenchmark.py --passwords 64 --rounds 10
+
+#### Start Program ####
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from PasswordHashing import check_password, hash_password, hash_passwords
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and process pool password hashing.")
+    parser.add_argument("--passwords", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt work factor used for the batch.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core).")
+    args = parser.parse_args()
+
+    print("Time for one hash:")
+    for rounds in (4, 8, 10, 12):
+        start = time.perf_counter()
+        hash_password("hey123!", rounds)
+        print("  %2d rounds  %8.1f ms" % (rounds, (time.perf_counter() - start) * 1000))
+
+    passwords = ["password%d!" % number for number in range(args.passwords)]
+    print("\nHashing", args.passwords, "passwords at", args.rounds, "rounds on", os.cpu_count(), "core(s)")
+
+    start = time.perf_counter()
+    serial = hash_passwords(passwords, args.rounds, workers=1)
+    serial_time = time.perf_counter() - start
+    print("  one at a time  %8.2f s  %8.1f hashes/s" % (serial_time, len(passwords) / serial_time))
+
+    start = time.perf_counter()
+    pooled = hash_passwords(passwords, args.rounds, args.workers)
+    pooled_time = time.perf_counter() - start
+    print("  process pool   %8.2f s  %8.1f hashes/s  (%.1fx)"
+          % (pooled_time, len(passwords) / pooled_time, serial_time / pooled_time))
+
+    # The hashes must come back in the same order as the passwords.
+    if not all(check_password(password_hash, password) for password_hash, password in zip(pooled, passwords)):
+        print("FAILED: a hash does not match its password")
+        sys.exit(1)
+    if len(serial) != len(pooled):
+        print("FAILED: the number of hashes differs")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
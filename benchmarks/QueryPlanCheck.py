@@ -0,0 +1,138 @@
+################
+## Code Notes ##
+################
+# Runs EXPLAIN QUERY PLAN on each query issued by TwitterLikeStore.py
+# (and the timeline helpers it calls) against a freshly migrated database,
+# and checks that every query reads the follow, like, comment, tweet and
+# timeline tables through an index instead of scanning them. The script
+# exits with a non-zero status if any query falls back to a full scan.
+#
+# Run from the repository root with:
+# python benchmarks/QueryPlanCheck.py
+
+#### Start Program ####
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import FollowGraph
+import FollowPages
+import HomeTimeline
+import LoginRateLimiter
+import Trending
+import TweetPages
+import TweetSearch
+import TweetTags
+import TwitterLikeStore
+import UserCache
+from DatabaseModuleStarter import create_tables
+from HomeTimeline import NEWEST_TWEET_ID, TIMELINE_LENGTH
+
+
+# Tables that grow with usage and must never be scanned in full.
+LARGE_TABLES = ("followers_following", "likes_retweets", "comments", "tweets", "home_timeline",
+                "home_timeline_sizes", "follow_counts", "follow_graph_changes", "user_profiles", "login_rate_limits",
+                "hashtags", "mentions",
+                "tweet_trend_buckets", "hashtag_trend_buckets", "trending_tweets", "trending_hashtags")
+
+# Each CLI query as (description, sql, parameters). The SQL is taken from the
+# modules that run it, so the check always sees the queries as they are.
+CLI_QUERIES = [
+    ("login password lookup", TwitterLikeStore.LOGIN_QUERY, ("admin",)),
+    ("user lookup by username", UserCache.USER_QUERY, ("admin",)),
+    ("user lookup by user ids", UserCache.USERS_QUERY % "?, ?, ?", (1, 2, 3)),
+    ("home timeline page", HomeTimeline.HOME_TIMELINE_QUERY,
+     (1, NEWEST_TWEET_ID, 20, 1, NEWEST_TWEET_ID, 20, 20)),
+    ("profile page", TweetPages.USER_TWEETS_QUERY, (1, NEWEST_TWEET_ID, 20)),
+    ("open a tweet", TwitterLikeStore.TWEET_QUERY, (1,)),
+    ("open an own tweet", TwitterLikeStore.AUTHOR_TWEET_QUERY, (1, 1)),
+    ("tweet exists?", TwitterLikeStore.TWEET_EXISTS_QUERY, (1,)),
+    ("comments on a tweet", TwitterLikeStore.COMMENTS_QUERY, (1,)),
+    ("liked tweets", TwitterLikeStore.LIKED_TWEETS_QUERY, (1,)),
+    ("already liked?", TwitterLikeStore.HAS_LIKED_QUERY, (1, 1)),
+    ("like", TwitterLikeStore.ADD_LIKE_QUERY, (1, 1, 0.0)),
+    ("unlike", TwitterLikeStore.REMOVE_LIKE_QUERY, (1, 1)),
+    ("already following?", TwitterLikeStore.IS_FOLLOWING_QUERY, (1, 2)),
+    ("follow", TwitterLikeStore.FOLLOW_QUERY, (1, 2)),
+    ("unfollow", TwitterLikeStore.UNFOLLOW_QUERY, (1, 2)),
+    ("followers page", FollowPages.FOLLOWERS_QUERY, (1, 0, 50)),
+    ("following page", FollowPages.FOLLOWING_QUERY, (1, 0, 50)),
+    ("follow counts", FollowPages.FOLLOW_COUNTS_QUERY, (1,)),
+    ("follow graph changes", FollowGraph.GRAPH_CHANGES_QUERY, (1,)),
+    ("fan out a new tweet", HomeTimeline.FAN_OUT_QUERY, (1, 1, 1)),
+    ("backfill after a follow", HomeTimeline.BACKFILL_QUERY, (1, 2, TIMELINE_LENGTH)),
+    ("timelines over the cap",
+     HomeTimeline.OVER_LENGTH_QUERY % HomeTimeline.FOLLOWERS_OF_AUTHOR_QUERY,
+     (TIMELINE_LENGTH, 1, TIMELINE_LENGTH)),
+    ("trim a timeline", HomeTimeline.TRIM_TIMELINE_QUERY, (1, 1, 0)),
+    ("purge after an unfollow", HomeTimeline.PURGE_QUERY, (1, 2)),
+    ("search tweets", TweetSearch.SEARCH_TWEETS_QUERY, ('"coffee"', 20, 0)),
+    ("search comments", TweetSearch.SEARCH_COMMENTS_QUERY, ('"coffee"', 20, 0)),
+    ("tweets with a hashtag", TweetPages.TAGGED_TWEETS_QUERY, ("python", NEWEST_TWEET_ID, 20)),
+    ("tweets mentioning a user", TweetPages.MENTIONS_QUERY, (1, NEWEST_TWEET_ID, 20)),
+    ("record a mention", TweetTags.ADD_MENTION_QUERY, (1, "admin")),
+    ("trending tweets", Trending.TRENDING_TWEETS_QUERY, ("hour", 10)),
+    ("trending hashtags", Trending.TRENDING_HASHTAGS_QUERY, ("hour", 10)),
+    ("take a login token", LoginRateLimiter.TAKE_TOKEN_QUERY, ("user:admin", 5, 0.0, 5, 0.05, 5, 0.05)),
+    ("login retry time", LoginRateLimiter.BUCKET_QUERY, ("user:admin",)),
+    ("return a login token", LoginRateLimiter.RETURN_TOKEN_QUERY, (5, "user:admin")),
+    ("reset a login limit", LoginRateLimiter.RESET_BUCKET_QUERY, ("user:admin",)),
+    ("prune login buckets", LoginRateLimiter.PRUNE_BUCKETS_QUERY, (0.0,)),
+]
+# The trending counters of both trends.
+for trend, item in (("tweets", 1), ("hashtags", "python")):
+    CLI_QUERIES.extend([
+        ("count a trending " + trend,
+         Trending.trend_query(Trending.ADD_TO_TOTALS_QUERY, trend), (item, 1, 0)),
+        ("expire trending " + trend,
+         Trending.trend_query(Trending.EXPIRE_QUERY, trend), (0, 1, "hour")),
+        ("drop expired trending " + trend,
+         Trending.trend_query(Trending.DROP_EXPIRED_QUERY, trend), ("hour",)),
+        ("drop empty trending " + trend,
+         Trending.trend_query(Trending.DROP_EMPTY_TOTALS_QUERY, trend), (item,)),
+    ])
+
+
+# Return the EXPLAIN QUERY PLAN rows of a query as a list of strings.
+def query_plan(cursor, sql, parameters):
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+    return [row[3] for row in cursor.fetchall()]
+
+
+# A plan step is a full scan if it reads a large table with SCAN without an index.
+# "SCAN x USING INDEX" is also a full pass over the table, so it counts as well.
+def full_scans(plan):
+    scans = list()
+    for step in plan:
+        words = step.split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in LARGE_TABLES:
+            scans.append(step)
+    return scans
+
+
+def main():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_tables(cursor)
+
+    failures = 0
+    for description, sql, parameters in CLI_QUERIES:
+        plan = query_plan(cursor, sql, parameters)
+        scans = full_scans(plan)
+        print("%-32s %s" % (description, "FULL SCAN" if scans else "ok"))
+        for step in plan:
+            print("    ", step)
+        if scans:
+            failures += 1
+    conn.close()
+
+    if failures:
+        print(failures, "quer(y/ies) scan a whole table")
+        sys.exit(1)
+    print("All queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+################
+## Code Notes ##
+################
+# Compares how the CLI used to print lists of tweets (three print calls per
+# tweet) with PageRenderer.py, which formats the whole list into one string
+# and writes it in a single call. Both write to the same place, the null
+# device by default, so the difference is the formatting and the number of
+# writes rather than the speed of the terminal. Before comparing, it checks
+# that both produce the same text.
+#
+# Run from the repository root with:
+# python benchmarks/RenderBenchmark.py --tweets 500
+
+#### Start Program ####
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from PageRenderer import SPEECH_BALLOON, THUMBS_UP, render_tweets, show
+
+
+# The tweets as the CLI printed them before, with three print calls per tweet.
+def print_tweets(tweets):
+    for tweet in tweets:
+        print(tweet[0],"( Tweet ID:",tweet[1],")")
+        print("   ",tweet[2])
+        print(THUMBS_UP, tweet[3],
+              SPEECH_BALLOON, tweet[4], "\n")
+
+
+# The tweets rendered into one string and written at once.
+def show_tweets(tweets):
+    show(render_tweets(tweets))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare printing tweets one line at a time with rendering a page at once.")
+    parser.add_argument("--tweets", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--output", default=os.devnull, help="Where to write the tweets.")
+    args = parser.parse_args()
+
+    tweets = [("user%d" % (number % 97), number, "tweet number %d about #python and coffee" % number,
+               number % 13, number % 7) for number in range(args.tweets, 0, -1)]
+
+    # Both ways must produce exactly the same text.
+    printed = io.StringIO()
+    with redirect_stdout(printed):
+        print_tweets(tweets)
+    assert printed.getvalue() == render_tweets(tweets)
+
+    print("%d tweets written to %s, %d repeats:" % (args.tweets, args.output, args.repeats))
+    with open(args.output, "w", encoding="utf-8") as output:
+        for name, function in (("print per line", print_tweets), ("rendered page", show_tweets)):
+            timings = list()
+            for _ in range(args.repeats):
+                with redirect_stdout(output):
+                    start = time.perf_counter()
+                    function(tweets)
+                    timings.append((time.perf_counter() - start) * 1000)
+            print("  %-16s p50 %8.3f ms  min %8.3f ms" % (name, statistics.median(timings), min(timings)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+################
+## Code Notes ##
+################
+# Measures search latency on a synthetic database built with
+# SyntheticDataset.py. It times the first page of results from the FTS5
+# indexes used by TweetSearch.py and, for comparison, the same search done
+# with LIKE '%word%', reporting p50/p95/p99 latency for each. Two kinds of
+# search are timed:
+# - common words, made from the small vocabulary of the synthetic tweets, so
+#   that a large share of the rows match. LIKE can stop after the first page
+#   of matches, while bm25 has to score every match to rank them
+# - rare words that no row contains, where LIKE has to read every row and
+#   the index answers straight away
+#
+# Run from the repository root with:
+# python benchmarks/SearchBenchmark.py --users 10000
+
+#### Start Program ####
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseConnection import get_read_connection, get_write_connection
+from SyntheticDataset import WORDS, generate_dataset
+from TweetPages import PAGE_SIZE
+from TweetSearch import search_comments, search_tweets
+
+
+# The first page of tweets containing every word, found by scanning the table.
+def like_search_tweets(cursor, text):
+    words = text.split()
+    cursor.execute('''SELECT tweet_id, tweet_content FROM tweets
+                   WHERE %s
+                   LIMIT ?''' % " AND ".join(["tweet_content LIKE ?"] * len(words)),
+                   ["%" + word + "%" for word in words] + [PAGE_SIZE])
+    return cursor.fetchall()
+
+
+# The first page of comments containing every word, found by scanning the table.
+def like_search_comments(cursor, text):
+    words = text.split()
+    cursor.execute('''SELECT comment_id, comment_text FROM comments
+                   WHERE %s
+                   LIMIT ?''' % " AND ".join(["comment_text LIKE ?"] * len(words)),
+                   ["%" + word + "%" for word in words] + [PAGE_SIZE])
+    return cursor.fetchall()
+
+
+# Time a search function over all the search texts, in milliseconds.
+def time_searches(search, cursor, texts):
+    timings = list()
+    for text in texts:
+        start = time.perf_counter()
+        search(cursor, text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FTS5 search with LIKE scans on a synthetic database.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tweets-per-user", type=int, default=10)
+    parser.add_argument("--comments-per-user", type=int, default=10)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # One and two word searches made of the words the synthetic tweets are built from.
+    rng = random.Random(args.seed)
+    words = [word.strip("#@:") for word in WORDS]
+    searches = (("common words", [" ".join(rng.sample(words, rng.randint(1, 2))) for _ in range(args.searches)]),
+                ("rare words", ["missing%d" % number for number in range(args.searches)]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search.db")
+        conn = get_write_connection(path)
+        start = time.perf_counter()
+        rows = generate_dataset(conn, args.users, min(50, max(1, args.users // 20)),
+                                args.users * args.tweets_per_user, args.users * 5,
+                                args.users * args.comments_per_user, args.seed, report=lambda line: None)
+        conn.close()
+        print("Built %d tweets and %d comments in %.1f s"
+              % (rows["tweets"], rows["comments"], time.perf_counter() - start))
+
+        conn = get_read_connection(path)
+        cursor = conn.cursor()
+        for description, texts in searches:
+            print("%d searches for %s, first page of %d results:" % (len(texts), description, PAGE_SIZE))
+            for name, search in (("tweets, FTS5 bm25", search_tweets),
+                                 ("tweets, LIKE scan", like_search_tweets),
+                                 ("comments, FTS5 bm25", search_comments),
+                                 ("comments, LIKE scan", like_search_comments)):
+                timings = time_searches(search, cursor, texts)
+                cuts = statistics.quantiles(timings, n=100, method="inclusive")
+                print("  %-22s p50 %8.3f ms  p95 %8.3f ms  p99 %8.3f ms" % (name, cuts[49], cuts[94], cuts[98]))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+################
+## Code Notes ##
+################
+# Measures how long CommandLineInterface.py takes to start. The CLI is run
+# against a freshly seeded database with the input "3" (exit at the first
+# menu), so the time measured is everything that happens before the user can
+# act: imports, opening and migrating the database and printing the banner.
+#
+# The script reports:
+# - the cold-start wall time over several runs, next to the time it takes to
+#   start a bare Python interpreter
+# - a breakdown of the slowest imports, from python -X importtime
+#
+# It fails if one of the packages that should only be loaded on first use
+# (emoji and flask_bcrypt/Flask) is imported during startup, or if the median
+# startup time goes over --max-ms.
+#
+# Run from the repository root with:
+# python benchmarks/StartupBenchmark.py --runs 10
+
+#### Start Program ####
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPOSITORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CLI = os.path.join(REPOSITORY, "CommandLineInterface.py")
+STARTER = os.path.join(REPOSITORY, "DatabaseModuleStarter.py")
+
+# Packages that must not be imported before they are used.
+DEFERRED_MODULES = ("emoji", "flask_bcrypt", "flask")
+
+
+# Run a command with the given input and return the wall time in milliseconds.
+def timed_run(command, directory, stdin=""):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=directory, input=stdin, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+# Run the CLI once with -X importtime and return (cumulative microseconds, module)
+# for every import, together with the set of module names imported.
+def import_times(directory):
+    result = subprocess.run([sys.executable, "-X", "importtime", CLI], cwd=directory,
+                            input="3\n", capture_output=True, text=True, check=True)
+    imports = list()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.rstrip()))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the start-up time of the CLI.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="Number of imports to show.")
+    parser.add_argument("--max-ms", type=float, help="Fail if the median start-up time is higher.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # A low bcrypt cost keeps seeding quick; it does not affect start-up.
+        environment = dict(os.environ, TWITTERLIKE_BCRYPT_ROUNDS="4")
+        subprocess.run([sys.executable, STARTER], cwd=directory, env=environment,
+                       capture_output=True, check=True)
+
+        # One run first, so that the .pyc files exist for the timed runs.
+        timed_run([sys.executable, CLI], directory, "3\n")
+        interpreter = [timed_run([sys.executable, "-c", "pass"], directory) for _ in range(args.runs)]
+        startup = [timed_run([sys.executable, CLI], directory, "3\n") for _ in range(args.runs)]
+        imports = import_times(directory)
+
+    print("Start-up over %d runs:" % args.runs)
+    print("  bare interpreter  median %8.1f ms  min %8.1f ms"
+          % (statistics.median(interpreter), min(interpreter)))
+    print("  CLI to first exit median %8.1f ms  min %8.1f ms"
+          % (statistics.median(startup), min(startup)))
+
+    # Top-level imports have no indentation before the module name.
+    print("\nSlowest top-level imports (cumulative):")
+    top_level = [(cumulative, name.strip()) for cumulative, name in imports if not name.startswith("  ")]
+    for cumulative, name in sorted(top_level, reverse=True)[:args.top]:
+        print("  %8.1f ms  %s" % (cumulative / 1000, name))
+
+    failed = False
+    imported = set(name.strip() for cumulative, name in imports)
+    eager = [module for module in DEFERRED_MODULES if module in imported]
+    if eager:
+        print("\nFAILED: imported during start-up:", ", ".join(eager))
+        failed = True
+    if args.max_ms is not None and statistics.median(startup) > args.max_ms:
+        print("\nFAILED: median start-up time is over %.1f ms" % args.max_ms)
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nNo deferred package was imported during start-up")
+
+
+if __name__ == "__main__":
+    main()
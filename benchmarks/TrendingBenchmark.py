@@ -0,0 +1,135 @@
+################
+## Code Notes ##
+################
+# Measures the trending tweets and hashtags on a synthetic database built
+# with SyntheticDataset.py. For each trending period it times reading the top
+# tweets and hashtags from the counters kept by Trending.py and, for
+# comparison, working them out with a GROUP BY over likes_retweets and
+# hashtags for the same period, checking that both give the same answer. It
+# then replays likes one at a time through record_like, moving the clock
+# forward with them, to show what keeping the counters costs each like.
+#
+# The synthetic likes are spread over a year, so the trends are read as of a
+# time near the end of it rather than now.
+#
+# Run from the repository root with:
+# python benchmarks/TrendingBenchmark.py --users 10000
+
+#### Start Program ####
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from DatabaseConnection import get_write_connection
+from SyntheticDataset import FIRST_TWEET_TIME, TWEET_PERIOD, generate_dataset
+from Trending import (TRENDING_COUNT, TRENDING_PERIODS, BUCKET_SECONDS, bucket_of, record_like,
+                      read_trending_hashtags, read_trending_tweets, rebuild_trending)
+
+
+# The top tweets of a period as (tweet_id, likes), counted from every like
+# from the start of the period's first bucket to the end of its last one.
+def group_by_tweets(cursor, first_bucket, end):
+    cursor.execute('''SELECT tweet_id, COUNT(*) FROM likes_retweets
+                   WHERE liked_at >= ? AND liked_at < ?
+                   GROUP BY tweet_id
+                   ORDER BY 2 DESC, 1 DESC
+                   LIMIT ?''',
+                   (first_bucket * BUCKET_SECONDS, end, TRENDING_COUNT))
+    return cursor.fetchall()
+
+
+# The top hashtags of a period as (tag, uses), counted in the same way.
+def group_by_hashtags(cursor, first_bucket, end):
+    cursor.execute('''SELECT hashtags.tag, COUNT(*) FROM hashtags
+                   INNER JOIN tweets ON tweets.tweet_id = hashtags.tweet_id
+                   WHERE CAST(strftime('%s', tweets.creation_timestamp) AS INTEGER) >= ?
+                   AND CAST(strftime('%s', tweets.creation_timestamp) AS INTEGER) < ?
+                   GROUP BY hashtags.tag
+                   ORDER BY 2 DESC, 1 DESC
+                   LIMIT ?''',
+                   (first_bucket * BUCKET_SECONDS, end, TRENDING_COUNT))
+    return cursor.fetchall()
+
+
+# Time a read over a number of repeats, in milliseconds, and return its last result.
+def time_reads(read, repeats):
+    timings = list()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = read()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the trending counters with GROUP BY queries on a synthetic database.")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tweets-per-user", type=int, default=20)
+    parser.add_argument("--likes-per-user", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--replayed-likes", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Read the trends as of 90% of the way through the synthetic tweets. The
+    # counters include the whole of the current bucket.
+    now = (FIRST_TWEET_TIME + TWEET_PERIOD * 0.9 - datetime(1970, 1, 1)).total_seconds()
+    end = (bucket_of(now) + 1) * BUCKET_SECONDS
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = get_write_connection(os.path.join(directory, "trending.db"))
+        start = time.perf_counter()
+        rows = generate_dataset(conn, args.users, min(50, max(1, args.users // 20)),
+                                args.users * args.tweets_per_user, args.users * args.likes_per_user,
+                                args.users, args.seed, report=lambda line: None)
+        print("Built %d tweets and %d likes in %.1f s"
+              % (rows["tweets"], rows["likes_retweets"], time.perf_counter() - start))
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        rebuild_trending(cursor, now)
+        conn.commit()
+        print("Counted the trends from scratch in %.1f ms" % ((time.perf_counter() - start) * 1000))
+
+        for period in TRENDING_PERIODS:
+            cursor.execute('''SELECT first_bucket FROM trending_periods WHERE period = ?''', (period,))
+            first_bucket = cursor.fetchone()[0]
+            print("Top %d of the last %s, %d repeats:" % (TRENDING_COUNT, period, args.repeats))
+            for name, read, grouped in (
+                    ("tweets", lambda: [row[1:2] + row[5:] for row in read_trending_tweets(cursor, period)],
+                     lambda: group_by_tweets(cursor, first_bucket, end)),
+                    ("hashtags", lambda: read_trending_hashtags(cursor, period),
+                     lambda: group_by_hashtags(cursor, first_bucket, end))):
+                counter_timings, counter_result = time_reads(read, args.repeats)
+                group_timings, group_result = time_reads(grouped, args.repeats)
+                assert counter_result == group_result, (period, name)
+                print("  %-9s counters p50 %8.3f ms   GROUP BY p50 %8.3f ms"
+                      % (name, statistics.median(counter_timings), statistics.median(group_timings)))
+
+        # Replay the likes made after the counted buckets, in the order they were made.
+        cursor.execute('''SELECT tweet_id, liked_at FROM likes_retweets
+                       WHERE liked_at >= ?
+                       ORDER BY liked_at
+                       LIMIT ?''',
+                       (end, args.replayed_likes))
+        replayed = cursor.fetchall()
+        timings = list()
+        for tweet_id, liked_at in replayed:
+            start = time.perf_counter()
+            record_like(cursor, tweet_id, liked_at, liked_at)
+            timings.append((time.perf_counter() - start) * 1000)
+        conn.commit()
+        if timings:
+            print("Counted %d more likes over %.1f hours: p50 %.3f ms  p99 %.3f ms per like"
+                  % (len(timings), (replayed[-1][1] - end) / 3600, statistics.median(timings),
+                     statistics.quantiles(timings, n=100, method="inclusive")[98]))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()